@@ -1,51 +1,62 @@
 #!/usr/bin/env python3
+import time
+# Taken before the other imports so --startup-report covers them
+STARTED = time.perf_counter()
 import sys
 import os
 import argparse
-import subprocess
 import re
-from ollama_client import OllamaClient
-from memory_manager import MemoryManager
+from command_runner import OutputLimits, run_streaming
+from command_rules import classify, group_independent, normalize_command
+from daemon import default_socket_path, forward_request, serve
+from startup import StartupTimer
+from tracing import NULL_TRACER
 
-def run_command(command, auto_confirm=False):
+def confirm_command(command, auto_confirm=False):
+    # Returns (run it, auto-confirm from now on)
     print(f"\n--- Suggested Command ---\n{command}\n-------------------------")
     if auto_confirm:
-        confirm = 'y'
         print("Auto-executing...")
-    else:
-        confirm = input("Execute this command? (y/n/a - yes/no/always): ").strip().lower()
+        return True, False
+    confirm = input("Execute this command? (y/n/a - yes/no/always): ").strip().lower()
+    return confirm in ['y', 'a'], confirm == 'a'
 
-    if confirm in ['y', 'a']:
-        try:
-            # Use shell=True to allow piping and sudo interactive prompts
-            process = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-            stdout, stderr = process.communicate()
-            if stdout:
-                print(f"Output:\n{stdout}")
-            if stderr:
-                print(f"Error:\n{stderr}")
-            return f"Command Output:\n{stdout}\n{stderr}", (confirm == 'a')
-        except Exception as e:
-            print(f"Execution failed: {e}")
-            return f"Execution failed: {e}", False
-    return "Command execution skipped by user.", False
+def format_result(result):
+    return f"Command Output ({result.summary()}):\n{result.stdout.text()}\n{result.stderr.text()}"
 
-def get_system_context():
+def run_traced(command, limits=None, tracer=NULL_TRACER):
+    with tracer.span("exec", command=command):
+        result = run_streaming(command, limits)
+        tracer.annotate(exit_code=result.exit_code)
+    return result
+
+def execute_command(command, limits=None, tracer=NULL_TRACER):
     try:
-        cwd = os.getcwd()
-        user = os.getenv("USER", "unknown")
-        # Get a brief look at the files in the current dir
-        files = subprocess.check_output("ls -F | head -n 20", shell=True, text=True).strip()
-        context = (
-            f"--- System Environment ---\n"
-            f"User: {user}\n"
-            f"Current Directory: {cwd}\n"
-            f"Files in CWD (top 20):\n{files}\n"
-            f"---------------------------\n"
-        )
-        return context
+        # Runs through the shell to allow piping and sudo interactive prompts; output is
+        # echoed as it arrives and only a bounded head and tail of it is kept
+        print("Output:")
+        result = run_traced(command, limits, tracer)
+        print(f"[{result.summary()}]")
+        return format_result(result)
     except Exception as e:
-        return f"Error gathering system context: {e}"
+        print(f"Execution failed: {e}")
+        return f"Execution failed: {e}"
+
+def execute_concurrently(commands, pool, limits=None, tracer=NULL_TRACER):
+    # Independent read-only commands run together; output is printed and returned in command order
+    futures = [pool.submit(run_traced, command, limits, tracer) for command in commands]
+    outputs = []
+    for command, future in zip(commands, futures):
+        try:
+            result = future.result()
+        except Exception as e:
+            print(f"Execution failed: {e}")
+            outputs.append(f"Execution failed: {e}")
+            continue
+        print(f"Output of {command}:\n{(result.stdout.text() + result.stderr.text()).rstrip()}")
+        print(f"[{result.summary()}]")
+        outputs.append(format_result(result))
+    return outputs
 
 def main():
     parser = argparse.ArgumentParser(description="Terminal AI Agent")
@@ -55,8 +66,76 @@ def main():
     parser.add_argument("-m", "--model", default="mistral-nemo:12b", help="LLM model to use")
     parser.add_argument("--embed-model", default="nomic-embed-text:latest", help="Model to use for embeddings")
     parser.add_argument("-y", "--yes", action="store_true", help="Auto-confirm all commands")
+    parser.add_argument("--no-embed-cache", action="store_true", help="Disable the on-disk embedding cache")
+    parser.add_argument("--no-verdict-cache", action="store_true", help="Disable the on-disk cache of SCOUT verdicts")
+    parser.add_argument("--no-probe-cache", action="store_true", help="Probe fallback embed models again instead of reusing earlier results")
+    parser.add_argument("--cache-stats", action="store_true", help="Print embedding cache, connection pool and memory table counters after each request")
+    parser.add_argument("--probe-deadline", type=float, default=10, help="Seconds to spend probing other models when the embed model fails")
+    parser.add_argument("--pool-size", type=int, default=8, help="Max pooled HTTP connections to the Ollama endpoint")
+    parser.add_argument("--connect-timeout", type=float, default=5, help="Seconds to wait for a connection to Ollama")
+    parser.add_argument("--read-timeout", type=float, default=300, help="Seconds to wait for an Ollama response")
+    parser.add_argument("--no-stream", action="store_true", help="Wait for the full GENERAL response instead of streaming it")
+    parser.add_argument("-j", "--parallel", type=int, default=3, help="Max concurrent ARCHITECT/SCOUT calls")
+    parser.add_argument("--vram-budget", type=int, default=8192, help="MB of GPU memory the units may keep resident (0 unloads helpers after every call)")
+    parser.add_argument("--keep-alive", default="10m", help="keep_alive for helper units that fit in the VRAM budget")
+    parser.add_argument("--hot-tier", type=int, default=512, help="Recent memories kept in the in-process NumPy tier (0 disables)")
+    parser.add_argument("--migrate-memory", action="store_true", help="Re-embed older memory tables into the current embed model's table, then exit")
+    parser.add_argument("--consolidate-memory", action="store_true", help="Condense old memories into SCRIBE summaries and enforce the row cap, then exit")
+    parser.add_argument("--retention-days", type=float, default=30, help="Age after which memories are consolidated")
+    parser.add_argument("--max-memory-rows", type=int, default=20000, help="Row cap enforced by --consolidate-memory")
+    parser.add_argument("--dry-run", action="store_true", help="With --consolidate-memory, only report what would change")
+    parser.add_argument("--check-memory-index", action="store_true", help="Measure ANN recall and latency against exact search, then exit")
+    parser.add_argument("--profile", action="store_true", help="Print a waterfall of where each request's time went")
+    parser.add_argument("--trace-file", default=None, help="Append per-request spans to this file as JSONL, or as a Chrome trace of this process only if it ends in .json")
+    parser.add_argument("--startup-report", action="store_true", help="Print import, connect and first-token timings after the first request")
+    parser.add_argument("--cmd-timeout", type=float, default=600, help="Seconds a command may run before it is killed (0 disables)")
+    parser.add_argument("--max-output-mb", type=float, default=64, help="Output a command may produce before it is killed (0 disables)")
+    parser.add_argument("--capture-kb", type=int, default=16, help="Head + tail of each command's output kept for the GENERAL")
+    parser.add_argument("--context-budget", type=int, default=3072, help="Tokens the GENERAL's prompt may use per turn; older command output is condensed beyond that")
+    parser.add_argument("--scribe-budget", type=int, default=8192, help="Max tokens of command output sent to the SCRIBE per summary")
+    parser.add_argument("--parallel-commands", type=int, default=0, help="Run up to N consecutive read-only commands of a turn at once (0 runs all serially)")
+    parser.add_argument("--daemon", action="store_true", help="Stay resident and serve requests from agent clients over a Unix socket")
+    parser.add_argument("--socket", default=None, help="Daemon socket path (default: $XDG_RUNTIME_DIR/terminal-companion.sock)")
+    parser.add_argument("--no-daemon", action="store_true", help="Run the request in this process even if a daemon is listening")
     args = parser.parse_args()
 
+    # CLI Mode: "run [request]" or just [request]
+    request = ""
+    if args.command:
+        # If the first word is 'run', we treat the rest as the request
+        if args.command[0] == 'run':
+            request = " ".join(args.command[1:])
+        else:
+            request = " ".join(args.command)
+
+    # A running daemon already has the clients, tables and caches warm; hand the request
+    # over and just relay its output and prompts. Model and memory flags are the daemon's.
+    socket_path = args.socket or default_socket_path()
+    maintenance = args.migrate_memory or args.consolidate_memory or args.check_memory_index
+    if request and not (args.daemon or args.no_daemon or maintenance):
+        status = forward_request(socket_path, request, auto_confirm=args.yes)
+        if status is not None:
+            sys.exit(status)
+
+    # Only needed when this process runs the agent itself
+    from concurrent.futures import ThreadPoolExecutor
+    from ollama_client import OllamaClient
+    from memory_manager import MemoryManager
+    from embedding_cache import EmbeddingCache
+    from block_parser import BlockParser
+    from residency import ResidencyScheduler
+    from session import GenerateSession
+    from context_window import ContextWindow
+    from environment import EnvironmentSnapshot
+    from summarizer import OutputSummarizer
+    from verdict_cache import VerdictCache
+    from probe_cache import ProbeCache
+    from tracing import Tracer, TraceWriter, waterfall
+
+    startup = StartupTimer(STARTED)
+    startup.mark("imports")
+    startup.check_imports()
+
     # Specialized Units Configuration
     UNITS = {
         "GENERAL": args.model,
@@ -67,10 +146,37 @@ def main():
 
     # Configuration
     DB_PATH = os.path.expanduser("~/.lancedb")
+    CACHE_DIR = os.path.expanduser("~/.cache/terminal-companion")
     EMBED_MODEL = args.embed_model
-    
-    ollama = OllamaClient(base_url=args.endpoint, model=args.model, embed_model=EMBED_MODEL)
-    memory = MemoryManager(db_path=DB_PATH, model_name=EMBED_MODEL)
+
+    # Spans around client, memory, unit and command calls; off unless asked for
+    tracer = Tracer(enabled=args.profile or bool(args.trace_file))
+    trace_writer = TraceWriter(args.trace_file, tracer) if args.trace_file else None
+
+    embed_cache = None if args.no_embed_cache else EmbeddingCache(os.path.join(CACHE_DIR, "embeddings.db"))
+    verdict_cache = None if args.no_verdict_cache else VerdictCache(os.path.join(CACHE_DIR, "scout_verdicts.db"))
+    # Which models can embed, per endpoint and model digest, so fallback probing isn't repeated
+    probe_cache = None if args.no_probe_cache else ProbeCache(os.path.join(CACHE_DIR, "embed_probes.db"))
+    # The GENERAL stays loaded; SCOUT and the embedder are kept beside it first when they fit
+    residency = ResidencyScheduler(
+        args.vram_budget, pinned=[UNITS["GENERAL"]], preferred=[UNITS["SCOUT"], EMBED_MODEL], keep_alive=args.keep_alive
+    )
+    ollama = OllamaClient(
+        base_url=args.endpoint, model=args.model, embed_model=EMBED_MODEL, embed_cache=embed_cache,
+        pool_size=args.pool_size, connect_timeout=args.connect_timeout, read_timeout=args.read_timeout,
+        residency=residency, tracer=tracer, probe_cache=probe_cache, probe_deadline=args.probe_deadline
+    )
+    memory = MemoryManager(
+        db_path=DB_PATH, model_name=EMBED_MODEL, hot_tier_size=args.hot_tier, hot_threshold=0.7,
+        migrate_in_background=not args.migrate_memory, tracer=tracer
+    )
+    # Lets memory re-embed an older table in the background after the embed model changes
+    memory.set_embedders(ollama.get_embeddings_batch, ollama.embed_with_model)
+    # A fallback embedder of the dimension memory already uses keeps the existing table
+    ollama.dimension_hint = lambda: memory.dimension
+    # Importing lancedb and opening the table overlaps with the rest of startup
+    memory.connect_in_background()
+    startup.mark("clients ready")
 
     PROMPTS = {
         "ARCHITECT": (
@@ -82,6 +188,11 @@ def main():
             "You are the SCRIBE unit. Summarize the following terminal output into a concise summary. "
             "Highlight errors or key results. Keep it under 3 sentences."
         ),
+        "CONSOLIDATE": (
+            "You are the SCRIBE unit. The following are older memories of a terminal assistant, "
+            "separated by ---. Condense them into one short paragraph that keeps commands, paths, "
+            "errors and outcomes worth remembering. Output only the summary."
+        ),
         "SCOUT": (
             "You are the SCOUT unit. Analyze the following command for safety. "
             "If it is destructive (rm -rf, etc.) or highly risky, output 'RISK: [reason]'. "
@@ -103,141 +214,334 @@ def main():
 
     MAX_TURNS = 5
 
+    # Keeps each turn's prompt within --context-budget; the token estimate is calibrated
+    # from the GENERAL's prompt_eval_count and carries over between requests
+    context_window = ContextWindow(budget_tokens=args.context_budget)
+    # Directory listing, git state and host facts, gathered in-process and cached per cwd
+    environment = EnvironmentSnapshot()
+
+    # A daemon's terminal isn't the client's: its commands get no terminal and read /dev/null,
+    # so sudo and other prompts fail instead of waiting on the daemon's console
+    command_limits = OutputLimits(
+        timeout=args.cmd_timeout, max_bytes=int(args.max_output_mb * 1024 * 1024),
+        head_bytes=args.capture_kb * 512, tail_bytes=args.capture_kb * 512, interactive=not args.daemon
+    )
+    # Concurrent commands would interleave their output, so they print once finished
+    quiet_limits = OutputLimits(
+        timeout=command_limits.timeout, max_bytes=command_limits.max_bytes,
+        head_bytes=command_limits.head_bytes, tail_bytes=command_limits.tail_bytes, echo=False,
+        interactive=command_limits.interactive
+    )
+    command_pool = ThreadPoolExecutor(max_workers=args.parallel_commands) if args.parallel_commands > 1 else None
+
+    # Runs ARCHITECT delegations and SCOUT checks in the background, capped by --parallel
+    unit_pool = ThreadPoolExecutor(max_workers=max(1, args.parallel))
+
+    def delegate_to_architect(plan):
+        with tracer.span("ARCHITECT"):
+            arch_resp = ollama.generate(f"GENERAL's PLAN: {plan.strip()}", system_prompt=PROMPTS['ARCHITECT'], model=UNITS['ARCHITECT'])
+        arch_cmd_block = arch_resp['response']
+        arch_cmds = re.findall(r'```(?:bash|sh)\n(.*?)```', arch_cmd_block, re.DOTALL)
+        if arch_cmds:
+            return arch_cmds
+        # Fallback: if Architect didn't wrap in bash, take the whole thing
+        return [arch_cmd_block.strip()]
+
+    def scribe_generate(prompt):
+        return ollama.generate(prompt, system_prompt=PROMPTS['SCRIBE'], model=UNITS['SCRIBE'])['response']
+
+    # Large outputs are pre-filtered, then summarized chunk by chunk on the unit pool
+    summarizer = OutputSummarizer(scribe_generate, executor=unit_pool, budget_tokens=args.scribe_budget)
+
+    def scout_check(cmd):
+        with tracer.span("SCOUT", command=cmd):
+            return scout_verdict(cmd)
+
+    def scout_verdict(cmd):
+        # Known-safe and known-destructive commands are decided by rules; only ambiguous
+        # ones reach the SCOUT, and its verdicts are remembered
+        verdict, reason = classify(cmd)
+        if verdict is not None:
+            tracer.annotate(decided_by="rule")
+        if verdict == "SAFE":
+            return "SAFE"
+        if verdict == "RISK":
+            return f"RISK: {reason}"
+        key = normalize_command(cmd)
+        if verdict_cache is not None:
+            cached = verdict_cache.get(UNITS['SCOUT'], key)
+            if cached is not None:
+                tracer.annotate(decided_by="cache")
+                return cached
+        tracer.annotate(decided_by="llm")
+        scout_resp = ollama.generate(f"COMMAND: {cmd.strip()}", system_prompt=PROMPTS['SCOUT'], model=UNITS['SCOUT'])
+        result = scout_resp['response'].strip()
+        if verdict_cache is not None:
+            verdict_cache.put(UNITS['SCOUT'], key, result)
+        return result
+
+    def print_cache_stats():
+        if not args.cache_stats:
+            return
+        stats = ollama.embed_cache_stats()
+        if stats is not None:
+            print(
+                f"[embed cache] {stats['hits']} hits, {stats['misses']} misses "
+                f"({stats['hit_rate']:.0%} hit rate), {stats['entries']} entries, "
+                f"~{stats['saved_seconds']:.1f}s of embedding time saved"
+            )
+        conn = ollama.connection_stats()
+        print(
+            f"[http pool] {conn['requests']} requests over {conn['connections_opened']} connections "
+            f"({conn['connections_reused']} reused)"
+        )
+        if verdict_cache is not None:
+            verdicts = verdict_cache.stats()
+            print(f"[scout cache] {verdicts['hits']} hits, {verdicts['misses']} misses, {verdicts['entries']} entries")
+        res = residency.stats()
+        print(f"[residency] {', '.join(res['resident']) or 'nothing'} resident within {res['budget_mb']} MB")
+        mem = memory.stats()
+        if mem["table"] is not None:
+            print(
+                f"[memory] {mem['rows']} rows (+{mem['pending']} buffered) in {mem['fragments']} fragments, "
+                f"{mem['versions']} versions, {mem['dedup_hits']} duplicates folded, "
+                f"{mem['exact_hits']} exact-match lookups"
+            )
+
+    def print_startup_report():
+        if args.startup_report and "request done" not in dict(startup.marks):
+            startup.mark("request done")
+            print(startup.report(extra=[("memory connect", memory.connect_seconds)]))
+
+    def print_profile():
+        if not tracer.enabled:
+            return
+        spans = tracer.take()
+        if trace_writer is not None:
+            trace_writer.write(spans)
+        if args.profile:
+            print(waterfall(spans))
+
     def process_request(request, auto_confirm=False):
-        # 1. Get embedding for query
-        query_embedding = ollama.get_embeddings(request)
-        
-        # Sync model name in case of auto-fallback
-        memory.model_name = memory._sanitize_model_name(ollama.embed_model)
+        try:
+            with tracer.span("request"):
+                run_request(request, auto_confirm)
+        finally:
+            print_profile()
 
-        # 2. Retrieve relevant context
-        context_hits = memory.retrieve_context(query_embedding, top_k=3)
-        context_str = "\n".join([f"- {content}" for content, dist in context_hits if dist < 0.7])
+    def run_request(request, auto_confirm=False):
+        # 1. A stored row containing the request verbatim needs no embedding round trip;
+        # the request is then embedded with the rest of the memory rows at the end.
+        # While memory is still opening, the request is embedded alongside instead.
+        query_embedding = None
+        embedding_future = None if memory.is_ready() else unit_pool.submit(ollama.get_embeddings, request)
+        context_hits = memory.retrieve_exact(request, top_k=3)
+        if embedding_future is not None:
+            query_embedding = embedding_future.result()
+        if context_hits is None:
+            if query_embedding is None:
+                query_embedding = ollama.get_embeddings(request)
+
+            # Sync model name in case of auto-fallback
+            memory.set_model(ollama.embed_model)
+
+            # 2. Retrieve relevant context (vector search boosted by full-text matches)
+            context_hits = memory.retrieve_context(query_embedding, top_k=3, query_text=request)
+        context_str = "\n".join([f"- {content}" for content, dist in context_hits if dist < memory.hot_threshold])
+        startup.mark("memory context")
 
         # 3. Get system context
-        system_env = get_system_context()
+        with tracer.span("system context"):
+            system_env = environment.render()
 
-        # 4. Construct initial messages
-        messages = [
-            {"role": "system", "content": system_prompt_base + f"Context from Memory:\n{context_str or 'No relevant memory found.'}\n\n{system_env}"},
-            {"role": "user", "content": request}
-        ]
+        # 4. Construct initial messages; the session carries the GENERAL's context between turns
+        session = GenerateSession(
+            ollama, UNITS['GENERAL'],
+            system_prompt_base + f"Context from Memory:\n{context_str or 'No relevant memory found.'}\n\n{system_env}",
+            messages=[{"role": "user", "content": request}]
+        )
 
         current_auto_confirm = auto_confirm
+        # Memory rows are embedded together at the end of the request in one batch
+        pending_memories = []
 
         for turn in range(MAX_TURNS):
             # 5. Generate response (GENERAL)
             print(f"GENERAL ({UNITS['GENERAL']}) (Turn {turn+1}): ", end="", flush=True)
-            
-            prompt = ""
-            system_msg = ""
-            for msg in messages:
-                if msg["role"] == "system":
-                    system_msg = msg["content"]
-                elif msg["role"] == "user":
-                    prompt += f"\nUser: {msg['content']}\n"
-                elif msg["role"] == "assistant":
-                    prompt += f"\nAssistant: {msg['content']}\n"
-            prompt += "\nAssistant: "
+
+            # 6. Watch for PLAN blocks (Delegation to ARCHITECT) and direct bash blocks,
+            # dispatching each PLAN as soon as its fence closes
+            block_parser = BlockParser()
+            plan_futures = []
+            direct_cmds = []
+            direct_scouts = []
+
+            def handle_blocks(blocks):
+                for kind, body in blocks:
+                    if kind == "PLAN":
+                        plan_futures.append(unit_pool.submit(delegate_to_architect, body))
+                    else:
+                        # Direct bash blocks just in case Nemo does it anyway; SCOUT can start right away
+                        direct_cmds.append(body)
+                        direct_scouts.append(unit_pool.submit(scout_check, body))
+
+            if context_window.fit(session):
+                print(f"(older turns condensed to stay within {args.context_budget} tokens) ", end="", flush=True)
 
             try:
                 # Use GENERAL model
-                response_data = ollama.generate(prompt, system_prompt=system_msg, model=UNITS['GENERAL'])
+                with tracer.span("GENERAL", turn=turn + 1, model=UNITS['GENERAL']):
+                    for token in session.reply(stream=not args.no_stream):
+                        startup.mark("first GENERAL token")
+                        print(token, end="", flush=True)
+                        handle_blocks(block_parser.feed(token))
+                    print()
+                context_window.calibrate(session)
             except Exception as e:
                 print(f"Error communicating with AI: {e}")
                 break
             
-            full_response = response_data['response']
-            print(full_response)
-            messages.append({"role": "assistant", "content": full_response})
+            full_response = block_parser.text
 
-            # 6. Check for PLAN blocks (Delegation to ARCHITECT)
-            plans = re.findall(r'```PLAN\n(.*?)```', full_response, re.DOTALL)
-            
-            # Also check for direct bash blocks just in case Nemo does it anyway
-            direct_cmds = re.findall(r'```(?:bash|sh)\n(.*?)```', full_response, re.DOTALL)
-            
             cmds_to_run = []
+            scout_futures = []
 
-            # Delegate to ARCHITECT if plans exist
-            for plan in plans:
+            # Collect ARCHITECT results in the order the plans were written,
+            # fanning their SCOUT checks out as each one arrives
+            for future in plan_futures:
                 print(f"→ Delegating to ARCHITECT ({UNITS['ARCHITECT']})...")
-                arch_resp = ollama.generate(f"GENERAL's PLAN: {plan.strip()}", system_prompt=PROMPTS['ARCHITECT'], model=UNITS['ARCHITECT'], keep_alive=0)
-                arch_cmd_block = arch_resp['response']
-                arch_cmds = re.findall(r'```(?:bash|sh)\n(.*?)```', arch_cmd_block, re.DOTALL)
-                if arch_cmds:
-                    cmds_to_run.extend(arch_cmds)
-                else:
-                    # Fallback: if Architect didn't wrap in bash, take the whole thing
-                    cmds_to_run.append(arch_cmd_block.strip())
+                for cmd in future.result():
+                    cmds_to_run.append(cmd)
+                    scout_futures.append(unit_pool.submit(scout_check, cmd))
 
             # Add direct commands if any
             cmds_to_run.extend(direct_cmds)
+            scout_futures.extend(direct_scouts)
 
             if not cmds_to_run:
                 break
 
-            # 7. Scout Check
-            for cmd in list(cmds_to_run):
-                scout_resp = ollama.generate(f"COMMAND: {cmd.strip()}", system_prompt=PROMPTS['SCOUT'], model=UNITS['SCOUT'], keep_alive=0)
-                scout_eval = scout_resp['response'].strip()
+            # 7. Scout Check: wait for every verdict, then ask about risky ones in command order
+            scout_evals = [future.result() for future in scout_futures]
+            approved_cmds = []
+            for cmd, scout_eval in zip(cmds_to_run, scout_evals):
                 if "RISK" in scout_eval.upper():
                     print(f"→ SCOUT WARNING: {scout_eval}")
                     if not auto_confirm:
                         choice = input("Proceed anyway? (y/n): ").strip().lower()
                         if choice != 'y':
-                            cmds_to_run.remove(cmd)
                             continue
+                approved_cmds.append(cmd)
+            cmds_to_run = approved_cmds
 
             # Execute commands
             turn_outputs = []
             user_skipped = False
 
-            for cmd in cmds_to_run:
-                cmd_output, auto_confirm_now = run_command(cmd.strip(), auto_confirm=current_auto_confirm)
-                if auto_confirm_now:
-                    current_auto_confirm = True
-                
-                if "Command execution skipped by user" in cmd_output:
-                    user_skipped = True
+            # Consecutive read-only commands form one group when --parallel-commands is set;
+            # everything else is a group of one and runs in order
+            for group in group_independent([cmd.strip() for cmd in cmds_to_run], enabled=command_pool is not None):
+                # Confirm every command of the group before any of it runs
+                approved = []
+                for cmd in group:
+                    run, auto_confirm_now = confirm_command(cmd, auto_confirm=current_auto_confirm)
+                    if auto_confirm_now:
+                        current_auto_confirm = True
+                    if not run:
+                        user_skipped = True
+                        break
+                    approved.append(cmd)
+
+                if len(approved) > 1:
+                    outputs = execute_concurrently(approved, command_pool, quiet_limits, tracer)
+                else:
+                    outputs = [execute_command(cmd, command_limits, tracer) for cmd in approved]
+
+                for cmd_output in outputs:
+                    # 8. Scribe Summarization for large outputs
+                    if len(cmd_output.splitlines()) > 15:
+                        print(f"→ Large output. SCRIBE ({UNITS['SCRIBE']}) is summarizing...")
+                        with tracer.span("SCRIBE", chars=len(cmd_output)):
+                            summary = summarizer.summarize(cmd_output)
+                        cmd_output = f"SUMMARY OF LARGE OUTPUT:\n{summary}\n(Raw output was {len(cmd_output)} chars)"
+
+                    turn_outputs.append(cmd_output)
+                    pending_memories.append(("system", cmd_output))
+
+                if user_skipped:
                     break
-                
-                # 8. Scribe Summarization for large outputs
-                if len(cmd_output.splitlines()) > 15:
-                    print(f"→ Large output. SCRIBE ({UNITS['SCRIBE']}) is summarizing...")
-                    scribe_resp = ollama.generate(f"OUTPUT TO SUMMARIZE:\n{cmd_output}", system_prompt=PROMPTS['SCRIBE'], model=UNITS['SCRIBE'], keep_alive=0)
-                    summary = scribe_resp['response']
-                    cmd_output = f"SUMMARY OF LARGE OUTPUT:\n{summary}\n(Raw output was {len(cmd_output)} chars)"
-                
-                turn_outputs.append(cmd_output)
-                memory.store_interaction("system", cmd_output, ollama.get_embeddings(cmd_output))
 
             if user_skipped:
                 break
 
             if turn_outputs:
                 combined_output = "\n".join(turn_outputs)
-                messages.append({"role": "user", "content": f"Command output:\n{combined_output}\n\nPlease analyze and continue."})
+                session.add("user", f"Command output:\n{combined_output}\n\nPlease analyze and continue.")
             else:
                 break
 
-        # 7. Store final interaction to memory
-        response_embedding = ollama.get_embeddings(full_response)
-        memory.store_interaction("user", request, query_embedding)
-        memory.store_interaction("assistant", full_response, response_embedding)
+        # 7. Store command outputs and the final interaction to memory
+        pending_memories.append(("user", request))
+        pending_memories.append(("assistant", full_response))
+        with tracer.span("store", rows=len(pending_memories)):
+            embedded = {request: query_embedding} if query_embedding else {}
+            missing = list(dict.fromkeys(content for _, content in pending_memories if content not in embedded))
+            embedded.update(zip(missing, ollama.get_embeddings_batch(missing)))
+            memory.set_model(ollama.embed_model)
+            for role, content in pending_memories:
+                memory.store_interaction(role, content, embedded[content])
+        print_cache_stats()
+        print_startup_report()
 
-    # CLI Mode: "run [request]" or just [request]
-    if args.command:
-        # If the first word is 'run', we treat the rest as the request
-        if args.command[0] == 'run':
-            request = " ".join(args.command[1:])
-        else:
-            request = " ".join(args.command)
-        
-        if request:
-            process_request(request, auto_confirm=args.yes)
+    # Maintenance: copy memory from an older embed model's table in the foreground
+    if args.migrate_memory:
+        # Embedding once tells us the dimension, and so the target table
+        probe = ollama.get_embeddings("memory migration")
+        memory.set_model(ollama.embed_model)
+        memory.retrieve_context(probe, top_k=1)
+        migration = memory.migration or memory.start_migration(background=False)
+        if migration is None:
+            print("Nothing to migrate.")
+            return
+        migration.run(verbose=True)
+        return
+
+    # Maintenance: retention pass over the current memory table
+    if args.consolidate_memory:
+        if not memory.open_existing():
+            print("No memory table found for this embedding model.")
             return
 
+        from retention import MemoryConsolidator, RetentionPolicy
+
+        def condense(text):
+            resp = ollama.generate(f"MEMORIES:\n{text}", system_prompt=PROMPTS['CONSOLIDATE'], model=UNITS['SCRIBE'])
+            return resp['response']
+
+        policy = RetentionPolicy(max_age_days=args.retention_days, max_rows=args.max_memory_rows)
+        MemoryConsolidator(memory, condense, ollama.get_embeddings_batch, policy, executor=unit_pool).run(dry_run=args.dry_run)
+        return
+
+    # Maintenance: how well does the vector index track exact search?
+    if args.check_memory_index:
+        if not memory.open_existing():
+            print("No memory table found for this embedding model.")
+            return
+        report = memory.check_recall()
+        print(
+            f"{memory.table_name}: {report['rows']} rows, index={'yes' if report['indexed'] else 'no'}, "
+            f"recall@10 {report['recall']:.2%}, ANN {report['ann_ms']:.1f} ms vs exact {report['exact_ms']:.1f} ms"
+        )
+        return
+
+    if args.daemon:
+        serve(socket_path, process_request)
+        return
+
+    if request:
+        process_request(request, auto_confirm=args.yes)
+        return
+
     # Interactive Mode
     print(f"--- Terminal AI Agent Activated (Model: {args.model}) ---")
     print("Type 'exit' or 'quit' to end session.\n")
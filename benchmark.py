@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+import argparse
+import builtins
+import contextlib
+import functools
+import json
+import math
+import os
+import re
+import sys
+import tempfile
+import time
+
+STAGES = ("embed", "retrieve", "GENERAL", "ARCHITECT", "SCOUT", "exec", "SCRIBE", "store", "request")
+UNIT_RE = re.compile(r'You are the (\w+) unit')
+
+DEFAULT_REQUESTS = [
+    "count to forty",
+    "show me the numbers up to 40",
+    "print a sequence of forty numbers",
+    "list the numbers from one to forty",
+]
+
+def percentile(samples, p):
+    # Nearest-rank percentile
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(p / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+class StageTimer:
+    # Times pipeline stages by wrapping the methods that implement them; every call is
+    # one sample. Calls that overlap (SCOUT checks on the unit pool) each count in full.
+    def __init__(self):
+        self.samples = {stage: [] for stage in STAGES}
+        self.recording = True
+        self._patched = []
+
+    def record(self, stage, seconds):
+        if self.recording and stage:
+            self.samples.setdefault(stage, []).append(seconds)
+
+    def wrap(self, owner, name, stage):
+        # stage is a stage name, or a function of the call's arguments returning one (or None)
+        original = getattr(owner, name)
+        timer = self
+
+        @functools.wraps(original)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                timer.record(stage(*args, **kwargs) if callable(stage) else stage, time.perf_counter() - started)
+
+        setattr(owner, name, timed)
+        self._patched.append((owner, name, original))
+
+    def wrap_generator(self, owner, name, stage):
+        # Generators are timed until they are exhausted, not until they are created
+        original = getattr(owner, name)
+        timer = self
+
+        @functools.wraps(original)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                yield from original(*args, **kwargs)
+            finally:
+                timer.record(stage, time.perf_counter() - started)
+
+        setattr(owner, name, timed)
+        self._patched.append((owner, name, original))
+
+    def restore(self):
+        for owner, name, original in reversed(self._patched):
+            setattr(owner, name, original)
+        self._patched = []
+
+    def summary(self):
+        result = {}
+        for stage, samples in self.samples.items():
+            if samples:
+                result[stage] = {
+                    "calls": len(samples),
+                    "p50_ms": percentile(samples, 50) * 1000,
+                    "p95_ms": percentile(samples, 95) * 1000,
+                    "max_ms": max(samples) * 1000,
+                }
+        return result
+
+def helper_stage(self, prompt, system_prompt=None, **kwargs):
+    # ARCHITECT/SCOUT/SCRIBE calls are told apart by their system prompt; the GENERAL
+    # goes through GenerateSession.reply and is timed there
+    match = UNIT_RE.search(system_prompt or "")
+    if match and match.group(1) in ("ARCHITECT", "SCOUT", "SCRIBE"):
+        return match.group(1)
+    return None
+
+def instrument(timer):
+    import agent
+    from ollama_client import OllamaClient
+    from memory_manager import MemoryManager
+    from session import GenerateSession
+
+    timer.wrap(OllamaClient, "get_embeddings_batch", "embed")
+    timer.wrap(MemoryManager, "retrieve_exact", "retrieve")
+    timer.wrap(MemoryManager, "retrieve_context", "retrieve")
+    timer.wrap_generator(GenerateSession, "reply", "GENERAL")
+    timer.wrap(OllamaClient, "generate", helper_stage)
+    timer.wrap(agent, "run_streaming", "exec")
+    timer.wrap(MemoryManager, "store_interaction", "store")
+    return agent
+
+def run_agent(requests, endpoint, agent_args=(), warmup=0, verbose=False):
+    # Drives the agent's interactive loop in this process: each request is fed to
+    # process_request through input(), with every command auto-confirmed
+    timer = StageTimer()
+    agent = instrument(timer)
+    queue = list(requests)
+    state = {"index": -1, "started": None}
+
+    def feed(prompt=""):
+        if state["started"] is not None:
+            timer.record("request", time.perf_counter() - state["started"])
+            state["started"] = None
+        if not queue:
+            return "exit"
+        state["index"] += 1
+        timer.recording = state["index"] >= warmup
+        state["started"] = time.perf_counter()
+        return queue.pop(0)
+
+    argv = ["agent.py", "-y", "--no-daemon", "-e", endpoint] + list(agent_args)
+    saved_argv, saved_input = sys.argv, builtins.input
+    sys.argv, builtins.input = argv, feed
+    try:
+        with contextlib.ExitStack() as stack:
+            if not verbose:
+                stack.enter_context(contextlib.redirect_stdout(open(os.devnull, "w")))
+            agent.main()
+    finally:
+        sys.argv, builtins.input = saved_argv, saved_input
+        timer.restore()
+    return timer.summary()
+
+def format_report(summary, baseline=None):
+    lines = [f"{'stage':<10} {'calls':>6} {'p50 ms':>10} {'p95 ms':>10} {'max ms':>10}"]
+    for stage in STAGES:
+        row = summary.get(stage)
+        if row is None:
+            continue
+        line = f"{stage:<10} {row['calls']:>6} {row['p50_ms']:>10.1f} {row['p95_ms']:>10.1f} {row['max_ms']:>10.1f}"
+        if baseline and stage in baseline:
+            before = baseline[stage]["p50_ms"]
+            if before > 0:
+                line += f"   p50 {(row['p50_ms'] - before) / before:+.0%} vs baseline"
+        lines.append(line)
+    return "\n".join(lines)
+
+def regressions(summary, baseline, tolerance, min_ms=2.0):
+    # Stages whose p50 got slower than the baseline by more than tolerance (a fraction);
+    # differences under min_ms are timer noise on the fast stages
+    slower = []
+    for stage, row in summary.items():
+        before = baseline.get(stage)
+        if (before and row["p50_ms"] > before["p50_ms"] * (1 + tolerance)
+                and row["p50_ms"] - before["p50_ms"] > min_ms):
+            slower.append(stage)
+    return slower
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="End-to-end latency benchmark of the agent pipeline against a mock Ollama server. "
+                    "Unrecognized arguments are passed on to agent.py."
+    )
+    parser.add_argument("-n", "--iterations", type=int, default=3, help="Times to run the request set")
+    parser.add_argument("--requests-file", default=None, help="File with one request per line")
+    parser.add_argument("--warmup", type=int, default=1, help="Leading requests left out of the statistics")
+    parser.add_argument("--endpoint", default=None, help="Benchmark a real Ollama endpoint instead of the mock")
+    parser.add_argument("--tokens-per-second", type=float, default=80, help="Mock generation rate")
+    parser.add_argument("--prompt-tokens-per-second", type=float, default=2000, help="Mock prompt evaluation rate")
+    parser.add_argument("--load-seconds", type=float, default=0.5, help="Mock model load time")
+    parser.add_argument("--embed-seconds", type=float, default=0.01, help="Mock time per embedded input")
+    parser.add_argument("--replies", default=None, help="JSON file of canned replies by unit (GENERAL, GENERAL_DONE, ARCHITECT, SCOUT, SCRIBE)")
+    parser.add_argument("--keep-home", action="store_true", help="Use the real HOME (memory, caches) instead of a fresh temporary one")
+    parser.add_argument("--json", default=None, help="Write the results to this file")
+    parser.add_argument("--baseline", default=None, help="Results file of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p50 slowdown against the baseline before failing")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Show the agent's output")
+    args, agent_args = parser.parse_known_args()
+
+    if args.requests_file:
+        with open(args.requests_file) as f:
+            requests = [line.strip() for line in f if line.strip()]
+    else:
+        requests = DEFAULT_REQUESTS
+    requests = requests * args.iterations
+
+    # Memory, caches and commands stay out of the user's real directories
+    workdir = tempfile.mkdtemp(prefix="tc-bench-")
+    if not args.keep_home:
+        os.environ["HOME"] = workdir
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    cwd = os.getcwd()
+    os.chdir(workdir)
+
+    mock = None
+    endpoint = args.endpoint
+    if endpoint is None:
+        from mock_ollama import MockOllama
+        replies = None
+        if args.replies:
+            with open(args.replies) as f:
+                replies = json.load(f)
+        mock = MockOllama(
+            tokens_per_second=args.tokens_per_second, prompt_tokens_per_second=args.prompt_tokens_per_second,
+            load_seconds=args.load_seconds, embed_seconds=args.embed_seconds, replies=replies
+        ).start()
+        endpoint = mock.url
+
+    try:
+        summary = run_agent(requests, endpoint, agent_args, warmup=args.warmup, verbose=args.verbose)
+    finally:
+        os.chdir(cwd)
+        if mock is not None:
+            mock.stop()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["stages"]
+    print(f"--- Benchmark: {len(requests) - args.warmup} requests against {'mock Ollama' if mock else endpoint} ---")
+    print(format_report(summary, baseline))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"requests": len(requests), "warmup": args.warmup, "agent_args": agent_args, "stages": summary}, f, indent=2)
+
+    if baseline:
+        slower = regressions(summary, baseline, args.tolerance)
+        if slower:
+            print(f"Regression: p50 of {', '.join(slower)} more than {args.tolerance:.0%} slower than the baseline")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+import re
+
+# Same fences the agent has always looked for: ```PLAN for ARCHITECT delegation,
+# ```bash / ```sh for commands the GENERAL wrote itself
+BLOCK_RE = re.compile(r'```(PLAN|bash|sh)\n(.*?)```', re.DOTALL)
+
+class BlockParser:
+    # Incrementally picks closed code blocks out of a response while it streams in,
+    # so a PLAN can be handed to the ARCHITECT before the GENERAL has finished.
+    def __init__(self):
+        self.text = ""
+        self._scanned = 0 # Everything before this offset belongs to an already emitted block
+
+    def feed(self, chunk):
+        self.text += chunk
+        blocks = []
+        while True:
+            match = BLOCK_RE.search(self.text, self._scanned)
+            if not match:
+                break
+            kind = "PLAN" if match.group(1) == "PLAN" else "bash"
+            blocks.append((kind, match.group(2)))
+            self._scanned = match.end()
+        return blocks
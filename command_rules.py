@@ -0,0 +1,262 @@
+import os
+import re
+import shlex
+
+# Commands that only read system state. A set restricts the subcommand (first non-option
+# argument); None allows any arguments not listed in WRITING_ARGS.
+READ_ONLY_COMMANDS = {
+    "cat": None, "head": None, "tail": None, "grep": None, "egrep": None, "fgrep": None,
+    "wc": None, "cut": None, "tr": None, "uniq": None, "sort": None, "column": None,
+    "ls": None, "tree": None, "stat": None, "file": None, "find": None, "du": None, "df": None,
+    "readlink": None, "realpath": None, "basename": None, "dirname": None,
+    "md5sum": None, "sha1sum": None, "sha256sum": None,
+    "pwd": None, "echo": None, "which": None, "whoami": None, "id": None, "groups": None,
+    "uname": None, "uptime": None, "date": None, "nproc": None, "free": None, "w": None, "who": None,
+    "ps": None, "pgrep": None, "lsblk": None, "lscpu": None, "lspci": None, "lsusb": None, "lsof": None,
+    "ss": None, "netstat": None, "dig": None, "nslookup": None, "host": None,
+    "env": None, "printenv": None, "locale": None, "getent": None,
+    "journalctl": None, "dmesg": None, "last": None,
+    "ip": {"addr", "address", "a", "route", "r", "link", "l", "neigh", "n", "rule", "-br", "-s", "-4", "-6"},
+    "git": {"status", "log", "diff", "show", "rev-parse", "ls-files", "blame", "describe", "shortlog"},
+    "systemctl": {"status", "list-units", "list-unit-files", "list-timers", "is-active", "is-enabled", "is-failed", "show"},
+    "docker": {"ps", "images", "inspect", "logs", "version", "info", "stats"},
+}
+
+# Arguments that turn an otherwise read-only command into one that writes or never exits
+WRITING_ARGS = {
+    "tail": {"-f", "-F", "--follow"},
+    "find": {"-delete", "-exec", "-execdir", "-ok", "-okdir", "-fprint", "-fprint0", "-fprintf", "-fls"},
+    "sort": {"-o", "--output"},
+    "date": {"-s", "--set"},
+    "ip": {"set", "add", "del", "delete", "flush", "change", "replace", "append"},
+    "journalctl": {"-f", "--follow", "--rotate", "--vacuum-size", "--vacuum-time", "--vacuum-files", "--flush"},
+    "dmesg": {"-c", "-C", "--clear", "--read-clear"},
+    "docker": {"--rm"},
+    "git": {"--output"}, # git diff/log/show --output=FILE
+    "tree": {"-o"},
+    "env": None, # env CMD runs CMD; only bare env is a read
+}
+
+# Commands whose operands past this many name an output file ("uniq IN OUT"). Option
+# values count as operands too, which only errs toward asking the SCOUT.
+MAX_READ_OPERANDS = {"uniq": 1}
+
+# Programs flagged for the SCOUT whatever their arguments
+DESTRUCTIVE_COMMANDS = {
+    "mkfs": "formats a filesystem",
+    "mkswap": "formats a swap device",
+    "wipefs": "erases filesystem signatures",
+    "shred": "irrecoverably overwrites files",
+    "dd": "writes raw data to files or devices",
+    "fdisk": "edits partition tables",
+    "sfdisk": "edits partition tables",
+    "parted": "edits partition tables",
+    "sgdisk": "edits partition tables",
+    "shutdown": "powers the machine off",
+    "reboot": "reboots the machine",
+    "poweroff": "powers the machine off",
+    "halt": "halts the machine",
+}
+
+# Subcommand/flag combinations that throw work away
+DESTRUCTIVE_SUBCOMMANDS = {
+    ("git", "reset"): ({"--hard"}, "discards uncommitted changes"),
+    ("git", "clean"): ({"-f", "-fd", "-fdx", "-xdf", "--force"}, "deletes untracked files"),
+    ("git", "push"): ({"-f", "--force"}, "overwrites remote history"),
+    ("systemctl", "poweroff"): (None, "powers the machine off"),
+    ("systemctl", "reboot"): (None, "reboots the machine"),
+    ("systemctl", "halt"): (None, "halts the machine"),
+}
+
+# sudo options that start a root shell when no command follows
+SUDO_SHELL_OPTIONS = {"-i", "-s", "--login", "--shell"}
+SHELLS = {"sh", "bash", "zsh", "dash", "ksh", "fish", "python", "python3", "perl", "ruby"}
+RAW_DEVICE_PREFIXES = ("/dev/sd", "/dev/hd", "/dev/vd", "/dev/xvd", "/dev/nvme", "/dev/mmcblk", "/dev/disk")
+FORK_BOMB_RE = re.compile(r':\s*\(\s*\)\s*\{')
+
+SEPARATORS = {"|", "||", "&&", ";", "|&", "\n"}
+REDIRECTS = {">", ">>", "<", "&>", ">&", "<<", "<<<", ">|"}
+
+def tokenize(command):
+    # Shell words with operators (|, &&, ;, >, ...) as separate tokens; None if unparsable
+    if "`" in command or "$(" in command:
+        return None # Command substitution can run anything
+    # A backslash-newline continues the line, as in the shell; it isn't a separator
+    command = command.replace("\\\n", "")
+    # A newline ends a command just like ";", so it is an operator rather than whitespace;
+    # "#" is left as a word character so a comment can't swallow the line break after it
+    lexer = shlex.shlex(command, posix=True, punctuation_chars="();<>|&\n")
+    lexer.whitespace = " \t\r"
+    lexer.whitespace_split = True
+    lexer.commenters = ""
+    try:
+        raw = list(lexer)
+    except ValueError:
+        return None
+    tokens = []
+    for token in raw:
+        if "\n" in token and not token.strip("();<>|&\n"):
+            # Operator runs like "|\n" or "\n\n": split out each line break
+            for i, part in enumerate(token.split("\n")):
+                if i:
+                    tokens.append("\n")
+                if part:
+                    tokens.append(part)
+        else:
+            tokens.append(token)
+    return tokens
+
+def split_segments(tokens):
+    # Simple commands of a pipeline/list, e.g. "df -h | grep sda && free" -> 3 segments
+    segments = [[]]
+    for token in tokens:
+        if token in SEPARATORS:
+            segments.append([])
+        else:
+            segments[-1].append(token)
+    return [s for s in segments if s]
+
+def _writes(arg, writing):
+    # "--output=FILE" and "-oFILE" count as their option; short options may be clustered
+    if arg in writing or arg.split("=", 1)[0] in writing:
+        return True
+    if arg.startswith("-") and not arg.startswith("--"):
+        return any(len(opt) == 2 and opt[0] == "-" and opt[1] in arg[1:] for opt in writing)
+    return False
+
+def _segment_is_read_only(words):
+    name = words[0]
+    if "=" in name or name not in READ_ONLY_COMMANDS:
+        return False
+    args = words[1:]
+    writing = WRITING_ARGS.get(name, set())
+    if writing is None:
+        return not args
+    if any(_writes(arg, writing) for arg in args):
+        return False
+    if name in MAX_READ_OPERANDS and len([arg for arg in args if not arg.startswith("-")]) > MAX_READ_OPERANDS[name]:
+        return False
+    allowed = READ_ONLY_COMMANDS[name]
+    if allowed is not None:
+        sub = next((arg for arg in args if not arg.startswith("-")), None)
+        if sub is not None and sub not in allowed:
+            return False
+    return True
+
+def is_read_only(command):
+    # True when every part of the command only reads state: no redirection into files,
+    # no background jobs or subshells, no cd/export, and only known read-only programs
+    tokens = tokenize(command)
+    return bool(tokens) and _tokens_read_only(tokens)
+
+def _tokens_read_only(tokens):
+    words = []
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token == "<":
+            i += 2 # Reading a file is fine
+            continue
+        if token in REDIRECTS:
+            target = tokens[i + 1] if i + 1 < len(tokens) else ""
+            # 2>/dev/null and 2>&1 are fine, anything else may write a file
+            if not (target == "/dev/null" or (token == ">&" and target.isdigit())):
+                return False
+            if words and words[-1].isdigit():
+                words.pop() # The fd number belongs to the redirect
+            i += 2
+            continue
+        if token in ("&", "(", ")"):
+            return False
+        words.append(token)
+        i += 1
+    segments = split_segments(words)
+    return bool(segments) and all(_segment_is_read_only(segment) for segment in segments)
+
+def normalize_command(command):
+    # Key for cached SCOUT verdicts; only whitespace differences are folded
+    return " ".join(command.split())
+
+def _strip_sudo(words):
+    # "sudo -u www-data ls" -> ["ls"]
+    if not words or words[0] != "sudo":
+        return words
+    i = 1
+    while i < len(words) and words[i].startswith("-"):
+        i += 2 if words[i] in ("-u", "-g", "-C", "-p") else 1
+    return words[i:]
+
+def _sudo_shell(words):
+    # "sudo -i", "sudo -u root -s": sudo with only options opens a root shell
+    if not words or words[0] != "sudo" or _strip_sudo(words):
+        return False
+    return any(arg in SUDO_SHELL_OPTIONS or (arg[:1] == "-" and arg[1:2] != "-" and set(arg[1:]) & {"i", "s"})
+               for arg in words[1:])
+
+def _segment_risk(words):
+    if not words:
+        return None
+    name = os.path.basename(words[0])
+    if name.startswith("mkfs."):
+        name = "mkfs"
+    if name in DESTRUCTIVE_COMMANDS:
+        return f"{name} {DESTRUCTIVE_COMMANDS[name]}"
+    args = words[1:]
+    short_flags = "".join(arg[1:] for arg in args if arg.startswith("-") and not arg.startswith("--"))
+    if name == "rm" and ("r" in short_flags or "R" in short_flags or "f" in short_flags
+                         or "--recursive" in args or "--force" in args):
+        return "rm deletes recursively or without confirmation"
+    if name in ("chmod", "chown", "chgrp") and ("R" in short_flags or "--recursive" in args) and "/" in args:
+        return f"{name} recursively changes the whole filesystem"
+    sub = next((arg for arg in args if not arg.startswith("-")), None)
+    rule = DESTRUCTIVE_SUBCOMMANDS.get((name, sub))
+    if rule is not None:
+        flags, reason = rule
+        if flags is None or any(arg in flags for arg in args):
+            return f"{name} {sub} {reason}"
+    return None
+
+def classify(command):
+    # Rule-based SCOUT verdict: ("SAFE", None), ("RISK", reason), or (None, None) when
+    # the command is neither known-safe nor known-destructive and the LLM has to decide
+    if FORK_BOMB_RE.search(command):
+        return "RISK", "fork bomb"
+    tokens = tokenize(command)
+    if not tokens:
+        return None, None
+
+    for i, token in enumerate(tokens[:-1]):
+        if token in REDIRECTS and tokens[i + 1].startswith(RAW_DEVICE_PREFIXES):
+            return "RISK", "writes directly to a disk device"
+
+    segments = split_segments(tokens)
+    if any(_sudo_shell(segment) for segment in segments):
+        return "RISK", "sudo opens a root shell"
+    segments = [_strip_sudo(segment) for segment in segments]
+    for segment in segments:
+        reason = _segment_risk(segment)
+        if reason:
+            return "RISK", reason
+    names = [os.path.basename(segment[0]) for segment in segments if segment]
+    for i, name in enumerate(names):
+        if name in ("curl", "wget") and any(later in SHELLS for later in names[i + 1:]):
+            return "RISK", "pipes a download into a shell"
+
+    # sudo doesn't make a read-only command risky, it only rules out running it in parallel
+    if _tokens_read_only(_strip_sudo(tokens)):
+        return "SAFE", None
+    return None, None
+
+def group_independent(commands, enabled=True):
+    # Consecutive read-only commands form one group that can run concurrently; anything
+    # else is a group of its own so it runs alone and in order
+    groups = []
+    previous_read_only = False
+    for command in commands:
+        read_only = enabled and is_read_only(command)
+        if read_only and previous_read_only:
+            groups[-1].append(command)
+        else:
+            groups.append([command])
+        previous_read_only = read_only
+    return groups
@@ -0,0 +1,174 @@
+import codecs
+import os
+import selectors
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+class OutputLimits:
+    def __init__(self, timeout=600, max_bytes=64 * 1024 * 1024, head_bytes=8192, tail_bytes=8192, echo=True,
+                 interactive=True):
+        self.timeout = timeout # Wall-clock seconds before the command is killed (0/None: no limit)
+        self.max_bytes = max_bytes # Output read before the command is killed (0/None: no limit)
+        self.head_bytes = head_bytes # Kept from the start of each stream for the LLM
+        self.tail_bytes = tail_bytes # Kept from the end of each stream for the LLM
+        self.echo = echo # Print output as it arrives
+        self.interactive = interactive # Let the command prompt on our terminal (sudo); False reads /dev/null
+
+class BoundedCapture:
+    # First head_bytes plus a ring of the last tail_bytes; everything in between is only counted
+    def __init__(self, head_bytes, tail_bytes):
+        self.head_bytes = head_bytes
+        self.tail_bytes = tail_bytes
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.total = 0
+
+    def write(self, data):
+        self.total += len(data)
+        room = self.head_bytes - len(self.head)
+        if room > 0:
+            self.head += data[:room]
+            data = data[room:]
+        if data and self.tail_bytes:
+            self.tail += data
+            if len(self.tail) > self.tail_bytes:
+                del self.tail[:len(self.tail) - self.tail_bytes]
+
+    @property
+    def truncated(self):
+        return self.total - len(self.head) - len(self.tail)
+
+    def text(self):
+        head = self.head.decode("utf-8", "replace")
+        tail = self.tail.decode("utf-8", "replace")
+        if self.truncated:
+            return f"{head}\n[... {self.truncated} bytes truncated ...]\n{tail}"
+        return head + tail
+
+class CommandResult:
+    def __init__(self, command, exit_code, duration, stdout, stderr, timed_out=False, over_limit=False):
+        self.command = command
+        self.exit_code = exit_code
+        self.duration = duration
+        self.stdout = stdout # BoundedCapture
+        self.stderr = stderr # BoundedCapture
+        self.timed_out = timed_out
+        self.over_limit = over_limit
+
+    @property
+    def truncated_bytes(self):
+        return self.stdout.truncated + self.stderr.truncated
+
+    def summary(self):
+        text = f"exit {self.exit_code} after {self.duration:.2f}s"
+        if self.timed_out:
+            text += ", killed at the time limit"
+        if self.over_limit:
+            text += ", killed at the output limit"
+        if self.truncated_bytes:
+            text += f", {self.truncated_bytes} bytes truncated"
+        return text
+
+def _set_foreground(fd, pgid):
+    # Once the command's group owns the terminal we are in the background, and taking it
+    # back would stop us with SIGTTOU
+    previous = signal.signal(signal.SIGTTOU, signal.SIG_IGN)
+    try:
+        os.tcsetpgrp(fd, pgid)
+    except OSError:
+        pass
+    finally:
+        signal.signal(signal.SIGTTOU, previous)
+
+def _kill_group(process):
+    # The shell's pipeline and compound children share its process group
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+def run_streaming(command, limits=None):
+    # Runs a shell command, echoing stdout/stderr live while keeping a bounded copy of each.
+    # The command gets a process group of its own so a limit kills all of it; at an
+    # interactive terminal that group is made the foreground one so sudo can still prompt.
+    limits = limits or OutputLimits()
+    started = time.monotonic()
+    terminal = None
+    if (limits.interactive and threading.current_thread() is threading.main_thread()
+            and sys.stdin is not None and sys.stdin.isatty()):
+        terminal = sys.stdin.fileno()
+        process = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, process_group=0)
+        _set_foreground(terminal, process.pid)
+    else:
+        process = subprocess.Popen(
+            command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            stdin=None if limits.interactive else subprocess.DEVNULL, start_new_session=True
+        )
+    captures = {
+        process.stdout: BoundedCapture(limits.head_bytes, limits.tail_bytes),
+        process.stderr: BoundedCapture(limits.head_bytes, limits.tail_bytes),
+    }
+    # Chunks can end mid-character; decode incrementally for the live echo
+    decoders = {stream: codecs.getincrementaldecoder("utf-8")("replace") for stream in captures}
+    selector = selectors.DefaultSelector()
+    for stream in captures:
+        selector.register(stream, selectors.EVENT_READ)
+
+    def remaining():
+        if not limits.timeout:
+            return None
+        return limits.timeout - (time.monotonic() - started)
+
+    timed_out = over_limit = False
+    total = 0
+    at_line_start = True
+    try:
+        while selector.get_map() and not over_limit:
+            left = remaining()
+            if left is not None and left <= 0:
+                timed_out = True
+                break
+            for key, _ in selector.select(timeout=left):
+                data = os.read(key.fd, 65536)
+                if not data:
+                    selector.unregister(key.fileobj)
+                    continue
+                captures[key.fileobj].write(data)
+                total += len(data)
+                if limits.echo:
+                    sys.stdout.write(decoders[key.fileobj].decode(data))
+                    sys.stdout.flush()
+                    at_line_start = data.endswith(b"\n")
+                if limits.max_bytes and total > limits.max_bytes:
+                    over_limit = True
+                    break
+
+        if not timed_out and not over_limit:
+            # Both pipes are closed but the process may still be running
+            try:
+                process.wait(timeout=remaining())
+            except subprocess.TimeoutExpired:
+                timed_out = True
+    except KeyboardInterrupt:
+        _kill_group(process)
+        process.wait()
+        raise
+    finally:
+        selector.close()
+        if timed_out or over_limit:
+            _kill_group(process)
+        for stream in captures:
+            stream.close()
+        if terminal is not None:
+            _set_foreground(terminal, os.getpgrp())
+
+    exit_code = process.wait()
+    if not at_line_start:
+        print()
+    return CommandResult(
+        command, exit_code, time.monotonic() - started,
+        captures[process.stdout], captures[process.stderr], timed_out, over_limit
+    )
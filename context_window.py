@@ -0,0 +1,83 @@
+MESSAGE_OVERHEAD_TOKENS = 4 # Role prefix and newlines added by GenerateSession.render
+DIGEST_CHARS = 240
+
+def digest(message):
+    # One-line stand-in for an older message: command output headers (exit code, duration)
+    # with the first line under each, or the start of an assistant reply
+    lines = [line.strip() for line in message["content"].splitlines() if line.strip()]
+    if message["role"] == "user":
+        kept = []
+        for i, line in enumerate(lines):
+            if line.startswith(("Command Output", "SUMMARY OF", "Execution failed")):
+                kept.append(line)
+                if i + 1 < len(lines):
+                    kept.append(lines[i + 1])
+        text = " | ".join(kept) or " ".join(lines)
+        prefix = "[Earlier command output, condensed] "
+    else:
+        text = " ".join(lines)
+        prefix = "[Earlier reply, condensed] "
+    if len(text) > DIGEST_CHARS:
+        text = text[:DIGEST_CHARS] + "..."
+    return prefix + text
+
+class ContextWindow:
+    # Keeps a GenerateSession's transcript inside a token budget. Tokens are estimated
+    # from characters, with the ratio calibrated against Ollama's prompt_eval_count on
+    # full replays. Over budget, older command outputs and then older replies are
+    # replaced by one-line digests; the system prompt, the request and the last turn
+    # stay as they are unless nothing else is left to shrink.
+    def __init__(self, budget_tokens=3072, chars_per_token=4.0):
+        self.budget_tokens = budget_tokens
+        self.chars_per_token = chars_per_token
+        self.compactions = 0
+
+    def count(self, text):
+        return int(len(text) / self.chars_per_token) + 1
+
+    def total(self, session):
+        return self.count(session.system_prompt or "") + sum(
+            self.count(m["content"]) + MESSAGE_OVERHEAD_TOKENS for m in session.messages
+        )
+
+    def calibrate(self, session):
+        # Only replays send the whole prompt; a delta's prompt_eval_count says little about its text
+        chars = session.last_prompt_chars
+        evaluated = session.last_response.get("prompt_eval_count")
+        if not chars or not evaluated:
+            return
+        observed = chars / evaluated
+        # A much higher ratio usually means Ollama reused cached prompt tokens
+        if 2.0 <= observed <= 6.0:
+            self.chars_per_token = 0.7 * self.chars_per_token + 0.3 * observed
+
+    def fit(self, session):
+        # Returns True if the transcript had to be compacted
+        if self.total(session) <= self.budget_tokens:
+            return False
+
+        messages = session.messages
+        # messages[0] is the request, the last two are the latest reply and its command output
+        older = range(1, max(1, len(messages) - 2))
+        for role in ("user", "assistant"):
+            for i in older:
+                if self.total(session) <= self.budget_tokens:
+                    break
+                if messages[i]["role"] == role and not messages[i]["content"].startswith("[Earlier"):
+                    messages[i] = {"role": role, "content": digest(messages[i])}
+
+        over = self.total(session) - self.budget_tokens
+        if over > 0:
+            # Still too big: cut the middle out of the longest remaining message
+            i = max(range(len(messages)), key=lambda j: len(messages[j]["content"]))
+            content = messages[i]["content"]
+            keep = max(0, len(content) - int((over + 16) * self.chars_per_token))
+            messages[i] = {
+                "role": messages[i]["role"],
+                "content": f"{content[:keep // 2]}\n[... truncated to fit the context window ...]\n{content[len(content) - keep // 2:]}"
+            }
+
+        # The carried context still holds the old text; the next reply has to replay
+        session.invalidate()
+        self.compactions += 1
+        return True
@@ -0,0 +1,174 @@
+import io
+import json
+import os
+import socket
+import struct
+import sys
+
+# Frames are newline-delimited JSON objects:
+#   client -> daemon  {"type": "request", "request", "yes", "cwd", "env"}, then one
+#                     {"type": "input", "data", "eof"} per input frame received
+#   daemon -> client  {"type": "out", "data"}, {"type": "input"} when a prompt needs
+#                     a line, {"type": "done", "status"} once the request is finished
+
+def default_socket_path():
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or os.path.expanduser("~/.cache/terminal-companion")
+    return os.path.join(runtime_dir, "terminal-companion.sock")
+
+def _send(conn, frame):
+    conn.sendall(json.dumps(frame).encode("utf-8") + b"\n")
+
+class _FrameWriter(io.TextIOBase):
+    # Stands in for sys.stdout while a client's request runs
+    def __init__(self, conn):
+        self.conn = conn
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        if text:
+            _send(self.conn, {"type": "out", "data": text})
+        return len(text)
+
+class _FrameReader(io.TextIOBase):
+    # Stands in for sys.stdin: input() writes its prompt to sys.stdout, then reads here
+    def __init__(self, conn, frames):
+        self.conn = conn
+        self.frames = frames
+
+    def readable(self):
+        return True
+
+    def readline(self, size=-1):
+        _send(self.conn, {"type": "input"})
+        line = self.frames.readline()
+        if not line:
+            return ""
+        frame = json.loads(line)
+        if frame.get("eof"):
+            return ""
+        return frame.get("data", "") + "\n"
+
+def _peer_uid(conn):
+    # Uid of the connected client, or None where SO_PEERCRED isn't available
+    if not hasattr(socket, "SO_PEERCRED"):
+        return None
+    creds = conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+    return struct.unpack("3i", creds)[1]
+
+def _serve_connection(conn, handle):
+    # The daemon runs commands as this user, so nobody else may submit requests
+    uid = _peer_uid(conn)
+    if uid is not None and uid != os.getuid():
+        print(f"Warning: Refused a daemon connection from uid {uid}")
+        _send(conn, {"type": "out", "data": "This agent daemon belongs to another user.\n"})
+        _send(conn, {"type": "done", "status": 1})
+        return
+
+    frames = conn.makefile("r", encoding="utf-8")
+    line = frames.readline()
+    frame = json.loads(line) if line else None
+    if not frame or frame.get("type") != "request":
+        return
+
+    saved_stdio = (sys.stdout, sys.stdin)
+    saved_cwd = os.getcwd()
+    saved_env = dict(os.environ)
+    status = 0
+    sys.stdout = _FrameWriter(conn)
+    sys.stdin = _FrameReader(conn, frames)
+    try:
+        # Commands run where, and with the environment in which, the client was started
+        os.chdir(frame.get("cwd") or saved_cwd)
+        os.environ.clear()
+        os.environ.update(frame.get("env") or saved_env)
+        handle(frame["request"], frame.get("yes", False))
+    except (BrokenPipeError, ConnectionResetError):
+        # Client went away (e.g. Ctrl-C); nothing left to report to
+        status = 1
+    except Exception as e:
+        status = 1
+        try:
+            print(f"\nError: {e}")
+        except OSError:
+            pass
+    finally:
+        sys.stdout, sys.stdin = saved_stdio
+        os.chdir(saved_cwd)
+        os.environ.clear()
+        os.environ.update(saved_env)
+    try:
+        _send(conn, {"type": "done", "status": status})
+    except OSError:
+        pass
+
+def serve(socket_path, handle):
+    # Runs handle(request, auto_confirm) for each client, one request at a time;
+    # clients that connect meanwhile wait in the listen backlog
+    if os.path.exists(socket_path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(socket_path)
+            print(f"An agent daemon is already listening on {socket_path}")
+            return
+        except OSError:
+            os.unlink(socket_path) # Left behind by a daemon that died
+        finally:
+            probe.close()
+    os.makedirs(os.path.dirname(socket_path) or ".", mode=0o700, exist_ok=True)
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    # Created 0600 from the start; a chmod after bind leaves a window for other users
+    previous_umask = os.umask(0o177)
+    try:
+        server.bind(socket_path)
+    finally:
+        os.umask(previous_umask)
+    server.listen(16)
+    print(f"Agent daemon listening on {socket_path}")
+    try:
+        while True:
+            conn, _ = server.accept()
+            with conn:
+                try:
+                    _serve_connection(conn, handle)
+                except (OSError, ValueError) as e:
+                    print(f"Warning: Daemon connection failed: {e}")
+    except KeyboardInterrupt:
+        print("\nDaemon stopped.")
+    finally:
+        server.close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+def forward_request(socket_path, request, auto_confirm=False):
+    # Client side: returns the daemon's exit status, or None when no daemon is listening
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.connect(socket_path)
+    except OSError:
+        conn.close()
+        return None
+
+    with conn:
+        _send(conn, {
+            "type": "request",
+            "request": request,
+            "yes": auto_confirm,
+            "cwd": os.getcwd(),
+            "env": dict(os.environ),
+        })
+        frames = conn.makefile("r", encoding="utf-8")
+        for line in frames:
+            frame = json.loads(line)
+            if frame["type"] == "out":
+                sys.stdout.write(frame["data"])
+                sys.stdout.flush()
+            elif frame["type"] == "input":
+                answer = sys.stdin.readline()
+                _send(conn, {"type": "input", "data": answer.rstrip("\n"), "eof": not answer})
+            elif frame["type"] == "done":
+                return frame.get("status", 0)
+    # Daemon closed the connection mid-request
+    return 1
@@ -0,0 +1,82 @@
+import hashlib
+import time
+from array import array
+from sqlite_cache import SqliteCache
+
+class EmbeddingCache(SqliteCache):
+    # On-disk LRU cache of embedding vectors keyed by (embed_model, sha256(content)).
+    # Each entry remembers how long the original round trip took so hits can be
+    # reported as saved model time.
+    table = "embeddings"
+
+    def __init__(self, path="~/.cache/terminal-companion/embeddings.db", max_entries=20000):
+        self.max_entries = max_entries
+        self.saved_seconds = 0.0
+        super().__init__(path)
+        self._count = self._entries()
+
+    def _create_schema(self):
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, digest TEXT NOT NULL, vector BLOB NOT NULL, "
+            "cost REAL NOT NULL DEFAULT 0, last_used REAL NOT NULL, "
+            "PRIMARY KEY (model, digest))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings(last_used)")
+
+    @staticmethod
+    def _digest(text):
+        return hashlib.sha256(text.encode("utf-8", "surrogatepass")).hexdigest()
+
+    def get(self, model, text):
+        digest = self._digest(text)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT vector, cost FROM embeddings WHERE model = ? AND digest = ?",
+                (model, digest)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.saved_seconds += row[1]
+            self._conn.execute(
+                "UPDATE embeddings SET last_used = ? WHERE model = ? AND digest = ?",
+                (time.time(), model, digest)
+            )
+            self._conn.commit()
+        return array("d", row[0]).tolist()
+
+    def put(self, model, text, vector, cost=0.0):
+        if not vector:
+            return
+        blob = array("d", vector).tobytes()
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT OR REPLACE INTO embeddings (model, digest, vector, cost, last_used) VALUES (?, ?, ?, ?, ?)",
+                (model, self._digest(text), blob, cost, time.time())
+            )
+            # INSERT OR REPLACE reports 1 either way, so recount only when we might be over
+            self._count += cur.rowcount
+            if self._count > self.max_entries:
+                self._count = self._entries()
+                overflow = self._count - self.max_entries
+                if overflow > 0:
+                    # Evict least recently used entries
+                    self._conn.execute(
+                        "DELETE FROM embeddings WHERE rowid IN "
+                        "(SELECT rowid FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                        (overflow,)
+                    )
+                    self._count -= overflow
+            self._conn.commit()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "entries": self._count,
+            "saved_seconds": self.saved_seconds,
+        }
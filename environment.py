@@ -0,0 +1,262 @@
+import hashlib
+import os
+import shutil
+import stat
+import struct
+import threading
+import time
+
+def _git_varint(data, pos):
+    # Offset encoding used by index v4 path compression
+    c = data[pos]
+    pos += 1
+    value = c & 0x7f
+    while c & 0x80:
+        c = data[pos]
+        pos += 1
+        value = ((value + 1) << 7) | (c & 0x7f)
+    return value, pos
+
+def read_git_index(path):
+    # Yields (path, mtime_s, mtime_ns, size, mode, object id) for each entry of a v2-v4 index
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:4] != b"DIRC":
+        return
+    version, count = struct.unpack(">II", data[4:12])
+    if version not in (2, 3, 4):
+        return
+    pos = 12
+    previous = b""
+    for _ in range(count):
+        start = pos
+        _, _, mtime_s, mtime_ns, _, _, mode, _, _, size = struct.unpack(">10I", data[pos:pos + 40])
+        oid = data[pos + 40:pos + 60].hex()
+        pos += 60
+        flags, = struct.unpack(">H", data[pos:pos + 2])
+        pos += 2
+        skip = False
+        if version >= 3 and flags & 0x4000:
+            extended, = struct.unpack(">H", data[pos:pos + 2])
+            pos += 2
+            skip = bool(extended & 0x4000) # skip-worktree
+        if flags & 0x8000:
+            skip = True # assume-unchanged
+        if version == 4:
+            strip, pos = _git_varint(data, pos)
+            end = data.index(b"\0", pos)
+            name = previous[:len(previous) - strip] + data[pos:end]
+            pos = end + 1
+        else:
+            end = data.index(b"\0", pos)
+            name = data[pos:end]
+            # Entries are NUL-padded to a multiple of 8 bytes
+            pos = start + ((end - start) // 8 + 1) * 8
+        previous = name
+        if not skip:
+            yield name.decode("utf-8", "surrogateescape"), mtime_s, mtime_ns, size, mode, oid
+
+class EnvironmentSnapshot:
+    # In-process replacement for shelling out to `ls`: directory listing via scandir,
+    # git branch and whether the work tree is dirty from .git, and host load/memory/disk.
+    # Listings are cached per directory until its mtime changes, host facts for host_ttl
+    # seconds. A dirty work tree stays dirty until HEAD or the index change; a clean one
+    # is re-checked after git_ttl seconds.
+    def __init__(self, max_files=20, host_ttl=5.0, git_ttl=5.0, max_git_entries=20000, max_hash_bytes=1 << 20):
+        self.max_files = max_files
+        self.host_ttl = host_ttl
+        self.git_ttl = git_ttl
+        self.max_git_entries = max_git_entries # Larger repos skip the dirty check
+        self.max_hash_bytes = max_hash_bytes # Larger files with a new mtime count as changed unhashed
+        self._listings = {} # cwd -> (mtime_ns, lines, total)
+        self._git_indexes = {} # index path -> (mtime_ns, entries)
+        self._git_dirty = {} # git dir -> ((HEAD, index mtime_ns), dirty, checked at)
+        self._host = (0.0, None)
+        self._lock = threading.Lock()
+
+    def listing(self, cwd):
+        mtime = os.stat(cwd).st_mtime_ns
+        cached = self._listings.get(cwd)
+        if cached and cached[0] == mtime:
+            return cached[1], cached[2]
+        entries = []
+        with os.scandir(cwd) as it:
+            for entry in it:
+                # Same markers and hidden files as ls -F
+                if entry.is_symlink():
+                    suffix = "@"
+                elif entry.is_dir():
+                    suffix = "/"
+                elif entry.is_file() and entry.stat().st_mode & 0o111:
+                    suffix = "*"
+                else:
+                    suffix = ""
+                if not entry.name.startswith("."):
+                    entries.append(entry.name + suffix)
+        entries.sort()
+        lines = entries[:self.max_files]
+        self._listings[cwd] = (mtime, lines, len(entries))
+        return lines, len(entries)
+
+    @staticmethod
+    def _find_git_dir(cwd):
+        path = cwd
+        while True:
+            candidate = os.path.join(path, ".git")
+            if os.path.isdir(candidate):
+                return path, candidate
+            if os.path.isfile(candidate):
+                # Worktrees and submodules: ".git" is a file pointing at the real directory
+                with open(candidate) as f:
+                    line = f.readline().strip()
+                if line.startswith("gitdir:"):
+                    return path, os.path.normpath(os.path.join(path, line[len("gitdir:"):].strip()))
+                return None, None
+            parent = os.path.dirname(path)
+            if parent == path:
+                return None, None
+            path = parent
+
+    def _index_entries(self, git_dir):
+        index = os.path.join(git_dir, "index")
+        try:
+            mtime = os.stat(index).st_mtime_ns
+        except OSError:
+            return []
+        cached = self._git_indexes.get(index)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        try:
+            entries = list(read_git_index(index) or [])
+        except (OSError, ValueError, struct.error):
+            entries = None
+        self._git_indexes[index] = (mtime, entries)
+        return entries
+
+    def git_state(self, cwd):
+        # Returns (branch, True/False for a dirty work tree or None when unknown), or None
+        # outside a repo
+        root, git_dir = self._find_git_dir(cwd)
+        if git_dir is None:
+            return None
+        try:
+            with open(os.path.join(git_dir, "HEAD")) as f:
+                head = f.read().strip()
+        except OSError:
+            return None
+        if head.startswith("ref: refs/heads/"):
+            branch = head[len("ref: refs/heads/"):]
+        else:
+            branch = f"detached at {head[:8]}"
+
+        try:
+            key = (head, os.stat(os.path.join(git_dir, "index")).st_mtime_ns)
+        except OSError:
+            return branch, None
+        cached = self._git_dirty.get(git_dir)
+        if cached and cached[0] == key and (cached[1] or time.time() - cached[2] < self.git_ttl):
+            return branch, cached[1]
+        dirty = self._work_tree_dirty(root, git_dir)
+        self._git_dirty[git_dir] = (key, dirty, time.time())
+        return branch, dirty
+
+    def _work_tree_dirty(self, root, git_dir):
+        # The index parser assumes 20-byte SHA-1 object ids
+        try:
+            with open(os.path.join(git_dir, "config")) as f:
+                sha256 = "objectformat = sha256" in f.read().lower()
+        except OSError:
+            sha256 = False
+        entries = None if sha256 else self._index_entries(git_dir)
+        if entries is None or len(entries) > self.max_git_entries:
+            return None
+        for path, mtime_s, mtime_ns, size, mode, oid in entries:
+            if stat.S_IFMT(mode) == 0o160000:
+                continue # Submodule
+            full_path = os.path.join(root, path)
+            try:
+                st = os.lstat(full_path)
+            except OSError:
+                return True # Deleted
+            # Same stat comparison git does; only small files it can't vouch for get hashed
+            if (int(st.st_mtime) == mtime_s and st.st_size & 0xffffffff == size
+                    and (not mtime_ns or st.st_mtime_ns % 1000000000 == mtime_ns)):
+                continue
+            if (st.st_size & 0xffffffff != size or not stat.S_ISREG(st.st_mode)
+                    or st.st_size > self.max_hash_bytes or not self._same_blob(full_path, oid)):
+                return True
+        return False
+
+    @staticmethod
+    def _same_blob(path, oid):
+        try:
+            with open(path, "rb") as f:
+                content = f.read()
+        except OSError:
+            return False
+        return hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest() == oid
+
+    def host_facts(self, cwd):
+        now = time.time()
+        if self._host[1] is not None and now - self._host[0] < self.host_ttl:
+            facts = dict(self._host[1])
+        else:
+            facts = {}
+            try:
+                facts["load"] = os.getloadavg()
+            except OSError:
+                pass
+            try:
+                meminfo = {}
+                with open("/proc/meminfo") as f:
+                    for line in f:
+                        key, value = line.split(":", 1)
+                        meminfo[key] = int(value.split()[0]) * 1024
+                facts["mem_total"] = meminfo["MemTotal"]
+                facts["mem_available"] = meminfo.get("MemAvailable", meminfo.get("MemFree", 0))
+            except (OSError, KeyError, ValueError):
+                pass
+            self._host = (now, facts)
+            facts = dict(facts)
+        # Disk usage depends on the directory, and statvfs is cheap
+        try:
+            usage = shutil.disk_usage(cwd)
+            facts["disk_free"], facts["disk_total"] = usage.free, usage.total
+        except OSError:
+            pass
+        return facts
+
+    def render(self, cwd=None):
+        try:
+            cwd = cwd or os.getcwd()
+            with self._lock:
+                files, total = self.listing(cwd)
+                git = self.git_state(cwd)
+                host = self.host_facts(cwd)
+        except Exception as e:
+            return f"Error gathering system context: {e}"
+
+        gb = 1024 ** 3
+        host_parts = []
+        if "load" in host:
+            host_parts.append("load " + " ".join(f"{x:.2f}" for x in host["load"]))
+        if "mem_total" in host:
+            host_parts.append(f"memory {host['mem_available'] / gb:.1f} of {host['mem_total'] / gb:.1f} GB available")
+        if "disk_total" in host:
+            host_parts.append(f"disk {host['disk_free'] / gb:.1f} of {host['disk_total'] / gb:.1f} GB free")
+        if git is None:
+            git_line = "not a repository"
+        elif git[1] is None:
+            git_line = f"branch {git[0]}"
+        else:
+            git_line = f"branch {git[0]}, {'uncommitted changes' if git[1] else 'clean'}"
+        more = f" of {total}" if total > len(files) else ""
+        return (
+            f"--- System Environment ---\n"
+            f"User: {os.getenv('USER', 'unknown')}\n"
+            f"Current Directory: {cwd}\n"
+            f"Git: {git_line}\n"
+            f"Host: {', '.join(host_parts) or 'unknown'}\n"
+            f"Files in CWD (top {len(files)}{more}):\n" + "\n".join(files) + "\n"
+            f"---------------------------\n"
+        )
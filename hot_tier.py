@@ -0,0 +1,121 @@
+import json
+import os
+import numpy as np
+
+class HotTier:
+    # Ring buffer of the most recent memories kept next to LanceDB: an L2-normalized
+    # float32 matrix memory-mapped from disk plus a JSON-lines journal of the rows.
+    # Cosine top-k is a single matmul + argpartition, no query planning. Saving appends
+    # only what changed; the journal is rewritten once it outgrows the tier a few times.
+    def __init__(self, path_prefix, dimension, capacity=512, journal_factor=4):
+        self.dimension = dimension
+        self.capacity = capacity
+        self.journal_factor = journal_factor
+        self._vectors_path = f"{path_prefix}.f32"
+        self._rows_path = f"{path_prefix}.jsonl"
+        os.makedirs(os.path.dirname(path_prefix) or ".", exist_ok=True)
+
+        self.rows = [None] * capacity
+        self.next = 0
+        self.count = 0
+        self._changes = [] # Journal records not written yet
+        self._journal_lines = 0
+        if os.path.exists(self._vectors_path) and self._load():
+            self.vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, dimension))
+            self._rewrite = False
+        else:
+            self.rows = [None] * capacity
+            self.next = 0
+            self.count = 0
+            self.vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="w+", shape=(capacity, dimension))
+            self._rewrite = True
+
+    def _load(self):
+        # Replays the journal: a header with the ring position, then one record per change
+        try:
+            with open(self._rows_path) as f:
+                header = json.loads(f.readline())
+                if header.get("dimension") != self.dimension or header.get("capacity") != self.capacity:
+                    return False
+                self.next, self.count = header["next"], header["count"]
+                self._journal_lines = 1
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break # Cut short by a crash mid-append
+                    slot = record["slot"]
+                    self.rows[slot] = record["row"]
+                    if record.get("add"):
+                        self.next = (slot + 1) % self.capacity
+                        self.count = min(self.count + 1, self.capacity)
+                    self._journal_lines += 1
+        except (OSError, ValueError, KeyError):
+            return False
+        return True
+
+    def add(self, vector, role, content, timestamp):
+        v = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(v)
+        if v.shape != (self.dimension,) or norm == 0:
+            return
+        slot = self.next
+        self.vectors[slot] = v / norm
+        self.rows[slot] = {"role": role, "content": content, "timestamp": timestamp}
+        self.next = (slot + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        self._changes.append({"slot": slot, "row": self.rows[slot], "add": True})
+
+    def touch(self, role, content, timestamp, new_timestamp):
+        # Follows a duplicate bump in LanceDB, so both tiers key the row the same way
+        for i, row in enumerate(self.rows):
+            if row is not None and (row["role"], row["content"], row["timestamp"]) == (role, content, timestamp):
+                row["timestamp"] = new_timestamp
+                self._changes.append({"slot": i, "row": row})
+
+    def discard(self, keys):
+        # Drop rows by (content, timestamp), e.g. after retention deleted them from LanceDB
+        for i, row in enumerate(self.rows):
+            if row is not None and (row["content"], row["timestamp"]) in keys:
+                self.rows[i] = None
+                self.vectors[i] = 0.0
+                self._changes.append({"slot": i, "row": None})
+        self.save()
+
+    def search(self, query, top_k=5):
+        # Returns [(row, cosine distance)] best first
+        if self.count == 0:
+            return []
+        q = np.asarray(query, dtype=np.float32)
+        norm = np.linalg.norm(q)
+        if q.shape != (self.dimension,) or norm == 0:
+            return []
+        sims = self.vectors[:self.count] @ (q / norm)
+        k = min(top_k, self.count)
+        top = np.argpartition(-sims, k - 1)[:k]
+        top = top[np.argsort(-sims[top])]
+        return [(self.rows[i], float(1.0 - sims[i])) for i in top if self.rows[i] is not None]
+
+    def save(self):
+        if not self._changes and not self._rewrite:
+            return
+        self.vectors.flush()
+        if self._rewrite or self._journal_lines + len(self._changes) > self.journal_factor * self.capacity:
+            tmp = f"{self._rows_path}.tmp"
+            with open(tmp, "w") as f:
+                header = {"dimension": self.dimension, "capacity": self.capacity, "next": self.next, "count": self.count}
+                f.write(json.dumps(header) + "\n")
+                lines = 1
+                for slot, row in enumerate(self.rows):
+                    if row is not None:
+                        f.write(json.dumps({"slot": slot, "row": row}) + "\n")
+                        lines += 1
+            os.replace(tmp, self._rows_path)
+            self._journal_lines = lines
+            self._rewrite = False
+        else:
+            with open(self._rows_path, "a") as f:
+                for change in self._changes:
+                    f.write(json.dumps(change) + "\n")
+            self._journal_lines += len(self._changes)
+        self._changes = []
@@ -1,73 +1,667 @@
-import lancedb
+import atexit
 import json
-import numpy as np
+import math
 import os
-import pandas as pd
+import random
+import threading
+import time
+from datetime import timedelta
+from migration import EmbeddingMigration
+from tracing import NULL_TRACER, traced
+
+# lancedb (with pyarrow) and numpy are imported on first use: together they are most
+# of the agent's startup time and a one-shot request may not touch memory before the
+# first GENERAL call
 
 class MemoryManager:
-    def __init__(self, db_path="~/.lancedb", model_name="default", dimension=None):
+    def __init__(self, db_path="~/.lancedb", model_name="default", dimension=None,
+                 flush_size=32, flush_interval=30.0, compact_fragments=32, keep_versions_for=timedelta(hours=1),
+                 index_min_rows=5000, index_type="IVF_PQ", nprobes=20, refine_factor=10, reindex_growth=2.0,
+                 hot_tier_size=0, hot_threshold=0.7, migrate_in_background=True,
+                 dedup_threshold=0.97, dedup_roles=("system",),
+                 fts_weight=0.5, fts_saturation=1.0, exact_min_chars=8, exact_min_coverage=0.5,
+                 exact_roles=("system", "assistant"), tracer=None):
         self.db_path = os.path.expanduser(db_path)
-        self.db = lancedb.connect(self.db_path)
+        self._db = None
+        self._connect_lock = threading.Lock()
+        self._connector = None
+        self.connect_seconds = None
+        self.raw_model_name = model_name
         self.model_name = self._sanitize_model_name(model_name)
         self.dimension = dimension
         self.table_name = f"interactions_{self.model_name}_{dimension}" if dimension else None
+
+        # Write-behind buffer: rows are added to LanceDB in batches instead of one
+        # fragment per store_interaction call
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.compact_fragments = compact_fragments
+        self.keep_versions_for = keep_versions_for
+        self._pending = []
+        self._lock = threading.RLock()
+        self._flush_timer = None
+        self._maintainer = None
+
+        # ANN index, built once the table is big enough for a flat scan to hurt
+        self.index_min_rows = index_min_rows
+        self.index_type = index_type # "IVF_PQ" or "HNSW"
+        self.nprobes = nprobes
+        self.refine_factor = refine_factor
+        self.reindex_growth = reindex_growth # Retrain partitions once rows grow by this factor
+        self._has_index = False
+        self._meta_path = os.path.join(self.db_path, "memory_meta.json")
+
+        # Optional in-process tier holding the most recent vectors; LanceDB is only
+        # queried when nothing in it is closer than hot_threshold
+        self.hot_tier_size = hot_tier_size
+        self.hot_threshold = hot_threshold
+        self.hot = None
+
+        # Re-embedding migration from an older table when the embed model changes.
+        # embedder(texts) embeds with the current model, legacy_embedder(model, texts)
+        # with a named one so the old table stays searchable until the copy is done.
+        self.embedder = None
+        self.legacy_embedder = None
+        self.migrate_in_background = migrate_in_background
+        self.migration = None
+        self._legacy_unavailable = set() # Old embed models that failed; not asked again
+
+        # Near-duplicate suppression: a new row this similar to an existing one of the
+        # same role bumps that row's hit count and timestamp instead of being appended
+        self.dedup_threshold = dedup_threshold
+        self.dedup_roles = set(dedup_roles)
+        self.dedup_hits = 0
+        # Bumps to stored rows wait for the next flush like new rows do, keyed by the row's
+        # (role, content, timestamp) since row ids move when any process compacts the table:
+        # key -> [hits, timestamp]
+        self._bumps = {}
+
+        # Full-text index on content: BM25 scores pull keyword matches closer in the
+        # vector ranking, and a query found verbatim in a stored row can be answered
+        # before it is embedded at all
+        self.fts_weight = fts_weight
+        self.fts_saturation = fts_saturation # BM25 score that earns half of fts_weight
+        self.exact_min_chars = exact_min_chars
+        self.exact_min_coverage = exact_min_coverage # Share of the row the query must span
+        self.exact_roles = set(exact_roles) # A user row only echoes the question back
+        self.exact_hits = 0
+        self._has_fts = False
+        self.tracer = tracer or NULL_TRACER # Spans for --profile/--trace-file
         if dimension:
             self._init_db()
         else:
             self.table = None
 
+    @property
+    def db(self):
+        if self._db is None:
+            with self._connect_lock:
+                if self._db is None:
+                    started = time.perf_counter()
+                    with self.tracer.span("memory.connect"):
+                        import lancedb
+                        self._db = lancedb.connect(self.db_path)
+                    self.connect_seconds = time.perf_counter() - started
+                    # At exit only buffered rows are written; waiting for an index build could
+                    # hold a one-shot command for minutes. Registered after the import so it runs
+                    # before lancedb's own exit hook stops the runtime the flush needs.
+                    atexit.register(self.close, wait=False)
+        return self._db
+
+    def connect_in_background(self):
+        # Import lancedb, connect and open this model's table while the caller does
+        # other work; the first query waits on the locks instead of repeating it
+        def connect():
+            try:
+                with self._lock:
+                    if self.table is None:
+                        self.open_existing()
+            except Exception as e:
+                print(f"Warning: Memory connect failed: {e}")
+
+        if self._db is None and self._connector is None:
+            self._connector = threading.Thread(target=connect, daemon=True)
+            self._connector.start()
+
+    def is_ready(self):
+        return self._db is not None and (self._connector is None or not self._connector.is_alive())
+
     def _sanitize_model_name(self, name):
         # Replace characters that might be invalid in table names
         return name.replace(":", "_").replace("/", "_").replace("-", "_").replace(".", "_")
 
+    def set_model(self, model_name):
+        # Called after the client falls back to another embed model
+        if model_name == self.raw_model_name:
+            return
+        with self._lock:
+            self.flush()
+            self.raw_model_name = model_name
+            self.model_name = self._sanitize_model_name(model_name)
+            self.table = None # Reopened under the new name on next use
+
+    def set_embedders(self, embedder, legacy_embedder=None):
+        self.embedder = embedder
+        self.legacy_embedder = legacy_embedder
+
     def _init_db(self):
         if not self.dimension:
             return
 
-        if self.table_name not in self.db.table_names():
+        created = self.table_name not in self.db.table_names()
+        if created:
             # Initial schema based on detected dimension
             dummy_emb = [0.0] * self.dimension
             data = [{
                 "vector": dummy_emb,
                 "role": "system",
                 "content": "Database initialized",
-                "timestamp": 0.0
+                "timestamp": 0.0,
+                "hits": 1
             }]
             self.db.create_table(self.table_name, data=data)
         self.table = self.db.open_table(self.table_name)
+        if "hits" not in self.table.schema.names:
+            # Tables from before duplicate suppression
+            self.table.add_columns({"hits": "CAST(1 AS INT)"})
+        self._has_index = self._vector_index(self.table) is not None
+        self._has_fts = self._fts_index(self.table) is not None
+        if created:
+            # Cheap on an empty table; older tables get theirs from the maintainer
+            self.build_fts_index()
+        if self.hot_tier_size:
+            from hot_tier import HotTier
+            self.hot = HotTier(os.path.join(self.db_path, "hot", self.table_name), self.dimension, self.hot_tier_size)
+        if self._load_meta().get(self.table_name, {}).get("model") != self.raw_model_name:
+            self._update_meta(self.table_name, model=self.raw_model_name)
+
+        # Pick up an interrupted migration, or start one into a freshly created table
+        state = self._load_meta().get(self.table_name, {}).get("migration")
+        if state and not state.get("done"):
+            self.start_migration(state["source"], background=self.migrate_in_background)
+        elif created:
+            self.start_migration(background=self.migrate_in_background)
+
+    def _find_migration_source(self):
+        best = None
+        for name in self.db.table_names():
+            if not name.startswith("interactions_") or name == self.table_name:
+                continue
+            rows = self.db.open_table(name).count_rows()
+            if rows > 1 and (best is None or rows > best[1]):
+                best = (name, rows)
+        return best[0] if best else None
+
+    def start_migration(self, source_name=None, background=True):
+        if self.embedder is None or self.table is None:
+            return None
+        if self.migration is not None and self.migration.is_running():
+            return self.migration
+        source_name = source_name or self._find_migration_source()
+        if source_name is None:
+            return None
+        state = self._load_meta().get(self.table_name, {}).get("migration") or {}
+        if state.get("done") and state.get("source") == source_name:
+            return None
+        self.migration = EmbeddingMigration(self, source_name, self.table_name, self.embedder)
+        if background:
+            self.migration.start()
+        return self.migration
+
+    def _migration_finished(self, migration):
+        with self._lock:
+            if self.migration is migration:
+                self.migration = None
+            if self.table is not None and self.table_name == migration.target_name:
+                # The migration wrote through its own handle; see its rows here too
+                self.table.checkout_latest()
+
+    def open_existing(self):
+        # For maintenance commands: open this model's table with the most rows
+        # without needing an embedding to learn the dimension
+        prefix = f"interactions_{self.model_name}_"
+        best = None
+        for name in self.db.table_names():
+            if name.startswith(prefix) and name[len(prefix):].isdigit():
+                rows = self.db.open_table(name).count_rows()
+                if best is None or rows > best[1]:
+                    best = (name, rows)
+        if best is None:
+            return False
+        self._ensure_initialized(int(best[0][len(prefix):]))
+        return True
+
+    def _load_meta(self):
+        try:
+            with open(self._meta_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _update_meta(self, table_name, **values):
+        with self._lock:
+            meta = self._load_meta()
+            meta.setdefault(table_name, {}).update(values)
+            with open(self._meta_path, "w") as f:
+                json.dump(meta, f, indent=2)
 
     def _ensure_initialized(self, embedding_len):
         if embedding_len == 0:
             return
         if self.table is None or self.dimension != embedding_len:
+            # Buffered rows belong to the table we are about to switch away from
+            self.flush()
             self.dimension = embedding_len
             self.table_name = f"interactions_{self.model_name}_{self.dimension}"
             self._init_db()
 
+    @traced("memory.store_interaction")
     def store_interaction(self, role, content, embedding, timestamp=None):
-        import time
         if not embedding or len(embedding) == 0:
             return
-            
-        self._ensure_initialized(len(embedding))
-        if self.table is None:
+
+        with self._lock:
+            self._ensure_initialized(len(embedding))
+            if self.table is None:
+                return
+
+            if timestamp is None:
+                timestamp = time.time()
+
+            if role in self.dedup_roles and self._bump_duplicate(role, embedding, timestamp):
+                self._schedule_flush()
+                return
+
+            self._pending.append({
+                "vector": embedding,
+                "role": role,
+                "content": content,
+                "timestamp": timestamp,
+                "hits": 1
+            })
+            if self.hot is not None:
+                self.hot.add(embedding, role, content, timestamp)
+            if len(self._pending) >= self.flush_size:
+                self.flush()
+            else:
+                self._schedule_flush()
+
+    def _schedule_flush(self):
+        # Make sure a quiet session still lands its rows within flush_interval
+        if self._flush_timer is None:
+            self._flush_timer = threading.Timer(self.flush_interval, self.flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def _bump_duplicate(self, role, embedding, timestamp):
+        import numpy as np
+        v = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(v)
+        if norm == 0:
+            return False
+
+        # Rows still waiting in the write buffer
+        for row in reversed(self._pending):
+            if row["role"] != role:
+                continue
+            other = np.asarray(row["vector"], dtype=np.float32)
+            other_norm = np.linalg.norm(other)
+            if other_norm and float(v @ other) / (norm * other_norm) >= self.dedup_threshold:
+                if self.hot is not None:
+                    self.hot.touch(role, row["content"], row["timestamp"], timestamp)
+                row["hits"] += 1
+                row["timestamp"] = timestamp
+                self.dedup_hits += 1
+                return True
+
+        # Nearest stored row of the same role
+        try:
+            role_filter = "role = '{}'".format(role.replace("'", "''"))
+            nearest = self._vector_query(embedding, 1).where(role_filter, prefilter=True).to_list()
+        except Exception:
+            return False
+        if not nearest or 1.0 - nearest[0]["_distance"] < self.dedup_threshold:
+            return False
+        row = nearest[0]
+        bump = self._bumps.setdefault((row["role"], row["content"], row["timestamp"]), [0, timestamp])
+        bump[0] += 1
+        bump[1] = max(bump[1], timestamp)
+        self.dedup_hits += 1
+        return True
+
+    def _apply_bumps(self, bumps):
+        # One update per distinct hit increment, usually a single one for the whole flush.
+        # Rows in an update share the latest timestamp of the group, which is at most
+        # flush_interval off.
+        quote = lambda text: "'{}'".format(text.replace("'", "''"))
+        groups = {}
+        for key, (hits, timestamp) in bumps.items():
+            groups.setdefault(hits, []).append((key, timestamp))
+        for hits, rows in groups.items():
+            where = " OR ".join(
+                f"(timestamp = {float(old)!r} AND role = {quote(role)} AND content = {quote(content)})"
+                for (role, content, old), _ in rows
+            )
+            latest = float(max(t for _, t in rows))
+            self.table.update(where=where, values_sql={"hits": f"hits + {hits}", "timestamp": repr(latest)})
+            if self.hot is not None:
+                for (role, content, old), _ in rows:
+                    self.hot.touch(role, content, old, latest)
+
+    def flush(self, maintain=True):
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if not (self._pending or self._bumps) or self.table is None:
+                return
+            rows, self._pending = self._pending, []
+            bumps, self._bumps = self._bumps, {}
+            with self.tracer.span("memory.flush", rows=len(rows), bumps=len(bumps)):
+                if bumps:
+                    self._apply_bumps(bumps)
+                if rows:
+                    self.table.add(rows)
+            if self.hot is not None:
+                self.hot.save()
+            if not rows:
+                return
+            if maintain and (self._maintainer is None or not self._maintainer.is_alive()):
+                self._maintainer = threading.Thread(target=self._maintain, args=(self.table, self.table_name), daemon=True)
+                self._maintainer.start()
+
+    def _maintain(self, table, table_name):
+        # Background upkeep after a flush: compaction and vector index build/refresh
+        try:
+            stats = table.stats()
+            if stats["fragment_stats"]["num_fragments"] >= self.compact_fragments:
+                # optimize() also folds unindexed rows into an existing index
+                self.compact(table)
+                return
+            self._maybe_index(table, table_name, stats["num_rows"])
+            self._maybe_fts_index(table, table_name, stats["num_rows"])
+        except Exception as e:
+            print(f"Warning: Memory maintenance failed: {e}")
+
+    @staticmethod
+    def _vector_index(table):
+        for index in table.list_indices():
+            if "vector" in index.columns:
+                return index
+        return None
+
+    @staticmethod
+    def _fts_index(table):
+        for index in table.list_indices():
+            if "content" in index.columns:
+                return index
+        return None
+
+    def _maybe_index(self, table, table_name, rows):
+        index = self._vector_index(table)
+        if index is None:
+            if rows >= self.index_min_rows:
+                self.build_index(table, table_name)
             return
-            
-        if timestamp is None:
-            timestamp = time.time()
-        
-        self.table.add([{
-            "vector": embedding,
-            "role": role,
-            "content": content,
-            "timestamp": timestamp
-        }])
-
-    def retrieve_context(self, query_embedding, top_k=5):
+        trained_rows = self._load_meta().get(table_name, {}).get("index_trained_rows", rows)
+        if rows >= trained_rows * self.reindex_growth:
+            # Partitions were trained on a much smaller table, retrain them
+            self.build_index(table, table_name)
+            return
+        unindexed = table.index_stats(index.name).num_unindexed_rows
+        if unindexed >= max(self.flush_size, rows // 20):
+            # Extend the existing index with the new rows
+            self.compact(table)
+
+    def _maybe_fts_index(self, table, table_name, rows):
+        index = self._fts_index(table)
+        if index is None:
+            self.build_fts_index(table, table_name)
+            return
+        # Unindexed rows are still searched, just by brute force
+        unindexed = table.index_stats(index.name).num_unindexed_rows
+        if unindexed >= max(self.flush_size, rows // 20):
+            self.compact(table)
+
+    def build_fts_index(self, table=None, table_name=None):
+        table = table or self.table
+        table_name = table_name or self.table_name
+        if table is None:
+            return
+        try:
+            from lancedb.index import FTS
+            table.create_index("content", config=FTS(), replace=True)
+        except Exception as e:
+            print(f"Warning: Full-text index build failed: {e}")
+            return
+        if table_name == self.table_name:
+            self._has_fts = True
+
+    def _sub_vectors(self, dimension):
+        # PQ needs num_sub_vectors to divide the dimension; aim for ~16 dims per sub-vector
+        target = max(1, dimension // 16)
+        for n in range(target, 0, -1):
+            if dimension % n == 0:
+                return n
+        return 1
+
+    def build_index(self, table=None, table_name=None):
+        from lancedb.index import HnswSq, IvfPq
+        table = table or self.table
+        table_name = table_name or self.table_name
+        if table is None:
+            return
+        rows = table.count_rows()
+        partitions = max(1, int(math.sqrt(rows)))
+        if self.index_type.upper() == "HNSW":
+            config = HnswSq(distance_type="cosine", num_partitions=max(1, rows // 100000))
+        else:
+            dimension = len(table.take_offsets([0]).to_list()[0]["vector"])
+            config = IvfPq(distance_type="cosine", num_partitions=partitions, num_sub_vectors=self._sub_vectors(dimension))
+        table.create_index("vector", config=config, replace=True)
+        self._update_meta(table_name, index_trained_rows=rows, index_type=self.index_type)
+        if table_name == self.table_name:
+            self._has_index = True
+
+    def compact(self, table=None):
+        # Merge small fragments and drop versions older than keep_versions_for
+        table = table or self.table
+        if table is None:
+            return
+        try:
+            table.optimize(cleanup_older_than=self.keep_versions_for)
+        except Exception as e:
+            print(f"Warning: Memory compaction failed: {e}")
+
+    def stats(self):
+        with self._lock:
+            if self.table is None:
+                return {"table": None, "pending": len(self._pending)}
+            table_stats = self.table.stats()
+            return {
+                "table": self.table_name,
+                "rows": table_stats["num_rows"],
+                "pending": len(self._pending),
+                "fragments": table_stats["fragment_stats"]["num_fragments"],
+                "small_fragments": table_stats["fragment_stats"]["num_small_fragments"],
+                "versions": len(self.table.list_versions()),
+                "indexed": self._has_index,
+                "dedup_hits": self.dedup_hits,
+                "exact_hits": self.exact_hits,
+            }
+
+    def check_recall(self, samples=20, top_k=10):
+        # Compare the ANN results against an exact flat scan for random stored vectors
+        self.flush()
+        if self.table is None:
+            return None
+        rows = self.table.count_rows()
+        offsets = random.sample(range(rows), min(samples, rows))
+        queries = [r["vector"] for r in self.table.take_offsets(offsets).to_list()]
+        recall, ann_time, exact_time, scored = 0.0, 0.0, 0.0, 0
+        for vector in queries:
+            started = time.perf_counter()
+            ann = self._vector_query(vector, top_k).with_row_id(True).to_list()
+            ann_time += time.perf_counter() - started
+            started = time.perf_counter()
+            exact = self.table.search(vector).metric("cosine").bypass_vector_index().limit(top_k).with_row_id(True).to_list()
+            exact_time += time.perf_counter() - started
+            # The all-zero seed row has no cosine neighbours, skip it
+            expected = {r["_rowid"] for r in exact}
+            if expected:
+                recall += len(expected & {r["_rowid"] for r in ann}) / len(expected)
+                scored += 1
+        n = max(len(queries), 1)
+        return {
+            "indexed": self._has_index,
+            "rows": rows,
+            "recall": recall / max(scored, 1),
+            "ann_ms": ann_time / n * 1000,
+            "exact_ms": exact_time / n * 1000,
+        }
+
+    def _vector_query(self, query_embedding, top_k):
+        # Use cosine metric for scale-invariant similarity
+        query = self.table.search(query_embedding).metric("cosine").limit(top_k)
+        if self._has_index:
+            query = query.nprobes(self.nprobes).refine_factor(self.refine_factor)
+        return query
+
+    def wait_for_maintenance(self):
+        if self._maintainer is not None:
+            self._maintainer.join()
+
+    def close(self, wait=True):
+        # wait=False leaves a running index build or compaction behind; Lance commits are
+        # atomic, so a build cut short by the exit is simply done again after a later flush
+        if self.migration is not None:
+            self.migration.stop()
+        self.flush(maintain=wait)
+        if wait:
+            self.wait_for_maintenance()
+
+    @traced("memory.retrieve_context")
+    def retrieve_context(self, query_embedding, top_k=5, query_text=None):
         if query_embedding is None or len(query_embedding) == 0:
             return []
         self._ensure_initialized(len(query_embedding))
-        # Use cosine metric for scale-invariant similarity
-        results = self.table.search(query_embedding).metric("cosine").limit(top_k).to_list()
-        
+        hits = self._retrieve_current(query_embedding, top_k, query_text)
+
+        # Until a migration finishes, the old table still holds most of the memory
+        migration = self.migration
+        if migration is not None and query_text is not None:
+            best = {}
+            for content, dist in hits + self._retrieve_legacy(migration.source_name, query_text, top_k):
+                if content not in best or dist < best[content]:
+                    best[content] = dist
+            hits = sorted(best.items(), key=lambda hit: hit[1])[:top_k]
+        self.tracer.annotate(hits=len(hits))
+        return hits
+
+    def _retrieve_legacy(self, source_name, query_text, top_k):
+        model = self._load_meta().get(source_name, {}).get("model")
+        if self.legacy_embedder is None or model is None or model in self._legacy_unavailable:
+            return []
+        embedding = self.legacy_embedder(model, [query_text])[0]
+        if not embedding:
+            # Usually the old model was removed; a failed round trip per query buys nothing
+            print(f"Info: Old embed model '{model}' unavailable; searching migrated memory only.")
+            self._legacy_unavailable.add(model)
+            return []
+        try:
+            results = self.db.open_table(source_name).search(embedding).metric("cosine").limit(top_k).to_list()
+        except Exception:
+            return []
         return [(r["content"], r["_distance"]) for r in results]
+
+    @staticmethod
+    def _normalize_text(text):
+        return " ".join(text.lower().split())
+
+    def _text_query(self, query_text, top_k):
+        # [(row, BM25 score)] best first; empty when there is no full-text index yet
+        if not self._has_fts or not query_text.strip():
+            return []
+        try:
+            results = self.table.search(query_text, query_type="fts").limit(top_k).to_list()
+        except Exception:
+            return []
+        # The seed row only exists to fix the schema
+        return [(r, r["_score"]) for r in results if r["timestamp"] > 0]
+
+    @traced("memory.retrieve_exact")
+    def retrieve_exact(self, query_text, top_k=5):
+        # Fast path that needs no embedding: rows made up mostly of the query verbatim,
+        # e.g. an error string or a command seen before. Returns None when there is no
+        # confident match so the caller falls back to the embedded search.
+        needle = self._normalize_text(query_text)
+        if len(needle) < self.exact_min_chars:
+            return None
+        with self._lock:
+            if self.table is None and not self.open_existing():
+                return None
+            # Buffered rows have to be visible to the search
+            self.flush()
+        # A short query like "git status" occurs in many long replies without being their
+        # subject, so the query has to make up most of the row
+        hits = []
+        for row, score in self._text_query(query_text, top_k * 2):
+            content = self._normalize_text(row["content"])
+            if (row["role"] in self.exact_roles and needle in content
+                    and len(needle) >= self.exact_min_coverage * len(content)):
+                hits.append((row["content"], 0.0))
+        if not hits:
+            return None
+        self.exact_hits += 1
+        return hits[:top_k]
+
+    def _fuse(self, vector_results, text_results, query_embedding):
+        # Scale each cosine distance down by the row's BM25 score, saturated so that a weak
+        # match only earns part of fts_weight no matter how the other rows score: keyword
+        # matches move up while distances stay comparable with hot_threshold. Rows only
+        # the full-text search found get their distance from the returned vector.
+        merged = {}
+        for r in vector_results:
+            merged[(r["content"], r["timestamp"])] = (r["content"], r["_distance"])
+        if not text_results:
+            return merged
+        import numpy as np
+        q = np.asarray(query_embedding, dtype=np.float32)
+        q_norm = np.linalg.norm(q) or 1.0
+        for row, score in text_results:
+            key = (row["content"], row["timestamp"])
+            if key in merged:
+                dist = merged[key][1]
+            else:
+                v = np.asarray(row["vector"], dtype=np.float32)
+                v_norm = np.linalg.norm(v)
+                if v.shape != q.shape or v_norm == 0:
+                    continue
+                dist = 1.0 - float(v @ q) / (v_norm * q_norm)
+            boost = score / (score + self.fts_saturation) if score > 0 else 0.0
+            merged[key] = (row["content"], dist * (1.0 - self.fts_weight * boost))
+        return merged
+
+    def _retrieve_current(self, query_embedding, top_k, query_text=None):
+        hot_hits = []
+        if self.hot is not None:
+            # Buffered rows are already in the hot tier, no flush needed
+            with self._lock:
+                hot_hits = self.hot.search(query_embedding, top_k)
+            if hot_hits and hot_hits[0][1] < self.hot_threshold:
+                return [(row["content"], dist) for row, dist in hot_hits]
+
+        # Buffered rows have to be visible to the search
+        self.flush()
+        results = self._vector_query(query_embedding, top_k).to_list()
+        text_results = self._text_query(query_text, top_k) if query_text else []
+        if not hot_hits and not text_results:
+            return [(r["content"], r["_distance"]) for r in results]
+
+        # Merge both tiers, the same row can show up in each
+        merged = self._fuse(results, text_results, query_embedding)
+        for row, dist in hot_hits:
+            key = (row["content"], row["timestamp"])
+            if key not in merged or dist < merged[key][1]:
+                merged[key] = (row["content"], dist)
+        return sorted(merged.values(), key=lambda hit: hit[1])[:top_k]
@@ -0,0 +1,80 @@
+import threading
+
+class EmbeddingMigration:
+    # Copies an old interactions table into the current one, re-embedding each row's
+    # content with the current embed model. Progress is checkpointed in
+    # memory_meta.json after every batch so an interrupted run resumes where it stopped.
+    def __init__(self, memory, source_name, target_name, embed_batch, batch_size=128):
+        self.memory = memory
+        self.source_name = source_name
+        self.target_name = target_name
+        self.embed_batch = embed_batch
+        self.batch_size = batch_size
+        self.offset = 0
+        self.total = 0
+        self.done = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+
+    def stop(self, wait=True):
+        self._stop.set()
+        if wait and self._thread is not None:
+            self._thread.join()
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _checkpoint(self):
+        self.memory._update_meta(self.target_name, migration={
+            "source": self.source_name,
+            "offset": self.offset,
+            "total": self.total,
+            "done": self.done,
+        })
+
+    def run(self, verbose=False):
+        db = self.memory.db
+        source = db.open_table(self.source_name)
+        target = db.open_table(self.target_name)
+        self.total = source.count_rows()
+
+        state = self.memory._load_meta().get(self.target_name, {}).get("migration", {})
+        if state.get("source") == self.source_name:
+            self.offset = state.get("offset", 0)
+
+        try:
+            while self.offset < self.total and not self._stop.is_set():
+                end = min(self.offset + self.batch_size, self.total)
+                rows = source.take_offsets(list(range(self.offset, end))).to_list()
+                # The seed row only exists to fix the schema
+                rows = [r for r in rows if r["timestamp"] > 0]
+                if rows:
+                    embeddings = self.embed_batch([r["content"] for r in rows])
+                    if not any(embeddings):
+                        # Embedder is down; keep the checkpoint and try again next time
+                        print(f"Warning: Memory migration from '{self.source_name}' paused, embeddings unavailable.")
+                        return
+                    target.add([{
+                        "vector": embedding,
+                        "role": r["role"],
+                        "content": r["content"],
+                        "timestamp": r["timestamp"],
+                        "hits": r.get("hits", 1)
+                    } for r, embedding in zip(rows, embeddings) if embedding])
+                self.offset = end
+                self._checkpoint()
+                if verbose:
+                    print(f"\rMigrated {self.offset}/{self.total} rows from {self.source_name}", end="", flush=True)
+            if self.offset >= self.total:
+                self.done = True
+                self._checkpoint()
+                self.memory._migration_finished(self)
+        except Exception as e:
+            print(f"Warning: Memory migration from '{self.source_name}' failed: {e}")
+        finally:
+            if verbose:
+                print()
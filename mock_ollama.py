@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+import argparse
+import hashlib
+import json
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CHARS_PER_TOKEN = 4
+
+# Canned replies keyed by the unit named in the system prompt. The GENERAL delegates one
+# PLAN per request and wraps up once it has seen command output.
+DEFAULT_REPLIES = {
+    "GENERAL": "Let me take a look.\n```PLAN\nPrint the numbers from 1 to 40\n```\n",
+    "GENERAL_DONE": "The command finished and printed the numbers 1 to 40. All done.",
+    "ARCHITECT": "```bash\nseq 1 40\n```",
+    "SCOUT": "SAFE",
+    "SCRIBE": "The command printed the numbers 1 to 40 without errors.",
+}
+UNIT_RE = re.compile(r'You are the (\w+)')
+# Weights on disk in bytes for the default units, as /api/tags reports them; resident
+# models take RUNNING_OVERHEAD more in /api/ps
+DEFAULT_SIZES = {
+    "mistral-nemo:12b": 7_100_000_000,
+    "qwen2.5-coder:1.5b": 986_000_000,
+    "smollm2:360m": 726_000_000,
+    "gemma3:1b": 815_000_000,
+    "nomic-embed-text:latest": 274_000_000,
+}
+RUNNING_OVERHEAD = 300 * 1024 * 1024
+
+class MockOllama:
+    # Local stand-in for the Ollama HTTP API (/api/generate, /api/chat, /api/embed,
+    # /api/embeddings, /api/tags, /api/ps) with simulated model load time, prompt
+    # evaluation and generation rates, for benchmarks and tests without a GPU
+    def __init__(self, port=0, tokens_per_second=80.0, prompt_tokens_per_second=2000.0,
+                 load_seconds=0.5, embed_seconds=0.01, dimension=768, replies=None, host="127.0.0.1",
+                 models=tuple(DEFAULT_SIZES), embed_models=None, model_seconds=None,
+                 sizes=None):
+        self.tokens_per_second = tokens_per_second
+        self.prompt_tokens_per_second = prompt_tokens_per_second
+        self.load_seconds = load_seconds # Paid by the first call after a model is (un)loaded
+        self.embed_seconds = embed_seconds # Per embedded input
+        self.dimension = dimension
+        self.replies = dict(DEFAULT_REPLIES, **(replies or {}))
+        self.models = set(models) # Listed by /api/tags
+        self.embed_models = embed_models # Models /api/embed accepts, None for any
+        self.model_seconds = model_seconds or {} # Extra latency per call, by model
+        self.sizes = DEFAULT_SIZES if sizes is None else sizes # Bytes on disk, 0 when not listed
+        self.calls = [] # (path, model) per request
+        self.spans = [] # (path, model, started, finished) per POST, perf_counter seconds
+        self.loaded = set()
+        self._lock = threading.Lock()
+
+        mock = self
+        class Handler(_Handler):
+            server_mock = mock
+        self.server = _Server((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _load(self, model):
+        # Returns the simulated load time in seconds: paid whenever the model isn't resident
+        with self._lock:
+            if model in self.loaded:
+                return 0.0
+            self.loaded.add(model)
+        time.sleep(self.load_seconds)
+        return self.load_seconds
+
+    def _release(self, model, keep_alive):
+        # Like Ollama, keep_alive 0 unloads the model once the call is done
+        if keep_alive in (0, "0", "0s"):
+            with self._lock:
+                self.loaded.discard(model)
+
+    def reply_for(self, system_prompt, prompt):
+        match = UNIT_RE.search(system_prompt or "")
+        unit = match.group(1) if match else "GENERAL"
+        if unit == "GENERAL" and "Command output:" in (prompt or ""):
+            unit = "GENERAL_DONE"
+        return self.replies.get(unit, self.replies["GENERAL"])
+
+    def embedding(self, text):
+        # Deterministic unit vector from the text's hash, so identical texts match exactly
+        seed = hashlib.sha256(text.encode("utf-8")).digest()
+        values = [(seed[i % len(seed)] ^ (i * 31 & 0xff)) / 255.0 - 0.5 for i in range(self.dimension)]
+        norm = sum(v * v for v in values) ** 0.5 or 1.0
+        return [v / norm for v in values]
+
+    def digest(self, model):
+        return hashlib.sha256(model.encode("utf-8")).hexdigest()
+
+class _Server(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        # Clients that gave up (read timeouts) hang up before the reply is sent
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_mock = None
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, obj, status=200):
+        body = json.dumps(obj).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _chunk(self, obj):
+        data = (json.dumps(obj) + "\n").encode("utf-8")
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def do_GET(self):
+        mock = self.server_mock
+        mock.calls.append((self.path, None))
+        if self.path == "/api/tags":
+            models = sorted(mock.loaded | mock.models)
+            self._send({"models": [{"name": m, "model": m, "digest": mock.digest(m), "size": mock.sizes.get(m, 0)}
+                                   for m in models]})
+        elif self.path == "/api/ps":
+            running = []
+            for m in sorted(mock.loaded):
+                size = mock.sizes.get(m, 0) and mock.sizes[m] + RUNNING_OVERHEAD
+                running.append({"name": m, "model": m, "size": size, "size_vram": size})
+            self._send({"models": running})
+        else:
+            self._send({"error": "not found"}, 404)
+
+    def do_POST(self):
+        mock = self.server_mock
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return self._send({"error": "invalid JSON"}, 400)
+        model = body.get("model", "")
+        mock.calls.append((self.path, model))
+        started = time.perf_counter()
+        try:
+            self._post(body, model)
+        finally:
+            mock.spans.append((self.path, model, started, time.perf_counter()))
+
+    def _post(self, body, model):
+        mock = self.server_mock
+        time.sleep(mock.model_seconds.get(model, 0))
+
+        if self.path in ("/api/embed", "/api/embeddings"):
+            texts = body.get("input", body.get("prompt", ""))
+            texts = [texts] if isinstance(texts, str) else texts
+            if mock.embed_models is not None and model not in mock.embed_models:
+                if self.path == "/api/embeddings":
+                    return self._send({"error": "not found"}, 404)
+                return self._send({"error": f"\"{model}\" does not support embeddings"}, 400)
+            load = mock._load(model)
+            time.sleep(mock.embed_seconds * len(texts))
+            embeddings = [mock.embedding(t) for t in texts]
+            mock._release(model, body.get("keep_alive"))
+            if self.path == "/api/embeddings":
+                return self._send({"embedding": embeddings[0]})
+            return self._send({"model": model, "embeddings": embeddings, "load_duration": int(load * 1e9)})
+
+        if self.path == "/api/generate":
+            if "prompt" not in body:
+                # Load/unload request with no prompt
+                if body.get("keep_alive") in (0, "0", "0s"):
+                    mock._release(model, 0)
+                else:
+                    mock._load(model)
+                return self._send({"model": model, "response": "", "done": True})
+            prompt = body["prompt"]
+            text = mock.reply_for(body.get("system"), prompt)
+            prompt_chars = len(prompt) + len(body.get("system") or "")
+            return self._respond(model, body, prompt_chars, text, lambda piece, done: {"response": piece})
+
+        if self.path == "/api/chat":
+            messages = body.get("messages", [])
+            system = next((m["content"] for m in messages if m.get("role") == "system"), None)
+            last = messages[-1]["content"] if messages else ""
+            text = mock.reply_for(system, last)
+            prompt_chars = sum(len(m.get("content", "")) for m in messages)
+            return self._respond(
+                model, body, prompt_chars, text,
+                lambda piece, done: {"message": {"role": "assistant", "content": piece}}
+            )
+
+        self._send({"error": "not found"}, 404)
+
+    def _respond(self, model, body, prompt_chars, text, payload):
+        mock = self.server_mock
+        started = time.perf_counter()
+        load = mock._load(model)
+        prompt_tokens = prompt_chars // CHARS_PER_TOKEN + 1
+        prompt_eval = prompt_tokens / mock.prompt_tokens_per_second
+        time.sleep(prompt_eval)
+
+        pieces = [text[i:i + CHARS_PER_TOKEN] for i in range(0, len(text), CHARS_PER_TOKEN)] or [""]
+        per_token = 1.0 / mock.tokens_per_second if mock.tokens_per_second else 0.0
+        eval_started = time.perf_counter()
+        final = {
+            "model": model,
+            "done": True,
+            "context": list(range(prompt_tokens + len(pieces))),
+            "prompt_eval_count": prompt_tokens,
+            "prompt_eval_duration": int(prompt_eval * 1e9),
+            "load_duration": int(load * 1e9),
+            "eval_count": len(pieces),
+        }
+
+        if not body.get("stream", True):
+            time.sleep(per_token * len(pieces))
+            final.update(payload(text, True))
+            final["eval_duration"] = int((time.perf_counter() - eval_started) * 1e9)
+            final["total_duration"] = int((time.perf_counter() - started) * 1e9)
+            mock._release(model, body.get("keep_alive"))
+            return self._send(final)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for piece in pieces:
+            time.sleep(per_token)
+            self._chunk(dict(payload(piece, False), model=model, done=False))
+        final.update(payload("", True))
+        final["eval_duration"] = int((time.perf_counter() - eval_started) * 1e9)
+        final["total_duration"] = int((time.perf_counter() - started) * 1e9)
+        mock._release(model, body.get("keep_alive"))
+        self._chunk(final)
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock Ollama server for benchmarks and tests")
+    parser.add_argument("--port", type=int, default=11435, help="Port to listen on")
+    parser.add_argument("--tokens-per-second", type=float, default=80, help="Simulated generation rate")
+    parser.add_argument("--prompt-tokens-per-second", type=float, default=2000, help="Simulated prompt evaluation rate")
+    parser.add_argument("--load-seconds", type=float, default=0.5, help="Simulated model load time")
+    parser.add_argument("--embed-seconds", type=float, default=0.01, help="Simulated time per embedded input")
+    parser.add_argument("--dimension", type=int, default=768, help="Embedding dimension")
+    args = parser.parse_args()
+
+    mock = MockOllama(
+        port=args.port, tokens_per_second=args.tokens_per_second,
+        prompt_tokens_per_second=args.prompt_tokens_per_second, load_seconds=args.load_seconds,
+        embed_seconds=args.embed_seconds, dimension=args.dimension
+    )
+    print(f"Mock Ollama listening on {mock.url}")
+    try:
+        mock.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,15 @@
 import requests
 import json
+import queue
+import threading
+import time
+from requests.adapters import HTTPAdapter
+from tracing import NULL_TRACER, traced
 
 class OllamaClient:
-    def __init__(self, base_url="http://localhost:11434", model="dolphin-mistral:7b", embed_model=None):
+    def __init__(self, base_url="http://localhost:11434", model="dolphin-mistral:7b", embed_model=None, embed_cache=None,
+                 pool_size=8, connect_timeout=5, read_timeout=300, residency=None, tracer=None,
+                 probe_cache=None, probe_deadline=10.0):
         # Ensure the base_url has a scheme
         if not base_url.startswith(("http://", "https://")):
             base_url = f"http://{base_url}"
@@ -14,32 +21,136 @@ class OllamaClient:
         self.model = model
         self.embed_model = embed_model or model
         self._embedding_working = None # Track if current model works
+        self.embed_cache = embed_cache # Optional EmbeddingCache, skips the round trip on hits
+        self.residency = residency # Optional ResidencyScheduler, picks keep_alive when the caller doesn't
+        self.tracer = tracer or NULL_TRACER # Spans for --profile/--trace-file
+        self.probe_cache = probe_cache # Optional ProbeCache, remembers which models can embed
+        self.probe_deadline = probe_deadline # Seconds all fallback embed probes may take together
+        self.dimension_hint = None # Optional callable returning the dimension memory uses, or None
 
+        # One pooled keep-alive session for every call so the SCOUT/ARCHITECT/SCRIBE
+        # round trips reuse connections instead of paying a TCP handshake each time
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        self._adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", self._adapter)
+        self.session.mount("https://", self._adapter)
+        self._requests_sent = 0
+        self._requests_lock = threading.Lock() # Calls run concurrently under --parallel
+
+    def _post(self, path, payload, timeout=None, **kwargs):
+        with self._requests_lock:
+            self._requests_sent += 1
+        return self.session.post(f"{self.base_url}{path}", json=payload, timeout=timeout or self.timeout, **kwargs)
+
+    def _get(self, path, timeout=None):
+        with self._requests_lock:
+            self._requests_sent += 1
+        return self.session.get(f"{self.base_url}{path}", timeout=timeout or self.timeout)
+
+    def connection_stats(self):
+        # urllib3 pools count every connection they open, so anything beyond that was reused
+        opened = 0
+        pools = self._adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                opened += pool.num_connections
+        with self._requests_lock:
+            sent = self._requests_sent
+        return {
+            "requests": sent,
+            "connections_opened": opened,
+            "connections_reused": max(sent - opened, 0),
+        }
+
+    def close(self):
+        self.session.close()
+
+    def _residency_keep_alive(self, model, keep_alive, preferred=False):
+        # An explicit keep_alive from the caller always wins
+        if keep_alive is not None or self.residency is None:
+            return keep_alive
+        if not self.residency.sized_from_tags:
+            self._size_residency_from_tags()
+        keep_alive, evict = self.residency.plan(model, preferred=preferred)
+        for m in evict:
+            if m != model:
+                self._unload(m)
+        return keep_alive
+
+    @traced("ollama.unload")
+    def _unload(self, model):
+        self.tracer.annotate(model=model)
+        try:
+            self._post("/api/generate", {"model": model, "keep_alive": 0})
+        except Exception:
+            pass
+
+    def _size_residency_from_tags(self):
+        # Once per client: sizes on disk for every model, before the first plan needs them
+        try:
+            with self.tracer.span("ollama.tags"):
+                response = self._get("/api/tags")
+                response.raise_for_status()
+                models = response.json().get("models", [])
+        except Exception:
+            models = []
+        self.residency.update_from_tags(models)
+
+    def _measure_residency(self, model):
+        # Replace the estimated size with what the server reports, once per model
+        if self.residency is None or not self.residency.needs_measurement(model):
+            return
+        try:
+            with self.tracer.span("ollama.ps"):
+                response = self._get("/api/ps")
+                response.raise_for_status()
+                running = response.json().get("models", [])
+        except Exception:
+            running = []
+        self.residency.update_from_ps(running, model=model)
+
+    @traced("ollama.tags")
     def _get_available_models(self):
+        return list(self._get_model_digests())
+
+    def _get_model_digests(self):
+        # name -> digest; the digest changes whenever the model is re-pulled
         try:
-            response = requests.get(f"{self.base_url}/api/tags")
+            response = self._get("/api/tags")
             response.raise_for_status()
-            return [m["name"] for m in response.json().get("models", [])]
+            return {m["name"]: m.get("digest", "") for m in response.json().get("models", [])}
         except:
-            return []
+            return {}
 
-    def _test_embedding(self, model_name):
-        url = f"{self.base_url}/api/embed"
-        payload = {"model": model_name, "input": "test"}
+    @traced("ollama.embed_probe")
+    def _test_embedding(self, model_name, timeout=30):
+        # Returns {"supported", "dimension", "latency", "timed_out"}, or None when the server
+        # couldn't be reached and the result shouldn't be kept
+        self.tracer.annotate(model=model_name)
+        started = time.perf_counter()
+        # keep_alive 0: probes shouldn't crowd the GENERAL out of VRAM
+        payload = {"model": model_name, "input": "test", "keep_alive": 0}
         try:
-            resp = requests.post(url, json=payload, timeout=30)
+            resp = self._post("/api/embed", payload, timeout=(self.timeout[0], timeout))
             if resp.status_code == 200:
-                return True
-            # Try legacy
-            url = f"{self.base_url}/api/embeddings"
-            payload = {"model": model_name, "prompt": "test"}
-            resp = requests.post(url, json=payload, timeout=30)
-            return resp.status_code == 200
-        except:
-            return False
+                embeddings = resp.json().get("embeddings") or [[]]
+                vector = embeddings[0]
+            else:
+                # Try legacy
+                payload = {"model": model_name, "prompt": "test", "keep_alive": 0}
+                resp = self._post("/api/embeddings", payload, timeout=(self.timeout[0], timeout))
+                vector = (resp.json().get("embedding") or []) if resp.status_code == 200 else []
+        except requests.ReadTimeout:
+            return {"supported": False, "dimension": 0, "latency": time.perf_counter() - started, "timed_out": True}
+        except (requests.RequestException, ValueError):
+            return None
+        return {"supported": len(vector) > 0, "dimension": len(vector), "latency": time.perf_counter() - started,
+                "timed_out": False}
 
-    def generate(self, prompt, system_prompt=None, context=None, stream=False, model=None, keep_alive=None):
-        url = f"{self.base_url}/api/generate"
+    @traced("ollama.generate")
+    def generate(self, prompt, system_prompt=None, context=None, stream=False, model=None, keep_alive=None, timeout=None):
         target_model = model or self.model
         payload = {
             "model": target_model,
@@ -50,86 +161,261 @@ class OllamaClient:
             payload["system"] = system_prompt
         if context:
             payload["context"] = context
+        keep_alive = self._residency_keep_alive(target_model, keep_alive)
         if keep_alive is not None:
             payload["keep_alive"] = keep_alive
+        self.tracer.annotate(model=target_model, keep_alive=keep_alive, stream=stream)
         
-        response = requests.post(url, json=payload)
+        response = self._post("/api/generate", payload, timeout=timeout, stream=stream)
         response.raise_for_status()
         
         if stream:
             return response
         else:
-            return response.json()
+            data = response.json()
+            self.tracer.record_ollama(data)
+            self._measure_residency(target_model)
+            return data
+
+    @traced("ollama.generate_stream")
+    def generate_stream(self, prompt, system_prompt=None, context=None, model=None, keep_alive=None, timeout=None):
+        # Yields the decoded NDJSON chunks of a streaming /api/generate call.
+        # The last chunk has done=True and carries context and timing fields.
+        self.tracer.annotate(model=model or self.model)
+        response = self.generate(prompt, system_prompt=system_prompt, context=context, stream=True,
+                                 model=model, keep_alive=keep_alive, timeout=timeout)
+        with response:
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if "error" in chunk:
+                    raise RuntimeError(chunk["error"])
+                if chunk.get("done"):
+                    self.tracer.record_ollama(chunk)
+                yield chunk
+                if chunk.get("done"):
+                    break
+        self._measure_residency(model or self.model)
 
-    def chat(self, messages, stream=False, model=None, keep_alive=None):
-        url = f"{self.base_url}/api/chat"
+    @traced("ollama.chat")
+    def chat(self, messages, stream=False, model=None, keep_alive=None, timeout=None):
         target_model = model or self.model
         payload = {
             "model": target_model,
             "messages": messages,
             "stream": stream
         }
+        keep_alive = self._residency_keep_alive(target_model, keep_alive)
         if keep_alive is not None:
             payload["keep_alive"] = keep_alive
+        self.tracer.annotate(model=target_model, keep_alive=keep_alive, stream=stream)
 
-        response = requests.post(url, json=payload)
+        response = self._post("/api/chat", payload, timeout=timeout, stream=stream)
         response.raise_for_status()
         
         if stream:
             return response
         else:
-            return response.json()
+            data = response.json()
+            self.tracer.record_ollama(data)
+            self._measure_residency(target_model)
+            return data
 
-    def get_embeddings(self, prompt):
-        # If we already know the current embed_model doesn't work, try to find one that does
-        if self._embedding_working is False:
-            all_models = self._get_available_models()
-            for m in all_models:
-                if m != self.embed_model and self._test_embedding(m):
-                    print(f"Info: Found compatible embedding model: '{m}'")
-                    self.embed_model = m
-                    self._embedding_working = True
+    def _cache_embedding(self, prompt, embedding, started):
+        if self.embed_cache is not None:
+            self.embed_cache.put(self.embed_model, prompt, embedding, cost=time.perf_counter() - started)
+
+    def embed_cache_stats(self):
+        if self.embed_cache is None:
+            return None
+        return self.embed_cache.stats()
+
+    def _probe_in_background(self, model, digest, answers):
+        result = self._test_embedding(model, self.probe_deadline)
+        # Kept even if the caller already moved on, so the next process needn't ask again
+        if result is not None and self.probe_cache is not None:
+            self.probe_cache.put(self.base_url, model, digest, **result)
+        answers.put((model, result))
+
+    @traced("ollama.embed_fallback")
+    def _find_working_embed_model(self):
+        # Every other model is probed at once, with results from earlier processes reused.
+        # Probes start together, so the first one to succeed is the fastest embedder;
+        # a cached embedder wins once the probes have taken longer than it did. Embedders
+        # with the dimension memory already uses come first, since any other dimension
+        # starts a new table.
+        dimension = self.dimension_hint() if self.dimension_hint is not None else None
+        def rank(latency, model, size):
+            return (dimension is not None and size != dimension, latency, model)
+
+        digests = self._get_model_digests()
+        digests.pop(self.embed_model, None)
+        working = []
+        to_probe = []
+        for model, digest in digests.items():
+            cached = self.probe_cache.get(self.base_url, model, digest) if self.probe_cache is not None else None
+            if cached is None:
+                to_probe.append(model)
+            elif cached["supported"]:
+                working.append(rank(cached["latency"], model, cached["dimension"]))
+        working.sort()
+        # Only an embedder of the right dimension cuts the wait for the probes short
+        fastest_cached = working[0][1] if working and not working[0][0] else None
+
+        answers = queue.Queue()
+        for model in to_probe:
+            threading.Thread(target=self._probe_in_background, args=(model, digests[model], answers), daemon=True).start()
+        started = time.perf_counter()
+        waiting = len(to_probe)
+        while waiting:
+            remaining = self.probe_deadline - (time.perf_counter() - started)
+            if fastest_cached is not None:
+                remaining = min(remaining, fastest_cached - (time.perf_counter() - started))
+            if remaining <= 0:
+                break
+            try:
+                model, result = answers.get(timeout=remaining)
+            except queue.Empty:
+                break
+            waiting -= 1
+            if result is not None and result["supported"]:
+                working.append(rank(result["latency"], model, result["dimension"]))
+                if not working[-1][0]:
                     break
-            
-            if self._embedding_working is False:
-                # Still no luck
-                return []
 
-        url = f"{self.base_url}/api/embed"
+        if not working:
+            return False
+        mismatched, latency, model = min(working)
+        if mismatched:
+            print(f"Warning: No embedding model with dimension {dimension} found; memory will start a new table")
+        print(f"Info: Found compatible embedding model: '{model}' ({latency * 1000:.0f} ms per probe)")
+        self.embed_model = model
+        self._embedding_working = True
+        return True
+
+    @staticmethod
+    def _pack_batches(texts, max_batch_size, max_batch_chars):
+        # Greedily fill batches up to the item and character limits, keeping order.
+        # A single oversized text still gets a batch of its own.
+        batch, batch_chars = [], 0
+        for text in texts:
+            if batch and (len(batch) >= max_batch_size or batch_chars + len(text) > max_batch_chars):
+                yield batch
+                batch, batch_chars = [], 0
+            batch.append(text)
+            batch_chars += len(text)
+        if batch:
+            yield batch
+
+    @traced("ollama.embed")
+    def _embed_batch(self, batch):
+        started = time.perf_counter()
+        # Without a scheduler the model is unloaded explicitly after the whole batch call
+        keep_alive = self._residency_keep_alive(self.embed_model, None, preferred=True)
         payload = {
             "model": self.embed_model,
-            "input": prompt
+            "input": batch
         }
-        try:
-            response = requests.post(url, json=payload)
-            
-            if response.status_code == 404:
-                # Try legacy
-                url = f"{self.base_url}/api/embeddings"
-                payload = {"model": self.embed_model, "prompt": prompt, "keep_alive": 0}
-                response = requests.post(url, json=payload)
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+        self.tracer.annotate(model=self.embed_model, keep_alive=keep_alive, inputs=len(batch))
+        response = self._post("/api/embed", payload)
+
+        if response.status_code == 404:
+            # Legacy endpoint takes a single prompt, so fall back per item
+            embeddings = []
+            for text in batch:
+                item_started = time.perf_counter()
+                payload = {"model": self.embed_model, "prompt": text, "keep_alive": 0 if keep_alive is None else keep_alive}
+                response = self._post("/api/embeddings", payload)
                 response.raise_for_status()
-                self._embedding_working = True
-                return response.json()["embedding"]
-
-            # Handle "does not support embeddings" which usually comes as a 500 or 400
-            if response.status_code != 200:
-                err_msg = response.json().get("error", "").lower()
-                if "not support embeddings" in err_msg or response.status_code == 500:
-                    if self._embedding_working is None:
-                        self._embedding_working = False
-                        return self.get_embeddings(prompt) # Recursive attempt after switching
-                    
-            response.raise_for_status()
+                embedding = response.json()["embedding"]
+                self._cache_embedding(text, embedding, item_started)
+                embeddings.append(embedding)
             self._embedding_working = True
-            # Unload the embedding model immediately to free VRAM for the Brain
-            requests.post(f"{self.base_url}/api/generate", json={"model": self.embed_model, "keep_alive": 0})
-            
-            # /api/embed returns a list of embeddings in "embeddings" field
-            return response.json()["embeddings"][0]
+            return embeddings, False
+
+        # Handle "does not support embeddings" which usually comes as a 500 or 400
+        if response.status_code != 200:
+            err_msg = response.json().get("error", "").lower()
+            if "not support embeddings" in err_msg or response.status_code == 500:
+                raise RuntimeError(f"'{self.embed_model}' does not support embeddings")
+
+        response.raise_for_status()
+        self._embedding_working = True
+
+        # /api/embed returns one embedding per input in the "embeddings" field
+        data = response.json()
+        self.tracer.record_ollama(data)
+        embeddings = data["embeddings"]
+        if len(embeddings) != len(batch):
+            raise ValueError(f"Expected {len(batch)} embeddings, got {len(embeddings)}")
+        self._measure_residency(self.embed_model)
+        cost = (time.perf_counter() - started) / len(batch)
+        if self.embed_cache is not None:
+            for text, embedding in zip(batch, embeddings):
+                self.embed_cache.put(self.embed_model, text, embedding, cost=cost)
+        return embeddings, self.residency is None
+
+    @traced("ollama.embed")
+    def embed_with_model(self, model, texts):
+        # Plain /api/embed against a named model (e.g. the one an old memory table was
+        # built with); no fallback probing, empty vectors on failure
+        payload = {"model": model, "input": texts}
+        keep_alive = self._residency_keep_alive(model, None)
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+        self.tracer.annotate(model=model, keep_alive=keep_alive, inputs=len(texts))
+        try:
+            response = self._post("/api/embed", payload)
+            response.raise_for_status()
+            return response.json()["embeddings"]
+        except Exception:
+            return [[] for _ in texts]
+
+    def get_embeddings(self, prompt):
+        return self.get_embeddings_batch([prompt])[0]
+
+    def get_embeddings_batch(self, texts, max_batch_size=64, max_batch_chars=64000):
+        if not texts:
+            return []
+
+        # If we already know the current embed_model doesn't work, try to find one that does
+        if self._embedding_working is False:
+            if not self._find_working_embed_model():
+                # Still no luck
+                return [[] for _ in texts]
+
+        results = [None] * len(texts)
+        pending = {} # text -> positions, so duplicates are only embedded once
+        for i, text in enumerate(texts):
+            if text in pending:
+                pending[text].append(i)
+                continue
+            if self.embed_cache is not None:
+                cached = self.embed_cache.get(self.embed_model, text)
+                if cached is not None:
+                    results[i] = cached
+                    continue
+            pending[text] = [i]
+
+        loaded = False
+        try:
+            for batch in self._pack_batches(list(pending), max_batch_size, max_batch_chars):
+                embeddings, needs_unload = self._embed_batch(batch)
+                loaded = loaded or needs_unload
+                for text, embedding in zip(batch, embeddings):
+                    for i in pending[text]:
+                        results[i] = embedding
         except Exception as e:
             if self._embedding_working is None:
                 self._embedding_working = False
-                return self.get_embeddings(prompt)
+                return self.get_embeddings_batch(texts, max_batch_size, max_batch_chars) # Recursive attempt after switching
             print(f"Warning: Embeddings failed for '{self.embed_model}'. Memory disabled.")
-            return []
+            return [r if r is not None else [] for r in results]
+
+        if loaded:
+            # Unload the embedding model once per batch call to free VRAM for the Brain
+            self._unload(self.embed_model)
+        return results
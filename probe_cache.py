@@ -0,0 +1,52 @@
+import sqlite3
+import time
+from sqlite_cache import SqliteCache
+
+class ProbeCache(SqliteCache):
+    # On-disk record of which models can embed, keyed by (endpoint, model, digest) so a
+    # re-pulled model is probed again while every other result survives restarts.
+    # A probe that timed out is only remembered for timeout_ttl seconds, since the model
+    # may just have been slow to load.
+    table = "probes"
+
+    def __init__(self, path="~/.cache/terminal-companion/embed_probes.db", timeout_ttl=600):
+        self.timeout_ttl = timeout_ttl
+        super().__init__(path)
+
+    def _create_schema(self):
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS probes ("
+            "endpoint TEXT NOT NULL, model TEXT NOT NULL, digest TEXT NOT NULL, "
+            "supported INTEGER NOT NULL, dimension INTEGER NOT NULL, latency REAL NOT NULL, "
+            "probed_at REAL NOT NULL, timed_out INTEGER NOT NULL DEFAULT 0, "
+            "PRIMARY KEY (endpoint, model, digest))"
+        )
+        try:
+            # Caches written before timeouts were recorded
+            self._conn.execute("ALTER TABLE probes ADD COLUMN timed_out INTEGER NOT NULL DEFAULT 0")
+        except sqlite3.OperationalError:
+            pass
+
+    def get(self, endpoint, model, digest):
+        # {"supported", "dimension", "latency", "timed_out"} or None if this model version was
+        # never probed, or its last probe timed out more than timeout_ttl seconds ago
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT supported, dimension, latency, timed_out, probed_at FROM probes "
+                "WHERE endpoint = ? AND model = ? AND digest = ?",
+                (endpoint, model, digest)
+            ).fetchone()
+        if row is None or (row[3] and time.time() - row[4] > self.timeout_ttl):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return {"supported": bool(row[0]), "dimension": row[1], "latency": row[2], "timed_out": bool(row[3])}
+
+    def put(self, endpoint, model, digest, supported, dimension=0, latency=0.0, timed_out=False):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO probes (endpoint, model, digest, supported, dimension, latency, probed_at, timed_out) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (endpoint, model, digest, int(supported), dimension, latency, time.time(), int(timed_out))
+            )
+            self._conn.commit()
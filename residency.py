@@ -0,0 +1,108 @@
+import re
+import threading
+import time
+
+# Rough q4 weights footprint per billion parameters, plus runtime/KV overhead per model
+MB_PER_BILLION_PARAMS = 620
+RUNTIME_OVERHEAD_MB = 300
+# Models without a size tag (e.g. nomic-embed-text:latest) are usually small embedders
+UNKNOWN_MODEL_MB = 700
+
+class ResidencyScheduler:
+    # Decides keep_alive per call from a memory budget instead of unloading every helper
+    # unit after each request. Pinned models (the GENERAL) always use the server default;
+    # preferred ones (SCOUT, the embedder) are packed into the remaining budget first and
+    # everything else competes by recency.
+    def __init__(self, budget_mb, pinned=(), preferred=(), keep_alive="10m"):
+        self.budget_mb = budget_mb
+        self.pinned = set(pinned)
+        self.preferred = list(preferred)
+        self.keep_alive = keep_alive
+        self.footprints = {} # model -> MB, estimated until /api/ps reports the real size
+        self.measured = set() # Models /api/ps has been asked about, whether or not it listed them
+        self.sized_from_tags = False
+        self.last_used = {} # model -> time of last call
+        self.resident = set() # Non-pinned models we last told the server to keep
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def estimate_footprint_mb(model):
+        # Pull the parameter count out of tags like "qwen2.5-coder:1.5b" or "smollm2:360m"
+        tag = model.split(":", 1)[1] if ":" in model else model
+        match = re.search(r'(\d+(?:\.\d+)?)([bm])\b', tag.lower())
+        if not match:
+            return UNKNOWN_MODEL_MB
+        params_b = float(match.group(1))
+        if match.group(2) == "m":
+            params_b /= 1000
+        return int(params_b * MB_PER_BILLION_PARAMS + RUNTIME_OVERHEAD_MB)
+
+    def footprint_mb(self, model):
+        if model not in self.footprints:
+            self.footprints[model] = self.estimate_footprint_mb(model)
+        return self.footprints[model]
+
+    def needs_measurement(self, model):
+        return model not in self.measured
+
+    def update_from_tags(self, models):
+        # models is the "models" list from /api/tags: the weights' size on disk plus the
+        # runtime overhead beats a guess from the tag until /api/ps has the real number
+        with self._lock:
+            self.sized_from_tags = True
+            for m in models:
+                if m.get("size") and m["name"] not in self.measured:
+                    self.footprints[m["name"]] = m["size"] / (1024 * 1024) + RUNTIME_OVERHEAD_MB
+
+    def update_from_ps(self, running, model=None):
+        # running is the "models" list from /api/ps. model, the one just called, counts as
+        # measured even when it isn't listed: a keep_alive 0 call has already unloaded it,
+        # and asking again after every such call would never find it either.
+        with self._lock:
+            if model is not None:
+                self.measured.add(model)
+            for m in running:
+                size = m.get("size_vram") or m.get("size")
+                if size:
+                    self.footprints[m["name"]] = size / (1024 * 1024)
+                    self.measured.add(m["name"])
+            loaded = {m["name"] for m in running}
+            self.resident &= loaded
+
+    def _pack(self):
+        remaining = self.budget_mb - sum(self.footprint_mb(m) for m in self.pinned)
+        preferred = [m for m in self.preferred if m not in self.pinned]
+        others = sorted(
+            (m for m in self.last_used if m not in self.pinned and m not in preferred),
+            key=lambda m: self.last_used[m], reverse=True
+        )
+        keep = set()
+        for m in preferred + others:
+            if m not in self.last_used:
+                continue
+            size = self.footprint_mb(m)
+            if size <= remaining:
+                keep.add(m)
+                remaining -= size
+        return keep
+
+    def plan(self, model, preferred=False):
+        # Returns (keep_alive for this call, models that should be unloaded now)
+        with self._lock:
+            self.last_used[model] = time.time()
+            if model in self.pinned:
+                return None, []
+            if preferred and model not in self.preferred:
+                self.preferred.append(model)
+            keep = self._pack()
+            evict = sorted(self.resident - keep)
+            self.resident = keep
+            return (self.keep_alive if model in keep else 0), evict
+
+    def stats(self):
+        with self._lock:
+            return {
+                "budget_mb": self.budget_mb,
+                "resident": sorted(self.resident | (self.pinned & set(self.last_used))),
+                "footprints_mb": {m: round(self.footprints[m]) for m in self.footprints},
+            }
@@ -0,0 +1,143 @@
+import math
+import time
+import numpy as np
+
+class RetentionPolicy:
+    def __init__(self, max_age_days=30, max_rows=20000, cluster_size=8, max_chars_per_row=1500):
+        self.max_age_days = max_age_days # Rows older than this get consolidated
+        self.max_rows = max_rows # Hard cap on the table after consolidation
+        self.cluster_size = cluster_size # Average rows condensed into one summary
+        self.max_chars_per_row = max_chars_per_row # Keeps each SCRIBE prompt small
+
+def kmeans(vectors, k, iterations=20, seed=0):
+    # Spherical k-means: vectors are L2-normalized so the dot product is cosine similarity
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=k, replace=False)]
+    labels = np.zeros(len(vectors), dtype=np.int64)
+    for i in range(iterations):
+        new_labels = np.argmax(vectors @ centroids.T, axis=1)
+        if i > 0 and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        for c in range(k):
+            members = vectors[labels == c]
+            if len(members):
+                centroid = members.sum(axis=0)
+                centroids[c] = centroid / (np.linalg.norm(centroid) or 1.0)
+    return labels
+
+class MemoryConsolidator:
+    # Offline retention pass over the current interactions table: old rows are grouped
+    # by vector, each group is condensed into one summary row by the SCRIBE, the
+    # summaries are re-embedded and the originals deleted. If the table is still over
+    # max_rows afterwards, the least used oldest rows are evicted.
+    def __init__(self, memory, summarize, embed_batch, policy=None, executor=None):
+        self.memory = memory
+        self.summarize = summarize # text -> summary
+        self.embed_batch = embed_batch # [text] -> [embedding]
+        self.policy = policy or RetentionPolicy()
+        self.executor = executor # Optional pool for parallel SCRIBE calls
+
+    def _old_rows(self, table):
+        cutoff = time.time() - self.policy.max_age_days * 86400
+        return table.search().where(f"timestamp > 0 AND timestamp < {cutoff!r}").with_row_id(True) \
+            .select(["vector", "role", "content", "timestamp", "hits"]).limit(table.count_rows()).to_list()
+
+    def _condense(self, rows):
+        rows = sorted(rows, key=lambda r: r["timestamp"])
+        text = "\n---\n".join(f"[{r['role']}] {r['content'][:self.policy.max_chars_per_row]}" for r in rows)
+        return self.summarize(text).strip()
+
+    def run(self, dry_run=False, verbose=True):
+        memory = self.memory
+        memory.flush()
+        # Row ids are only stable while nothing compacts the table underneath us
+        memory.wait_for_maintenance()
+        # Holding the lock keeps this process's flushes out until the pass is done
+        with memory._lock:
+            return self._run(dry_run, verbose)
+
+    def _run(self, dry_run, verbose):
+        memory = self.memory
+        table = memory.table
+        if table is None:
+            return {"clusters": 0, "consolidated": 0, "evicted": 0}
+        # A migration, here or in another process, adds rows through its own handle;
+        # condensing or evicting while they arrive could delete half of the copy
+        state = memory._load_meta().get(memory.table_name, {}).get("migration")
+        if memory.migration is not None or (state and not state.get("done")):
+            if verbose:
+                print("Memory is still being migrated to this embed model; run --migrate-memory first.")
+            return {"clusters": 0, "consolidated": 0, "evicted": 0, "skipped": "migration"}
+
+        rows = self._old_rows(table)
+        clusters = []
+        if len(rows) > 1:
+            vectors = np.asarray([r["vector"] for r in rows], dtype=np.float32)
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.where(norms == 0, 1.0, norms)
+            k = max(1, math.ceil(len(rows) / self.policy.cluster_size))
+            labels = kmeans(vectors, min(k, len(rows)))
+            groups = {}
+            for row, label in zip(rows, labels):
+                groups.setdefault(int(label), []).append(row)
+            # A lone row has nothing to be condensed with; the row cap handles it
+            clusters = [g for g in groups.values() if len(g) > 1]
+
+        if verbose:
+            print(f"{len(rows)} rows older than {self.policy.max_age_days} days, {len(clusters)} clusters to condense")
+        if dry_run:
+            return {"clusters": len(clusters), "consolidated": sum(len(c) for c in clusters), "evicted": 0}
+
+        consolidated = 0
+        if clusters:
+            if self.executor is not None:
+                summaries = list(self.executor.map(self._condense, clusters))
+            else:
+                summaries = [self._condense(c) for c in clusters]
+            embeddings = self.embed_batch(summaries)
+
+            new_rows, removed = [], []
+            for cluster, summary, embedding in zip(clusters, summaries, embeddings):
+                if not summary or not embedding:
+                    continue
+                first = time.strftime("%Y-%m-%d", time.localtime(min(r["timestamp"] for r in cluster)))
+                last = time.strftime("%Y-%m-%d", time.localtime(max(r["timestamp"] for r in cluster)))
+                new_rows.append({
+                    "vector": embedding,
+                    "role": "summary",
+                    "content": f"[Summary of {len(cluster)} memories, {first} to {last}] {summary}",
+                    "timestamp": max(r["timestamp"] for r in cluster),
+                    "hits": sum(r.get("hits", 1) for r in cluster)
+                })
+                removed.extend(cluster)
+
+            # Add before delete: an interrupted run leaves duplicates, never a gap
+            if new_rows:
+                table.add(new_rows)
+                self._delete(table, removed)
+                consolidated = len(removed)
+
+        evicted = self._enforce_cap(table)
+        memory.compact(table)
+        if verbose:
+            print(f"Condensed {consolidated} rows into summaries, evicted {evicted} rows")
+        return {"clusters": len(clusters), "consolidated": consolidated, "evicted": evicted}
+
+    def _enforce_cap(self, table):
+        overflow = table.count_rows() - self.policy.max_rows
+        if overflow <= 0:
+            return 0
+        rows = table.search().where("timestamp > 0").with_row_id(True) \
+            .select(["content", "timestamp", "hits"]).limit(table.count_rows()).to_list()
+        rows.sort(key=lambda r: (r.get("hits", 1), r["timestamp"]))
+        victims = rows[:overflow]
+        self._delete(table, victims)
+        return len(victims)
+
+    def _delete(self, table, rows):
+        ids = [r["_rowid"] for r in rows]
+        for i in range(0, len(ids), 500):
+            table.delete(f"_rowid IN ({', '.join(str(x) for x in ids[i:i + 500])})")
+        if self.memory.hot is not None:
+            self.memory.hot.discard({(r["content"], r["timestamp"]) for r in rows})
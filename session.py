@@ -0,0 +1,91 @@
+import requests
+
+class GenerateSession:
+    # Keeps the context tokens /api/generate hands back so each turn only sends the
+    # messages added since the last reply instead of re-tokenizing the whole transcript.
+    # Falls back to a full replay whenever the carried context can't be trusted.
+    def __init__(self, client, model, system_prompt, messages=None):
+        self.client = client
+        self.model = model
+        self.system_prompt = system_prompt
+        self.messages = list(messages or [])
+        self.context = None
+        self.last_response = {} # Final chunk of the last reply (timings, eval counts)
+        self.last_prompt_chars = None # Characters sent by the last full replay, None after a delta
+        self.replays = 0
+        self.deltas = 0
+        self._context_model = None
+        self._context_system = None
+        self._sent = [] # Snapshot of the messages the context already covers
+
+    def add(self, role, content):
+        self.messages.append({"role": role, "content": content})
+
+    def invalidate(self):
+        self.context = None
+        self._sent = []
+
+    @staticmethod
+    def render(messages):
+        prompt = ""
+        for msg in messages:
+            if msg["role"] == "user":
+                prompt += f"\nUser: {msg['content']}\n"
+            elif msg["role"] == "assistant":
+                prompt += f"\nAssistant: {msg['content']}\n"
+        return prompt + "\nAssistant: "
+
+    def _context_valid(self):
+        return (
+            self.context is not None
+            and self._context_model == self.model
+            and self._context_system == self.system_prompt
+            and self.messages[:len(self._sent)] == self._sent
+        )
+
+    def _prepare(self):
+        if self._context_valid():
+            # The system prompt is already part of the carried context
+            return self.render(self.messages[len(self._sent):]), None, self.context
+        return self.render(self.messages), self.system_prompt, None
+
+    def reply(self, stream=True):
+        # Yields the GENERAL's reply as it arrives and records it as an assistant message
+        prompt, system_prompt, context = self._prepare()
+        try:
+            yield from self._run(prompt, system_prompt, context, stream)
+        except requests.HTTPError:
+            if context is None:
+                raise
+            # The server rejected the carried context, start over with the full transcript
+            self.invalidate()
+            prompt, system_prompt, context = self._prepare()
+            yield from self._run(prompt, system_prompt, context, stream)
+
+    def _run(self, prompt, system_prompt, context, stream):
+        text = ""
+        final = {}
+        if stream:
+            for chunk in self.client.generate_stream(prompt, system_prompt=system_prompt, context=context, model=self.model):
+                token = chunk.get("response", "")
+                text += token
+                if chunk.get("done"):
+                    final = chunk
+                yield token
+        else:
+            final = self.client.generate(prompt, system_prompt=system_prompt, context=context, model=self.model)
+            text = final.get("response", "")
+            yield text
+
+        if context is None:
+            self.replays += 1
+            self.last_prompt_chars = len(prompt) + len(system_prompt or "")
+        else:
+            self.deltas += 1
+            self.last_prompt_chars = None
+        self.add("assistant", text)
+        self.last_response = final
+        self.context = final.get("context")
+        self._context_model = self.model
+        self._context_system = self.system_prompt
+        self._sent = list(self.messages)
@@ -0,0 +1,39 @@
+import os
+import sqlite3
+import threading
+
+class SqliteCache:
+    # Plumbing shared by the on-disk caches: one WAL-mode SQLite file that any thread may
+    # use behind a lock, plus hit/miss counters. Subclasses name their table, create it in
+    # _create_schema and keep only their own keying and eviction.
+    table = None
+
+    def __init__(self, path):
+        self.path = os.path.expanduser(path)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        parent = os.path.dirname(self.path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+        self._conn.commit()
+
+    def _create_schema(self):
+        raise NotImplementedError
+
+    def _entries(self):
+        return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def stats(self):
+        with self._lock:
+            entries = self._entries()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
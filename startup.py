@@ -0,0 +1,33 @@
+import sys
+import time
+
+# Only needed once memory is queried; importing any of them before the first request
+# is a startup regression
+HEAVY_MODULES = ("lancedb", "pyarrow", "numpy", "pandas")
+
+class StartupTimer:
+    # Milestones from process start to the first GENERAL token, printed by --startup-report
+    def __init__(self, started=None):
+        self.started = started if started is not None else time.perf_counter()
+        self.marks = []
+        self.eager = []
+
+    def mark(self, name):
+        # Only the first occurrence counts (e.g. the first token of the first request)
+        if name not in (m for m, _ in self.marks):
+            self.marks.append((name, time.perf_counter()))
+
+    def check_imports(self):
+        self.eager = [m for m in HEAVY_MODULES if m in sys.modules]
+
+    def report(self, extra=()):
+        lines = ["--- Startup report ---"]
+        previous = self.started
+        for name, at in self.marks:
+            lines.append(f"{name:<22} +{(at - previous) * 1000:8.1f} ms  {(at - self.started) * 1000:8.1f} ms")
+            previous = at
+        for name, seconds in extra:
+            if seconds is not None:
+                lines.append(f"{name:<22} {seconds * 1000:9.1f} ms")
+        lines.append(f"heavy imports at startup: {', '.join(self.eager) or 'none'}")
+        return "\n".join(lines)
@@ -0,0 +1,126 @@
+import re
+
+# Rough chars per token for budgeting; the SCRIBE's tokenizer isn't available here
+CHARS_PER_TOKEN = 4
+PROMPT_OVERHEAD_TOKENS = 32
+
+SIGNAL_RE = re.compile(
+    r'\b(error|errors|fail|failed|failure|fatal|panic|exception|traceback|warn|warning|critical|'
+    r'denied|refused|segfault|killed|timeout|timed out|not found|no such|cannot|unable)\b',
+    re.IGNORECASE
+)
+DIGITS_RE = re.compile(r'\d+')
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def collapse_repeats(lines):
+    # Runs of lines that only differ in numbers (counters, timestamps, PIDs) become one line
+    collapsed = []
+    previous_key = None
+    count = 0
+    for line in lines:
+        key = DIGITS_RE.sub("#", line.strip())
+        if key == previous_key:
+            count += 1
+            continue
+        if count > 1:
+            collapsed[-1] += f"  [repeated {count} times]"
+        collapsed.append(line)
+        previous_key = key
+        count = 1
+    if count > 1:
+        collapsed[-1] += f"  [repeated {count} times]"
+    return collapsed
+
+def prefilter(text, head_lines=40, tail_lines=40, signal_lines=120):
+    # Shrinks output without an LLM: repeats collapsed, then head and tail kept plus the
+    # error/warning lines from the middle
+    lines = collapse_repeats(text.splitlines())
+    if len(lines) <= head_lines + tail_lines:
+        return "\n".join(lines)
+    middle = lines[head_lines:len(lines) - tail_lines]
+    signal = [line for line in middle if SIGNAL_RE.search(line)]
+    kept = signal[:signal_lines]
+    return "\n".join(
+        lines[:head_lines]
+        + [f"[... {len(middle)} lines omitted, {len(kept)} of {len(signal)} error/warning lines kept ...]"]
+        + kept
+        + ["[...]"]
+        + lines[len(lines) - tail_lines:]
+    )
+
+def split_chunks(text, chunk_tokens):
+    # Line-aligned chunks of at most chunk_tokens; overlong lines are cut
+    limit = chunk_tokens * CHARS_PER_TOKEN
+    chunks = []
+    current = ""
+    for line in text.splitlines():
+        line = line[:limit]
+        if current and len(current) + len(line) + 1 > limit:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n{line}" if current else line
+    if current:
+        chunks.append(current)
+    return chunks
+
+class OutputSummarizer:
+    # Map-reduce summarization for the SCRIBE: the pre-filtered output is fitted into a
+    # token budget, split into context-sized chunks summarized in parallel, and the
+    # partial summaries are combined in one last call. Output size past the budget only
+    # costs pre-filtering time.
+    def __init__(self, generate, executor=None, chunk_tokens=1024, budget_tokens=8192, summary_tokens=160):
+        self.generate = generate # prompt -> SCRIBE response text
+        self.executor = executor # Optional pool for the map step
+        # Per-call input, sized for the SCRIBE's context; a budget smaller than one chunk
+        # shrinks the chunk, or the single call would already go over it
+        self.chunk_tokens = max(1, min(chunk_tokens, budget_tokens - PROMPT_OVERHEAD_TOKENS))
+        self.budget_tokens = budget_tokens # Hard cap on output tokens sent over all calls
+        self.summary_tokens = summary_tokens # Partial summaries are cut to this before reducing
+
+    def _max_chunks(self):
+        # Each chunk costs its own tokens plus its partial summary in the reduce call;
+        # PROMPT_OVERHEAD_TOKENS covers the per-call headers
+        usable = self.budget_tokens - PROMPT_OVERHEAD_TOKENS
+        return max(1, usable // (self.chunk_tokens + self.summary_tokens + PROMPT_OVERHEAD_TOKENS))
+
+    def fit(self, text):
+        # Pre-filter, tightening the line quotas until the text fits the map budget
+        budget = self._max_chunks() * self.chunk_tokens
+        head, tail, signal = 40, 40, 120
+        filtered = prefilter(text, head, tail, signal)
+        while estimate_tokens(filtered) > budget and head > 5:
+            head, tail, signal = head // 2, tail // 2, signal // 2
+            filtered = prefilter(text, head, tail, signal)
+        if estimate_tokens(filtered) > budget:
+            # Very long lines: keep both ends of the text
+            marker = "\n[... truncated ...]\n"
+            half = (budget * CHARS_PER_TOKEN - len(marker)) // 2 - CHARS_PER_TOKEN
+            filtered = f"{filtered[:half]}{marker}{filtered[-half:]}"
+        return filtered
+
+    def summarize(self, text):
+        filtered = self.fit(text)
+        chunks = split_chunks(filtered, self.chunk_tokens)
+        if len(chunks) > self._max_chunks():
+            # Line alignment left some slack; the end of the output matters most
+            chunks = chunks[:self._max_chunks() - 1] + chunks[-1:]
+        if len(chunks) == 1:
+            return self.generate(f"OUTPUT TO SUMMARIZE:\n{chunks[0]}").strip()
+
+        prompts = [
+            f"OUTPUT TO SUMMARIZE (part {i + 1} of {len(chunks)}):\n{chunk}"
+            for i, chunk in enumerate(chunks)
+        ]
+        if self.executor is not None:
+            partials = list(self.executor.map(self.generate, prompts))
+        else:
+            partials = [self.generate(prompt) for prompt in prompts]
+
+        limit = self.summary_tokens * CHARS_PER_TOKEN
+        combined = "\n".join(f"- Part {i + 1}: {partial.strip()[:limit]}" for i, partial in enumerate(partials))
+        return self.generate(
+            "OUTPUT TO SUMMARIZE (partial summaries of one command's output, in order; "
+            f"combine them into one):\n{combined}"
+        ).strip()
@@ -0,0 +1,60 @@
+from memory_manager import MemoryManager
+import numpy as np
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+def test_ann_index():
+    path = "/tmp/test_ann_index"
+    if os.path.exists(path):
+        shutil.rmtree(path)
+
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(600, 16)).astype(np.float32)
+    memory = MemoryManager(db_path=path, model_name="test-model", dimension=16, dedup_roles=(),
+                           flush_size=100, index_min_rows=400)
+    for i, vector in enumerate(vectors[:300]):
+        memory.store_interaction("system", f"row {i}", vector.tolist())
+    memory.flush()
+    memory.wait_for_maintenance()
+    assert not memory._has_index # Small tables are scanned flat
+
+    # The maintainer builds the index once the table passes index_min_rows
+    for i, vector in enumerate(vectors[300:], start=300):
+        memory.store_interaction("system", f"row {i}", vector.tolist())
+    memory.flush()
+    memory.wait_for_maintenance()
+    assert memory._has_index
+    assert memory._load_meta()[memory.table_name]["index_trained_rows"] >= 400
+    hit = memory.retrieve_context(vectors[123].tolist(), top_k=1)
+    assert hit[0][0] == "row 123"
+    report = memory.check_recall(samples=20)
+    print(f"Recall report: {report}")
+    assert report["indexed"] and report["recall"] >= 0.5
+    memory.close()
+
+    # Exiting doesn't wait for an index build, but buffered rows are still written
+    script = (
+        "import sys, time; sys.path.insert(0, %r)\n"
+        "from memory_manager import MemoryManager\n"
+        "MemoryManager._maintain = lambda self, table, name: time.sleep(30)\n"
+        "memory = MemoryManager(db_path=%r, model_name='test-model', dimension=16, flush_size=2)\n"
+        "memory.store_interaction('system', 'first', [1.0] * 16)\n"
+        "memory.store_interaction('system', 'starts maintenance', [1.0, -1.0] * 8)\n"
+        "memory.store_interaction('system', 'written at exit', [1.0, 1.0, -1.0, -1.0] * 4)\n"
+        "assert memory.stats()['pending'] == 1\n"
+    ) % (os.path.dirname(os.path.abspath(__file__)), path)
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", script], check=True, timeout=20)
+    elapsed = time.perf_counter() - started
+    print(f"Exit took {elapsed:.1f}s with maintenance running")
+    assert elapsed < 10
+    reopened = MemoryManager(db_path=path, model_name="test-model", dimension=16)
+    assert reopened.table.search().where("content = 'written at exit'").limit(1).to_list()
+    reopened.close()
+    print("ANN index test passed!")
+
+if __name__ == "__main__":
+    test_ann_index()
@@ -0,0 +1,22 @@
+from block_parser import BlockParser
+
+def test_block_parser():
+    response = "Sure.\n```PLAN\nList all files\n```\nThen\n```bash\ndf -h\n```\nDone."
+    parser = BlockParser()
+    blocks = []
+    # Feed in small pieces like a token stream, fences split across chunks
+    for i in range(0, len(response), 3):
+        blocks.extend(parser.feed(response[i:i + 3]))
+
+    print(f"Blocks: {blocks}")
+    assert blocks == [("PLAN", "List all files\n"), ("bash", "df -h\n")]
+    assert parser.text == response
+
+    # A PLAN is emitted as soon as its fence closes, not at the end
+    parser = BlockParser()
+    assert parser.feed("```PLAN\ncheck disk\n") == []
+    assert parser.feed("```\nstill talking") == [("PLAN", "check disk\n")]
+    print("Block parser test passed!")
+
+if __name__ == "__main__":
+    test_block_parser()
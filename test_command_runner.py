@@ -0,0 +1,58 @@
+from command_runner import BoundedCapture, OutputLimits, run_streaming
+import os
+import time
+
+def test_bounded_capture():
+    capture = BoundedCapture(head_bytes=4, tail_bytes=4)
+    for chunk in [b"abc", b"defgh", b"ijklmn"]:
+        capture.write(chunk)
+    print(f"Capture: {capture.text()!r}")
+    assert capture.total == 14
+    assert capture.truncated == 6
+    assert capture.text() == "abcd\n[... 6 bytes truncated ...]\nklmn"
+
+def running(command_line, grace=2.0):
+    # True if a process with this command line is still around after grace seconds
+    deadline = time.time() + grace
+    while True:
+        found = False
+        for pid in os.listdir("/proc"):
+            try:
+                with open(f"/proc/{pid}/cmdline", "rb") as f:
+                    found = found or f.read().replace(b"\0", b" ").strip() == command_line.encode()
+            except (OSError, ValueError):
+                continue
+        if not found or time.time() > deadline:
+            return found
+        time.sleep(0.05)
+
+def test_run_streaming():
+    result = run_streaming("echo out; echo err >&2; exit 3", OutputLimits(echo=False))
+    print(f"Result: {result.summary()}")
+    assert result.exit_code == 3
+    assert result.stdout.text() == "out\n"
+    assert result.stderr.text() == "err\n"
+    assert result.truncated_bytes == 0
+
+    # Wall-clock and byte limits kill the command
+    result = run_streaming("sleep 5", OutputLimits(timeout=0.3, echo=False))
+    assert result.timed_out and result.duration < 2
+    result = run_streaming("yes", OutputLimits(max_bytes=100000, head_bytes=10, tail_bytes=10, echo=False))
+    assert result.over_limit
+    assert result.truncated_bytes > 0
+
+    # The whole pipeline is killed, not just the shell
+    result = run_streaming("sleep 100.25 | cat", OutputLimits(timeout=0.3, echo=False))
+    assert result.timed_out and result.duration < 2
+    assert not running("sleep 100.25")
+    result = run_streaming("sleep 100.5 & yes", OutputLimits(max_bytes=100000, echo=False))
+    assert result.over_limit and not running("sleep 100.5")
+
+    # Without a terminal the command reads /dev/null instead of waiting for input
+    result = run_streaming("cat", OutputLimits(timeout=2, interactive=False, echo=False))
+    assert not result.timed_out and result.exit_code == 0
+    print("Command runner test passed!")
+
+if __name__ == "__main__":
+    test_bounded_capture()
+    test_run_streaming()
@@ -0,0 +1,45 @@
+from concurrent.futures import ThreadPoolExecutor
+from mock_ollama import MockOllama
+from ollama_client import OllamaClient
+import requests
+
+def test_connection_pool():
+    mock = MockOllama(tokens_per_second=0, load_seconds=0, embed_seconds=0, model_seconds={"slow": 0.2}).start()
+    try:
+        # Sequential calls share one keep-alive connection
+        client = OllamaClient(base_url=mock.url.replace("http://", ""), model="mistral-nemo:12b", pool_size=2)
+        for _ in range(5):
+            client.generate("hello")
+        stats = client.connection_stats()
+        print(f"Sequential: {stats}")
+        assert stats == {"requests": 5, "connections_opened": 1, "connections_reused": 4}
+
+        # Concurrent calls open at most pool_size connections and reuse them
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            list(pool.map(lambda i: client.generate(f"hello {i}", model="slow"), range(6)))
+        stats = client.connection_stats()
+        print(f"Concurrent: {stats}")
+        assert stats["requests"] == 11 and stats["connections_opened"] <= 2
+
+        # Every concurrent call is counted
+        busy = OllamaClient(base_url=mock.url, model="mistral-nemo:12b", pool_size=8)
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(lambda i: busy.generate(f"hello {i}"), range(200)))
+        assert busy.connection_stats()["requests"] == 200
+        busy.close()
+
+        # The read timeout applies per call
+        impatient = OllamaClient(base_url=mock.url, model="slow", read_timeout=0.05)
+        try:
+            impatient.generate("hello")
+            assert False, "expected a read timeout"
+        except requests.ReadTimeout:
+            pass
+        client.close()
+        impatient.close()
+    finally:
+        mock.stop()
+    print("Connection pool test passed!")
+
+if __name__ == "__main__":
+    test_connection_pool()
@@ -0,0 +1,53 @@
+from context_window import ContextWindow
+from session import GenerateSession
+from test_session import RecordingClient
+
+def big_output(name, lines=150):
+    body = "\n".join(f"{name} line {i}: some verbose output" for i in range(lines))
+    return f"Command output:\nCommand Output (exit 0 after 0.10s):\n{body}\n\nPlease analyze and continue."
+
+def test_context_window():
+    client = RecordingClient()
+    session = GenerateSession(client, "general", "SYSTEM", messages=[{"role": "user", "content": "check the logs"}])
+    window = ContextWindow(budget_tokens=2000)
+
+    list(session.reply(stream=False))
+    session.add("user", big_output("first"))
+    assert not window.fit(session) or window.total(session) <= 2000
+    list(session.reply(stream=False))
+    session.add("user", big_output("second"))
+
+    # Over budget: the older output becomes a digest, the request and the last turn stay
+    assert window.fit(session)
+    print(f"Compacted transcript: {[m['content'][:60] for m in session.messages]}")
+    assert window.total(session) <= 2000
+    assert session.messages[0]["content"] == "check the logs"
+    assert session.messages[2]["content"].startswith("[Earlier command output, condensed] Command Output (exit 0")
+    assert session.messages[-1]["content"] == big_output("second")
+    assert session.messages[1]["content"] == "reply 1"
+
+    # The carried context covered the old text, so the next reply replays
+    list(session.reply(stream=False))
+    assert client.calls[-1]["context"] is None
+
+    # Even a single huge output is cut down to the budget
+    session.add("user", big_output("third", lines=5000))
+    assert window.fit(session)
+    assert window.total(session) <= 2000
+    assert "truncated to fit the context window" in session.messages[-1]["content"]
+
+def test_calibration():
+    window = ContextWindow(chars_per_token=4.0)
+
+    class Replayed:
+        last_prompt_chars = 3000
+        last_response = {"prompt_eval_count": 1000}
+
+    window.calibrate(Replayed())
+    print(f"Calibrated chars per token: {window.chars_per_token:.2f}")
+    assert 3.0 < window.chars_per_token < 4.0
+    print("Context window test passed!")
+
+if __name__ == "__main__":
+    test_context_window()
+    test_calibration()
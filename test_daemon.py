@@ -0,0 +1,74 @@
+from daemon import _peer_uid, serve
+import os
+import socket
+import stat
+import subprocess
+import sys
+import threading
+import time
+
+def test_daemon_round_trip():
+    socket_path = "/tmp/test_daemon/agent.sock"
+    requests_seen = []
+
+    def handle(request, auto_confirm):
+        requests_seen.append((request, auto_confirm, os.getcwd()))
+        print(f"Working on: {request}")
+        answer = input("Proceed? (y/n): ")
+        print(f"Answer was {answer}")
+
+    threading.Thread(target=serve, args=(socket_path, handle), daemon=True).start()
+    for _ in range(50):
+        if os.path.exists(socket_path):
+            break
+        time.sleep(0.1)
+
+    client = (
+        "import sys\n"
+        "from daemon import forward_request\n"
+        f"sys.exit(forward_request({socket_path!r}, 'check disk', auto_confirm=True))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", client], input="y\n", capture_output=True, text=True,
+        cwd="/tmp", env=dict(os.environ, PYTHONPATH=os.path.dirname(os.path.abspath(__file__)))
+    )
+    print(f"Client output: {result.stdout!r}")
+    assert result.returncode == 0
+    assert "Working on: check disk" in result.stdout
+    assert "Proceed? (y/n): Answer was y" in result.stdout
+    assert requests_seen == [("check disk", True, "/tmp")]
+
+    # Only the owner can reach the socket, and the daemon knows who connected
+    assert stat.S_IMODE(os.stat(socket_path).st_mode) == 0o600
+    left, right = socket.socketpair(socket.AF_UNIX)
+    assert _peer_uid(left) in (None, os.getuid())
+    left.close()
+    right.close()
+
+    if os.getuid() == 0:
+        # Even with the permissions opened up, another user's request is refused
+        os.chmod(os.path.dirname(socket_path), 0o755)
+        os.chmod(socket_path, 0o666)
+        pid = os.fork()
+        if pid == 0:
+            os.setuid(65534)
+            conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            conn.connect(socket_path)
+            try:
+                conn.sendall(b'{"type": "request", "request": "rm -rf ~", "yes": true}\n')
+            except OSError:
+                pass # Refused before the request was read
+            data = b""
+            while b'"done"' not in data:
+                chunk = conn.recv(4096)
+                if not chunk:
+                    break
+                data += chunk
+            os._exit(0 if b"another user" in data else 1)
+        _, status = os.waitpid(pid, 0)
+        assert os.waitstatus_to_exitcode(status) == 0
+        assert len(requests_seen) == 1
+    print("Daemon test passed!")
+
+if __name__ == "__main__":
+    test_daemon_round_trip()
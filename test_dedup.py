@@ -0,0 +1,74 @@
+from memory_manager import MemoryManager
+import lancedb
+import os
+import shutil
+
+def test_dedup():
+    path = "/tmp/test_dedup"
+    if os.path.exists(path):
+        shutil.rmtree(path)
+
+    memory = MemoryManager(db_path=path, model_name="test-model", dimension=3, dedup_threshold=0.97)
+    memory.store_interaction("system", "disk usage: 40% of /", [1.0, 0.0, 0.0], timestamp=100.0)
+    memory.store_interaction("user", "how full is the disk", [1.0, 0.0, 0.0], timestamp=100.0)
+    # Still buffered: the pending row itself is bumped
+    memory.store_interaction("system", "disk usage: 40% of /", [1.0, 0.01, 0.0], timestamp=110.0)
+    memory.flush()
+
+    updates = []
+    update = memory.table.update
+    def counting_update(*args, **kwargs):
+        updates.append(kwargs)
+        return update(*args, **kwargs)
+    memory.table.update = counting_update
+
+    # Stored rows are bumped in one write at the next flush, not one write per duplicate
+    memory.store_interaction("system", "disk usage: 41% of /", [1.0, 0.02, 0.0], timestamp=120.0)
+    memory.store_interaction("system", "disk usage: 40% of /", [0.99, 0.0, 0.0], timestamp=130.0)
+    memory.store_interaction("user", "how full is the disk", [1.0, 0.0, 0.0], timestamp=140.0) # Other roles are kept
+    memory.store_interaction("system", "uptime: 3 days", [0.0, 1.0, 0.0], timestamp=150.0)
+    assert updates == []
+    memory.flush()
+    print(f"Updates: {updates}")
+    assert len(updates) == 1
+
+    rows = memory.table.search().where("timestamp > 0").limit(100).to_list()
+    by_role = sorted((r["role"], r["content"], r["hits"], r["timestamp"]) for r in rows)
+    print(f"Rows: {by_role}")
+    assert by_role == [
+        ("system", "disk usage: 40% of /", 4, 130.0),
+        ("system", "uptime: 3 days", 1, 150.0),
+        ("user", "how full is the disk", 1, 100.0),
+        ("user", "how full is the disk", 1, 140.0),
+    ]
+    assert memory.dedup_hits == 3
+
+    # Another process compacting the table between a bump and the flush moves row ids;
+    # the bump still lands on its row
+    memory.store_interaction("system", "uptime: 3 days", [0.0, 1.0, 0.01], timestamp=160.0)
+    other = lancedb.connect(path).open_table(memory.table_name)
+    other.delete("content = 'disk usage: 40% of /'")
+    other.optimize()
+    memory.table.checkout_latest()
+    memory.flush()
+    rows = memory.table.search().where("timestamp > 0").limit(100).to_list()
+    print(f"After compaction elsewhere: {sorted((r['content'], r['hits']) for r in rows)}")
+    assert {r["content"]: r["hits"] for r in rows if r["role"] == "system"} == {"uptime: 3 days": 2}
+    memory.close()
+
+    # With a hot tier, a bumped row keeps one key across both tiers and comes back once
+    shutil.rmtree(path)
+    memory = MemoryManager(db_path=path, model_name="test-model", dimension=3, hot_tier_size=8)
+    memory.store_interaction("system", "load average: 0.5", [0.0, 0.0, 1.0], timestamp=100.0)
+    memory.flush()
+    memory.store_interaction("system", "load average: 0.5", [0.0, 0.01, 1.0], timestamp=200.0)
+    memory.flush()
+    hits = [content for content, *_ in memory.retrieve_context([0.0, 0.0, 1.0], top_k=5)]
+    print(f"Hot tier hits: {hits}")
+    assert hits.count("load average: 0.5") == 1
+    assert [row["timestamp"] for row in memory.hot.rows if row] == [200.0]
+    memory.close()
+    print("Dedup test passed!")
+
+if __name__ == "__main__":
+    test_dedup()
@@ -0,0 +1,32 @@
+from mock_ollama import MockOllama
+from ollama_client import OllamaClient
+
+def test_pack_batches():
+    texts = ["a" * 10, "b" * 10, "c" * 50, "d" * 10, "e", "f"]
+    batches = list(OllamaClient._pack_batches(texts, max_batch_size=3, max_batch_chars=30))
+    print(f"Batches: {[[t[0] for t in b] for b in batches]}")
+    # Order is kept, an oversized text gets a batch of its own
+    assert batches == [["a" * 10, "b" * 10], ["c" * 50], ["d" * 10, "e", "f"]]
+
+def test_embed_batch():
+    mock = MockOllama(load_seconds=0, embed_seconds=0, dimension=8).start()
+    try:
+        client = OllamaClient(base_url=mock.url, embed_model="nomic-embed-text:latest")
+        texts = ["list files", "show disk usage", "list files", "uptime", "who is logged in"]
+        vectors = client.get_embeddings_batch(texts, max_batch_size=2)
+        embeds = [model for path, model in mock.calls if path == "/api/embed"]
+        print(f"{len(embeds)} embed calls for {len(texts)} texts")
+        # One round trip per batch, the duplicate embedded once, results in input order
+        assert len(embeds) == 2
+        assert vectors == [mock.embedding(text) for text in texts]
+        # Without a residency scheduler the embedder is unloaded once per call, not per batch
+        assert [path for path, model in mock.calls].count("/api/generate") == 1
+        assert client.get_embeddings("uptime") == mock.embedding("uptime")
+        assert client.get_embeddings_batch([]) == []
+    finally:
+        mock.stop()
+    print("Embed batch test passed!")
+
+if __name__ == "__main__":
+    test_pack_batches()
+    test_embed_batch()
@@ -0,0 +1,40 @@
+from embedding_cache import EmbeddingCache
+import os
+
+def test_embedding_cache():
+    path = "/tmp/test_embedding_cache.db"
+    for suffix in ["", "-wal", "-shm"]:
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    cache = EmbeddingCache(path=path, max_entries=2)
+
+    assert cache.get("nomic", "git status") is None
+    cache.put("nomic", "git status", [0.1, 0.2, 0.3], cost=0.5)
+
+    # Same text under another model is a different key
+    assert cache.get("other", "git status") is None
+    assert cache.get("nomic", "git status") == [0.1, 0.2, 0.3]
+
+    # Third entry evicts the least recently used one
+    cache.put("nomic", "ls -la", [1.0])
+    cache.get("nomic", "git status")
+    cache.put("nomic", "df -h", [2.0])
+    assert cache.get("nomic", "ls -la") is None
+    assert cache.get("nomic", "git status") == [0.1, 0.2, 0.3]
+
+    stats = cache.stats()
+    print(f"Cache stats: {stats}")
+    assert stats["hits"] == 3
+    assert stats["misses"] == 3
+    assert stats["entries"] == 2
+    assert abs(stats["saved_seconds"] - 1.5) < 1e-9
+
+    # Entries survive a reopen
+    cache.close()
+    cache = EmbeddingCache(path=path, max_entries=2)
+    assert cache.get("nomic", "df -h") == [2.0]
+    print("Embedding cache test passed!")
+
+if __name__ == "__main__":
+    test_embedding_cache()
@@ -0,0 +1,56 @@
+from environment import EnvironmentSnapshot
+import os
+import shutil
+import subprocess
+
+def test_environment():
+    repo = "/tmp/test_environment_repo"
+    shutil.rmtree(repo, ignore_errors=True)
+    os.makedirs(repo)
+    git = lambda *args: subprocess.run(["git", "-C", repo, *args], check=True, capture_output=True)
+    git("init", "-q", "-b", "main")
+    for name in ("a.txt", "b.txt", ".hidden"):
+        with open(os.path.join(repo, name), "w") as f:
+            f.write(name)
+    git("add", "-A")
+    git("-c", "user.name=t", "-c", "user.email=t@t", "commit", "-q", "-m", "init")
+
+    env = EnvironmentSnapshot(max_files=1, git_ttl=0)
+    files, total = env.listing(repo)
+    print("Listing:", files, total)
+    assert files == ["a.txt"] and total == 2 # Dotfiles hidden, capped at max_files
+    assert env.git_state(repo) == ("main", False)
+
+    # Touched but unchanged content isn't a modification, unless it is too big to hash
+    os.utime(os.path.join(repo, "a.txt"), None)
+    assert env.git_state(repo) == ("main", False)
+    assert EnvironmentSnapshot(max_hash_bytes=0).git_state(repo) == ("main", True)
+    with open(os.path.join(repo, "b.txt"), "w") as f:
+        f.write("changed")
+    assert env.git_state(repo) == ("main", True)
+
+    # A dirty result is kept until the index changes
+    cached = EnvironmentSnapshot()
+    assert cached.git_state(repo) == ("main", True)
+    with open(os.path.join(repo, "b.txt"), "w") as f:
+        f.write("b.txt")
+    assert cached.git_state(repo) == ("main", True)
+    git("add", "b.txt")
+    assert cached.git_state(repo) == ("main", False)
+    with open(os.path.join(repo, "b.txt"), "w") as f:
+        f.write("changed again")
+
+    # New files show up once the directory's mtime moves
+    os.mkdir(os.path.join(repo, "sub"))
+    files, total = env.listing(repo)
+    assert total == 3
+
+    text = env.render(repo)
+    print(text)
+    assert "Git: branch main, uncommitted changes" in text
+    assert "Files in CWD (top 1 of 3)" in text
+    assert EnvironmentSnapshot().git_state("/") is None
+    print("Environment snapshot test passed!")
+
+if __name__ == "__main__":
+    test_environment()
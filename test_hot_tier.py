@@ -0,0 +1,53 @@
+from hot_tier import HotTier
+import os
+import shutil
+
+def test_hot_tier():
+    path = "/tmp/test_hot_tier"
+    if os.path.exists(path):
+        shutil.rmtree(path)
+
+    hot = HotTier(os.path.join(path, "interactions"), dimension=3, capacity=2)
+    hot.add([1.0, 0.0, 0.0], "system", "disk output", 1.0)
+    hot.add([0.0, 1.0, 0.0], "system", "memory output", 2.0)
+
+    hits = hot.search([0.0, 2.0, 0.1], top_k=2)
+    print(f"Hot hits: {hits}")
+    assert hits[0][0]["content"] == "memory output"
+    assert hits[0][1] < hits[1][1]
+
+    # Capacity 2: a third row replaces the oldest one
+    hot.add([0.0, 0.0, 1.0], "system", "network output", 3.0)
+    contents = [row["content"] for row, _ in hot.search([1.0, 0.0, 0.0], top_k=5)]
+    assert contents == ["memory output", "network output"] or contents == ["network output", "memory output"]
+
+    # Survives a restart through the memory-mapped file
+    hot.save()
+    reopened = HotTier(os.path.join(path, "interactions"), dimension=3, capacity=2)
+    assert reopened.count == 2
+    assert reopened.search([0.0, 0.0, 1.0], top_k=1)[0][0]["content"] == "network output"
+
+    # Saving appends what changed instead of rewriting every row
+    journal = os.path.join(path, "interactions.jsonl")
+    with open(journal) as f:
+        before = f.read()
+    reopened.touch("system", "network output", 3.0, 4.0)
+    reopened.save()
+    with open(journal) as f:
+        after = f.read()
+    assert after.startswith(before) and after.count("\n") == before.count("\n") + 1
+    assert HotTier(os.path.join(path, "interactions"), dimension=3, capacity=2).rows[0]["timestamp"] == 4.0
+
+    # The journal is rewritten once it outgrows the tier
+    for i in range(10):
+        reopened.add([1.0, float(i), 0.0], "system", f"output {i}", 10.0 + i)
+        reopened.save()
+    with open(journal) as f:
+        assert len(f.readlines()) <= 4 * 2
+    again = HotTier(os.path.join(path, "interactions"), dimension=3, capacity=2)
+    assert sorted(row["content"] for row in again.rows) == ["output 8", "output 9"]
+    assert again.next == reopened.next and again.count == 2
+    print("Hot tier test passed!")
+
+if __name__ == "__main__":
+    test_hot_tier()
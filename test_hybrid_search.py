@@ -0,0 +1,41 @@
+from memory_manager import MemoryManager
+import os
+import shutil
+
+def test_hybrid_search():
+    path = "/tmp/test_hybrid_search"
+    if os.path.exists(path):
+        shutil.rmtree(path)
+
+    memory = MemoryManager(db_path=path, model_name="test-model", dimension=3, dedup_roles=())
+    memory.store_interaction("system", "error: permission denied while opening /etc/shadow", [1.0, 0.0, 0.0])
+    memory.store_interaction("system", "git status: nothing to commit, working tree clean", [0.0, 1.0, 0.0])
+    memory.store_interaction("system", "docker ps: no containers running", [0.7, 0.7, 0.0])
+    memory.store_interaction("user", "why does the build fail with a linker error", [0.0, 0.0, 1.0])
+    memory.store_interaction("assistant", "Run git status to see what changed, then commit what you want to keep.", [0.0, 0.5, 0.5])
+
+    # A query found verbatim in a row is answered without an embedding
+    hits = memory.retrieve_exact("Permission  denied while opening", top_k=3)
+    print(f"Exact hits: {hits}")
+    assert hits == [("error: permission denied while opening /etc/shadow", 0.0)]
+    assert memory.retrieve_exact("segmentation fault in libc", top_k=3) is None
+    assert memory.retrieve_exact("git", top_k=3) is None # Too short to be trusted
+    # A query that is only a small part of a longer row isn't a confident match
+    assert memory.retrieve_exact("git status", top_k=3) is None
+    # The user asking the same question again isn't an answer to it
+    assert memory.retrieve_exact("why does the build fail with a linker error", top_k=3) is None
+
+    # Equal cosine distance to both rows, the keyword match wins
+    plain = memory.retrieve_context([1.0, 1.0, 0.0], top_k=3)
+    fused = memory.retrieve_context([1.0, 1.0, 0.0], top_k=3, query_text="working tree")
+    print(f"Plain: {plain}\nFused: {fused}")
+    assert fused[0][0] == "docker ps: no containers running"
+    assert fused[1][0].startswith("git status")
+    assert fused[1][1] < dict(plain)[fused[1][0]]
+    # A lone keyword match is the top BM25 score but still only earns part of fts_weight
+    assert fused[1][1] > dict(plain)[fused[1][0]] * (1.0 - memory.fts_weight)
+    memory.close()
+    print("Hybrid search test passed!")
+
+if __name__ == "__main__":
+    test_hybrid_search()
@@ -0,0 +1,58 @@
+from memory_manager import MemoryManager
+import os
+import shutil
+
+def test_migration():
+    path = "/tmp/test_migration"
+    if os.path.exists(path):
+        shutil.rmtree(path)
+
+    old = MemoryManager(db_path=path, model_name="old-model", dimension=3, dedup_roles=())
+    for i in range(5):
+        old.store_interaction("system", f"output {i}", [1.0, float(i), 0.0], timestamp=1000.0 + i)
+    old.close()
+    source = old.table_name
+
+    memory = MemoryManager(db_path=path, model_name="new-model", dimension=4, dedup_roles=())
+    calls = []
+    def embed(texts):
+        calls.append(len(texts))
+        if len(calls) == 2:
+            # Interrupted partway, as when the agent exits
+            migration.stop(wait=False)
+        return [[1.0, 0.0, 0.0, float(len(t))] for t in texts]
+    legacy = []
+    def legacy_embed(model, texts):
+        legacy.append(model)
+        return [[] for _ in texts] # old-model is gone from the server
+    memory.set_embedders(embed, legacy_embed)
+
+    migration = memory.start_migration(source, background=False)
+    migration.batch_size = 2
+    migration.run()
+    state = memory._load_meta()[memory.table_name]["migration"]
+    print(f"Interrupted: {state}")
+    assert state == {"source": source, "offset": 4, "total": 6, "done": False}
+
+    # Until it is done the old table is searched as well, unless its embedder is gone
+    memory.retrieve_context([1.0, 0.0, 0.0, 8.0], top_k=3, query_text="output")
+    memory.retrieve_context([1.0, 0.0, 0.0, 8.0], top_k=3, query_text="output")
+    assert legacy == ["old-model"]
+
+    # A new process resumes from the checkpoint without copying rows twice
+    memory.close()
+    resumed = MemoryManager(db_path=path, model_name="new-model", migrate_in_background=False, dedup_roles=())
+    resumed.set_embedders(lambda texts: [[1.0, 0.0, 0.0, float(len(t))] for t in texts])
+    resumed.open_existing()
+    resumed.migration.run() # As --migrate-memory does
+    state = resumed._load_meta()[resumed.table_name]["migration"]
+    print(f"Resumed: {state}")
+    assert state["done"] and state["offset"] == 6
+    rows = resumed.table.search().where("timestamp > 0").limit(100).to_list()
+    assert sorted(r["content"] for r in rows) == [f"output {i}" for i in range(5)]
+    assert resumed.migration is None
+    resumed.close()
+    print("Migration test passed!")
+
+if __name__ == "__main__":
+    test_migration()
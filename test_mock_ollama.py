@@ -0,0 +1,53 @@
+from mock_ollama import MockOllama
+from ollama_client import OllamaClient
+from benchmark import percentile, regressions, StageTimer
+
+def test_mock_ollama():
+    mock = MockOllama(tokens_per_second=0, load_seconds=0.05, embed_seconds=0, dimension=8).start()
+    try:
+        client = OllamaClient(base_url=mock.url, model="general", embed_model="embedder")
+
+        # Canned replies are picked by the unit named in the system prompt
+        first = client.generate("count", system_prompt="You are the GENERAL (test).", model="general")
+        assert "```PLAN" in first["response"]
+        assert first["load_duration"] > 0 and first["prompt_eval_count"] > 0
+        again = client.generate("Command output:\n1\n2", model="general")
+        assert again["load_duration"] == 0 # Already loaded
+        assert "All done" in again["response"]
+        # keep_alive 0 loads the model for the call and unloads it afterwards, every time
+        for _ in range(2):
+            cold = client.generate("hi", system_prompt="You are the SCOUT unit.", model="scout", keep_alive=0)
+            assert cold["load_duration"] > 0
+            assert "scout" not in mock.loaded
+        arch = client.generate("GENERAL's PLAN: count", system_prompt="You are the ARCHITECT unit.", model="coder")
+        assert arch["response"].startswith("```bash")
+
+        streamed = "".join(c.get("response", "") for c in client.generate_stream("hi", system_prompt="You are the SCOUT unit.", model="scout"))
+        assert streamed == "SAFE"
+
+        vectors = client.get_embeddings_batch(["a", "b", "a"])
+        assert len(vectors) == 3 and len(vectors[0]) == 8
+        assert vectors[0] == vectors[2] and vectors[0] != vectors[1]
+        # Without a residency scheduler the embedder is unloaded again after the batch
+        assert "general" in client._get_available_models() and "embedder" not in mock.loaded
+    finally:
+        mock.stop()
+
+    assert percentile([5, 1, 3, 2, 4], 50) == 3
+    assert percentile([5, 1, 3, 2, 4], 95) == 5
+    assert regressions({"exec": {"p50_ms": 13.0}}, {"exec": {"p50_ms": 10.0}}, 0.2) == ["exec"]
+    assert regressions({"exec": {"p50_ms": 11.0}}, {"exec": {"p50_ms": 10.0}}, 0.2) == []
+
+    class Thing:
+        def work(self, x):
+            return x * 2
+    timer = StageTimer()
+    timer.wrap(Thing, "work", "exec")
+    assert Thing().work(2) == 4
+    timer.restore()
+    Thing().work(3)
+    assert timer.summary()["exec"]["calls"] == 1
+    print("Mock Ollama test passed!")
+
+if __name__ == "__main__":
+    test_mock_ollama()
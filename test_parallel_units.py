@@ -0,0 +1,54 @@
+from benchmark import run_agent
+from mock_ollama import MockOllama
+import os
+import tempfile
+
+def most_concurrent(spans, models):
+    # Peak number of calls to the given models that were in flight at the same time
+    events = []
+    for path, model, started, finished in spans:
+        if path == "/api/generate" and model in models:
+            events += [(started, 1), (finished, -1)]
+    peak = current = 0
+    for _, step in sorted(events): # An end sorts before a start at the same instant
+        current += step
+        peak = max(peak, current)
+    return peak
+
+def test_parallel_units():
+    # Three PLANs in one GENERAL reply; each ARCHITECT and SCOUT call takes 0.3s
+    replies = {
+        "GENERAL": "".join(f"```PLAN\nCreate marker file {i}\n```\n" for i in range(3)),
+        "ARCHITECT": "```bash\ntouch tc-parallel-marker\n```",
+    }
+    mock = MockOllama(
+        load_seconds=0, embed_seconds=0, tokens_per_second=0, replies=replies,
+        model_seconds={"qwen2.5-coder:1.5b": 0.3, "gemma3:1b": 0.3}
+    ).start()
+    saved_home, saved_cwd = os.environ.get("HOME"), os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="tc-parallel-")
+    os.environ["HOME"] = workdir
+    os.chdir(workdir)
+    try:
+        overlap = {}
+        for parallel in ("1", "3"):
+            mock.calls.clear()
+            mock.spans.clear()
+            run_agent(["make the markers"], mock.url, ["-j", parallel, "--no-verdict-cache"])
+            models = [model for path, model in mock.calls if path == "/api/generate"]
+            assert models.count("qwen2.5-coder:1.5b") == 3 and models.count("gemma3:1b") == 3
+            overlap[parallel] = most_concurrent(mock.spans, {"qwen2.5-coder:1.5b", "gemma3:1b"})
+        print(f"Most unit calls in flight by --parallel: {overlap}")
+        # One worker runs the unit calls back to back; three workers overlap them
+        assert overlap["1"] == 1
+        assert overlap["3"] >= 2
+        assert os.path.exists(os.path.join(workdir, "tc-parallel-marker"))
+    finally:
+        os.chdir(saved_cwd)
+        if saved_home is not None:
+            os.environ["HOME"] = saved_home
+        mock.stop()
+    print("Parallel units test passed!")
+
+if __name__ == "__main__":
+    test_parallel_units()
@@ -0,0 +1,69 @@
+from mock_ollama import MockOllama
+from ollama_client import OllamaClient
+from probe_cache import ProbeCache
+import os
+import time
+
+def test_probe_cache():
+    path = "/tmp/test_probe_cache.db"
+    if os.path.exists(path):
+        os.remove(path)
+
+    mock = MockOllama(
+        load_seconds=0, embed_seconds=0, dimension=8,
+        models=["broken", "chat-model", "slow-embed", "fast-embed", "stuck-embed"],
+        embed_models={"slow-embed", "fast-embed", "stuck-embed"},
+        model_seconds={"slow-embed": 0.3, "stuck-embed": 5}
+    ).start()
+    try:
+        client = OllamaClient(base_url=mock.url, embed_model="broken", probe_cache=ProbeCache(path), probe_deadline=1.5)
+        started = time.perf_counter()
+        vectors = client.get_embeddings_batch(["hello"])
+        elapsed = time.perf_counter() - started
+        print(f"Picked {client.embed_model} in {elapsed:.2f}s")
+        # All probes run at once and the first working answer wins, without waiting for the rest
+        assert client.embed_model == "fast-embed"
+        assert len(vectors[0]) == 8
+        assert elapsed < 1
+
+        # Slower probes still record their answers once they finish or time out
+        time.sleep(1.8 - elapsed)
+
+        cache = ProbeCache(path)
+        digest = mock.digest("slow-embed")
+        assert cache.get(mock.url, "slow-embed", digest)["supported"]
+        assert cache.get(mock.url, "fast-embed", mock.digest("fast-embed"))["dimension"] == 8
+        assert not cache.get(mock.url, "chat-model", mock.digest("chat-model"))["supported"]
+        # A probe that timed out is remembered, but only for a while
+        assert cache.get(mock.url, "stuck-embed", mock.digest("stuck-embed"))["timed_out"]
+        assert ProbeCache(path, timeout_ttl=0).get(mock.url, "stuck-embed", mock.digest("stuck-embed")) is None
+        assert ProbeCache(path, timeout_ttl=0).get(mock.url, "slow-embed", digest)["supported"]
+        # A re-pulled model has a new digest and is probed again
+        assert cache.get(mock.url, "slow-embed", "other-digest") is None
+
+        # A new process reuses the results instead of probing again
+        mock.calls.clear()
+        fresh = OllamaClient(base_url=mock.url, embed_model="broken", probe_cache=cache, probe_deadline=1.5)
+        fresh.get_embeddings_batch(["hello again"])
+        probed = {model for path, model in mock.calls if path == "/api/embed"}
+        print(f"Second process embedded with: {probed}")
+        assert fresh.embed_model == "fast-embed"
+        assert probed <= {"broken", "fast-embed"}
+        assert cache.hits >= 4
+
+        # An embedder of the dimension memory already uses beats a faster one
+        cache.put(mock.url, "slow-embed", digest, True, dimension=16, latency=0.001)
+        mock.calls.clear()
+        matching = OllamaClient(base_url=mock.url, embed_model="broken", probe_cache=cache, probe_deadline=1.5)
+        matching.dimension_hint = lambda: 8
+        matching.get_embeddings_batch(["hello once more"])
+        assert matching.embed_model == "fast-embed"
+        unhinted = OllamaClient(base_url=mock.url, embed_model="broken", probe_cache=cache, probe_deadline=1.5)
+        unhinted.get_embeddings_batch(["hello once more"])
+        assert unhinted.embed_model == "slow-embed"
+    finally:
+        mock.stop()
+    print("Probe cache test passed!")
+
+if __name__ == "__main__":
+    test_probe_cache()
@@ -0,0 +1,45 @@
+from mock_ollama import MockOllama, DEFAULT_SIZES
+from ollama_client import OllamaClient
+from residency import ResidencyScheduler
+
+def test_residency():
+    general, scout, embedder, scribe = "mistral-nemo:12b", "gemma3:1b", "nomic-embed-text:latest", "smollm2:360m"
+    tags = [{"name": name, "size": size} for name, size in DEFAULT_SIZES.items()]
+
+    # With sizes from /api/tags, SCOUT fits beside the GENERAL in the default budget
+    scheduler = ResidencyScheduler(8192, pinned=[general], preferred=[scout, embedder])
+    scheduler.update_from_tags(tags)
+    assert scheduler.plan(general) == (None, [])
+    assert scheduler.plan(scout) == ("10m", [])
+    assert scheduler.plan(embedder, preferred=True) == (0, [])
+    assert scheduler.plan(scribe) == (0, [])
+    print("Footprints:", scheduler.stats()["footprints_mb"])
+
+    # A larger budget keeps the preferred models first, then the rest by recency
+    scheduler = ResidencyScheduler(10240, pinned=[general], preferred=[scout, embedder])
+    scheduler.update_from_tags(tags)
+    for model in (general, scout, embedder, scribe):
+        scheduler.plan(model)
+    assert scheduler.stats()["resident"] == sorted([general, scout, embedder, scribe])
+
+    # Without sizes, two helpers that don't both fit take turns, the older one evicted
+    scheduler = ResidencyScheduler(7740 + 1000, pinned=[general])
+    assert scheduler.plan("first:1b") == ("10m", [])
+    assert scheduler.plan("second:1b") == ("10m", ["first:1b"])
+
+    # A keep_alive 0 model is only measured once, not after every call
+    mock = MockOllama(tokens_per_second=0, load_seconds=0, embed_seconds=0).start()
+    try:
+        client = OllamaClient(base_url=mock.url, model=general, residency=ResidencyScheduler(0, pinned=[general]))
+        for _ in range(3):
+            client.generate("hi", model=scribe)
+        paths = [path for path, model in mock.calls]
+        print("Requests:", paths)
+        assert paths.count("/api/ps") == 1 and paths.count("/api/tags") == 1
+        assert scribe not in mock.loaded
+    finally:
+        mock.stop()
+    print("Residency test passed!")
+
+if __name__ == "__main__":
+    test_residency()
@@ -0,0 +1,62 @@
+from memory_manager import MemoryManager
+from retention import MemoryConsolidator, RetentionPolicy
+import os
+import shutil
+import time
+
+def contents(memory):
+    memory.flush()
+    rows = memory.table.search().where("timestamp > 0").limit(1000).to_list()
+    return sorted(r["content"] for r in rows)
+
+def test_retention():
+    path = "/tmp/test_retention"
+    if os.path.exists(path):
+        shutil.rmtree(path)
+
+    memory = MemoryManager(db_path=path, model_name="test-model", dimension=3, dedup_roles=())
+    old = time.time() - 90 * 86400
+    for i in range(4):
+        memory.store_interaction("system", f"old disk report {i}", [1.0, 0.1 * i, 0.0], timestamp=old + i)
+    memory.store_interaction("system", "recent uptime check", [0.0, 1.0, 0.0])
+    memory.store_interaction("system", "recent git status", [0.0, 0.0, 1.0])
+    summaries = []
+    def summarize(text):
+        summaries.append(text)
+        return "disk reports were fine"
+    embed = lambda texts: [[1.0, 0.0, 0.0] for _ in texts]
+
+    # A dry run reports what it would condense and changes nothing
+    before = contents(memory)
+    result = MemoryConsolidator(memory, summarize, embed, RetentionPolicy(max_age_days=30)).run(dry_run=True, verbose=False)
+    print(f"Dry run: {result}")
+    assert result["clusters"] == 1 and result["consolidated"] == 4
+    assert contents(memory) == before and not summaries
+
+    # Nothing happens while a migration into this table is unfinished
+    memory._update_meta(memory.table_name, migration={"source": "interactions_old_3", "offset": 1, "total": 9, "done": False})
+    result = MemoryConsolidator(memory, summarize, embed, RetentionPolicy(max_age_days=30)).run(verbose=False)
+    assert result["skipped"] == "migration" and contents(memory) == before
+    memory._update_meta(memory.table_name, migration={"source": "interactions_old_3", "offset": 9, "total": 9, "done": True})
+
+    # Only rows past the age limit are condensed
+    result = MemoryConsolidator(memory, summarize, embed, RetentionPolicy(max_age_days=30)).run(verbose=False)
+    after = contents(memory)
+    print(f"Consolidated: {result}\n{after}")
+    assert result["consolidated"] == 4 and result["evicted"] == 0
+    assert "recent uptime check" in after and "recent git status" in after
+    assert not any(c.startswith("old disk report") for c in after)
+    assert any(c.startswith("[Summary of 4 memories") for c in after)
+
+    # The row cap evicts the least used, oldest rows; the seed row counts toward it
+    memory.store_interaction("system", "recent df -h", [0.5, 0.5, 0.0])
+    result = MemoryConsolidator(memory, summarize, embed, RetentionPolicy(max_age_days=30, max_rows=3)).run(verbose=False)
+    after = contents(memory)
+    print(f"Capped: {result}\n{after}")
+    assert result["evicted"] == 2
+    assert len(after) == 2 and any(c.startswith("[Summary of 4 memories") for c in after) # Its hits add up
+    memory.close()
+    print("Retention test passed!")
+
+if __name__ == "__main__":
+    test_retention()
@@ -0,0 +1,44 @@
+from session import GenerateSession
+
+class RecordingClient:
+    # Stands in for OllamaClient, remembering what each generate call sent
+    def __init__(self):
+        self.calls = []
+
+    def generate(self, prompt, system_prompt=None, context=None, model=None):
+        self.calls.append({"prompt": prompt, "system": system_prompt, "context": context, "model": model})
+        return {"response": f"reply {len(self.calls)}", "context": [len(self.calls)] * 3, "done": True}
+
+def test_session():
+    client = RecordingClient()
+    session = GenerateSession(client, "general", "SYSTEM", messages=[{"role": "user", "content": "check disk"}])
+
+    assert "".join(session.reply(stream=False)) == "reply 1"
+    first = client.calls[-1]
+    assert first["context"] is None and first["system"] == "SYSTEM"
+    assert "User: check disk" in first["prompt"]
+
+    # Second turn only sends the new command output on top of the returned context
+    session.add("user", "Command output:\n/dev/sda1 90%")
+    list(session.reply(stream=False))
+    second = client.calls[-1]
+    print(f"Delta prompt: {second['prompt']!r}")
+    assert second["context"] == [1, 1, 1]
+    assert second["system"] is None
+    assert "check disk" not in second["prompt"]
+    assert "/dev/sda1 90%" in second["prompt"]
+
+    # Switching models invalidates the context and replays the whole transcript
+    session.model = "other"
+    session.add("user", "thanks")
+    list(session.reply(stream=False))
+    third = client.calls[-1]
+    assert third["context"] is None and third["system"] == "SYSTEM"
+    assert "check disk" in third["prompt"] and "reply 2" in third["prompt"]
+
+    assert session.deltas == 1 and session.replays == 2
+    assert session.messages[-1] == {"role": "assistant", "content": "reply 3"}
+    print("Session test passed!")
+
+if __name__ == "__main__":
+    test_session()
@@ -0,0 +1,30 @@
+import subprocess
+import sys
+
+def test_startup_imports():
+    # The agent and an unused MemoryManager must not pull in lancedb/numpy at startup
+    code = (
+        "import sys, agent\n"
+        "from memory_manager import MemoryManager\n"
+        "from startup import HEAVY_MODULES\n"
+        "memory = MemoryManager(db_path='/tmp/test_startup_db')\n"
+        "print(','.join(m for m in HEAVY_MODULES if m in sys.modules))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    eager = result.stdout.strip()
+    print(f"Heavy modules imported at startup: {eager or 'none'}")
+    assert eager == ""
+
+def test_connect_in_background():
+    from memory_manager import MemoryManager
+    memory = MemoryManager(db_path="/tmp/test_startup_db", model_name="test-model")
+    assert not memory.is_ready()
+    memory.connect_in_background()
+    memory._connector.join()
+    assert memory.is_ready()
+    assert memory.connect_seconds is not None
+    print("Startup test passed!")
+
+if __name__ == "__main__":
+    test_startup_imports()
+    test_connect_in_background()
@@ -0,0 +1,42 @@
+from summarizer import OutputSummarizer, collapse_repeats, estimate_tokens, prefilter
+
+def test_prefilter():
+    assert collapse_repeats(["tick 1", "tick 2", "tick 3", "done"]) == ["tick 1  [repeated 3 times]", "done"]
+    lines = [f"line {chr(97 + i % 26) * (i % 7 + 1)}" for i in range(500)]
+    lines[250] = "ERROR: disk full on /dev/sda1"
+    filtered = prefilter("\n".join(lines), head_lines=10, tail_lines=10)
+    print(filtered)
+    assert "ERROR: disk full on /dev/sda1" in filtered
+    assert len(filtered.splitlines()) < 30
+
+def test_map_reduce_budget():
+    sent = []
+
+    def generate(prompt):
+        sent.append(estimate_tokens(prompt))
+        return "partial summary " * 100
+
+    words = ["alpha", "beta", "gamma", "delta", "epsilon", "zeta", "eta", "theta"]
+    text = "\n".join(" ".join(words[(i * j) % 8] for j in range(12)) + f" {i}" for i in range(5000))
+    summarizer = OutputSummarizer(generate, chunk_tokens=256, budget_tokens=2048)
+    summary = summarizer.summarize(text)
+    print(f"{len(sent)} calls, {sum(sent)} tokens sent")
+    assert summary.startswith("partial summary")
+    assert len(sent) > 2 # Several chunks plus the reduce call
+    assert sum(sent) <= 2048
+
+    # Short output is a single call
+    sent.clear()
+    summarizer.summarize("just a few\nlines of output")
+    assert len(sent) == 1
+
+    # A budget below one chunk still holds, as a single smaller call
+    sent.clear()
+    OutputSummarizer(generate, chunk_tokens=1024, budget_tokens=200).summarize(text)
+    print(f"Small budget: {sent}")
+    assert len(sent) == 1 and sent[0] <= 200
+    print("Summarizer test passed!")
+
+if __name__ == "__main__":
+    test_prefilter()
+    test_map_reduce_budget()
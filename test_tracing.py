@@ -0,0 +1,78 @@
+from tracing import Tracer, TraceWriter, traced, waterfall
+import json
+import os
+import threading
+
+class Client:
+    def __init__(self, tracer):
+        self.tracer = tracer
+
+    @traced("client.generate")
+    def generate(self):
+        self.tracer.record_ollama({"load_duration": 2500000000, "prompt_eval_duration": 40000000, "eval_count": 12})
+        return "ok"
+
+    @traced("client.stream")
+    def stream(self):
+        yield "a"
+        yield "b"
+
+def test_tracing():
+    tracer = Tracer()
+    client = Client(tracer)
+    with tracer.span("request"):
+        assert client.generate() == "ok"
+        assert "".join(client.stream()) == "ab"
+        worker = threading.Thread(target=client.generate, name="pool-1")
+        worker.start()
+        worker.join()
+        try:
+            with tracer.span("exec", command="false"):
+                raise RuntimeError("boom")
+        except RuntimeError:
+            pass
+
+    spans = tracer.take()
+    by_name = {}
+    for span in spans:
+        by_name.setdefault(span.name, []).append(span)
+    generate = [s for s in by_name["client.generate"] if s.thread != "pool-1"][0]
+    assert generate.parent.name == "request" and generate.depth == 1
+    assert generate.attrs == {"load_ms": 2500.0, "prompt_eval_ms": 40.0, "eval_count": 12}
+    assert by_name["client.stream"][0].parent.name == "request"
+    # Work on another thread starts its own tree
+    assert [s for s in by_name["client.generate"] if s.thread == "pool-1"][0].parent is None
+    assert by_name["exec"][0].attrs["error"] == "RuntimeError: boom"
+    assert tracer.take() == []
+
+    text = waterfall(spans)
+    print(text)
+    assert "request" in text and "[pool-1]" in text and "load_ms=2500.0" in text
+
+    # A disabled tracer records nothing
+    quiet = Tracer(enabled=False)
+    Client(quiet).generate()
+    with quiet.span("request"):
+        pass
+    assert quiet.take() == []
+
+    for path in ("/tmp/test_trace.jsonl", "/tmp/test_trace.json"):
+        if os.path.exists(path):
+            os.remove(path)
+        writer = TraceWriter(path, tracer)
+        writer.write(spans)
+        writer.write(spans[:1])
+    lines = [json.loads(line) for line in open("/tmp/test_trace.jsonl")]
+    assert len(lines) == len(spans) + 1 and lines[0]["name"] == "request"
+    # Chrome's array format may be left unterminated, so events are only ever appended
+    events = json.loads(open("/tmp/test_trace.json").read() + "]")
+    assert len([e for e in events if e["ph"] == "X"]) == len(spans) + 1
+    assert {e["args"]["name"] for e in events if e["ph"] == "M"} == {"MainThread", "pool-1"}
+    # The next process starts its own trace
+    TraceWriter("/tmp/test_trace.json", tracer).write(spans[:1])
+    events = json.loads(open("/tmp/test_trace.json").read() + "]")
+    assert [e["ph"] for e in events] == ["M", "X"]
+    print("Tracing test passed!")
+
+if __name__ == "__main__":
+    test_tracing()
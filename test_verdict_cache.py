@@ -0,0 +1,30 @@
+from verdict_cache import VerdictCache
+import os
+
+def test_verdict_cache():
+    path = "/tmp/test_verdict_cache.db"
+    if os.path.exists(path):
+        os.remove(path)
+
+    cache = VerdictCache(path, max_entries=2)
+    assert cache.get("gemma3:1b", "rm notes.txt") is None
+    cache.put("gemma3:1b", "rm notes.txt", "SAFE")
+    assert cache.get("gemma3:1b", "rm notes.txt") == "SAFE"
+    # Verdicts are per SCOUT model
+    assert cache.get("other:1b", "rm notes.txt") is None
+
+    # Least recently used entry goes first
+    cache.put("gemma3:1b", "apt install nginx", "RISK: installs packages")
+    cache.get("gemma3:1b", "rm notes.txt")
+    cache.put("gemma3:1b", "git push origin main", "SAFE")
+    assert cache.get("gemma3:1b", "apt install nginx") is None
+    assert cache.stats()["entries"] == 2
+    cache.close()
+
+    # Survives a restart
+    reopened = VerdictCache(path, max_entries=2)
+    assert reopened.get("gemma3:1b", "git push origin main") == "SAFE"
+    print("Verdict cache test passed!")
+
+if __name__ == "__main__":
+    test_verdict_cache()
@@ -0,0 +1,48 @@
+from memory_manager import MemoryManager
+import os
+import shutil
+import time
+
+def test_write_buffer():
+    path = "/tmp/test_write_buffer"
+    if os.path.exists(path):
+        shutil.rmtree(path)
+
+    memory = MemoryManager(db_path=path, model_name="test-model", dimension=3, dedup_roles=(),
+                           flush_size=4, flush_interval=0.5, compact_fragments=3)
+    rows = lambda: memory.table.count_rows() - 1 # Minus the seed row
+    for i in range(3):
+        memory.store_interaction("system", f"output {i}", [1.0, float(i), 0.0])
+    # Nothing is written until the buffer fills, the timer fires or someone reads
+    assert rows() == 0 and memory.stats()["pending"] == 3
+    memory.store_interaction("system", "output 3", [1.0, 3.0, 0.0])
+    assert rows() == 4 and memory.stats()["pending"] == 0
+
+    # A quiet session still lands its rows within flush_interval
+    memory.store_interaction("system", "output 4", [1.0, 4.0, 0.0])
+    time.sleep(1.0)
+    assert rows() == 5
+
+    # A search sees buffered rows
+    memory.store_interaction("system", "output 5", [0.0, 0.0, 1.0])
+    assert memory.retrieve_context([0.0, 0.0, 1.0], top_k=1)[0][0] == "output 5"
+
+    # Once flushes leave compact_fragments fragments, the maintainer merges them
+    for i in range(6, 10):
+        memory.store_interaction("system", f"output {i}", [1.0, float(i), 0.0])
+        memory.flush()
+        memory.wait_for_maintenance()
+    fragments = memory.table.stats()["fragment_stats"]["num_fragments"]
+    print(f"Fragments after compaction: {fragments}")
+    assert fragments < 3
+
+    # Closing flushes whatever is left
+    memory.store_interaction("system", "output 10", [1.0, 10.0, 0.0])
+    memory.close()
+    reopened = MemoryManager(db_path=path, model_name="test-model", dimension=3)
+    assert reopened.table.count_rows() - 1 == 11
+    reopened.close()
+    print("Write buffer test passed!")
+
+if __name__ == "__main__":
+    test_write_buffer()
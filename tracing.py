@@ -0,0 +1,234 @@
+import functools
+import inspect
+import itertools
+import json
+import os
+import threading
+import time
+
+# Timing fields Ollama returns with a finished generate/chat/embed call; durations are in ns
+OLLAMA_DURATIONS = {"load_duration": "load_ms", "prompt_eval_duration": "prompt_eval_ms",
+                    "eval_duration": "eval_ms", "total_duration": "total_ms"}
+OLLAMA_COUNTS = ("prompt_eval_count", "eval_count")
+# Attributes worth showing in the waterfall, in this order
+WATERFALL_ATTRS = ("model", "load_ms", "prompt_eval_ms", "prompt_eval_count", "eval_count",
+                   "decided_by", "command", "exit_code", "rows", "hits", "error")
+
+_span_ids = itertools.count(1)
+
+class Span:
+    def __init__(self, name, start, thread, parent, attrs):
+        self.id = next(_span_ids)
+        self.name = name
+        self.start = start
+        self.end = None
+        self.thread = thread
+        self.tid = threading.get_ident()
+        self.parent = parent
+        self.depth = parent.depth + 1 if parent is not None else 0
+        self.attrs = attrs
+
+    @property
+    def duration(self):
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+class _NullSpan:
+    def __init__(self):
+        self.attrs = {}
+
+class Tracer:
+    # Lightweight spans for --profile and --trace-file. Nesting is tracked per thread, so
+    # work handed to a pool starts a new top-level span on that thread. A disabled tracer
+    # costs one attribute check per span.
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.spans = []
+        self.origin = time.perf_counter()
+        self.epoch = time.time() # Wall clock at origin, for exported timestamps
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def span(self, name, **attrs):
+        if not self.enabled:
+            return _NullContext()
+        return self._span(name, attrs)
+
+    def _span(self, name, attrs):
+        stack = self._stack()
+        span = Span(name, time.perf_counter(), threading.current_thread().name, stack[-1] if stack else None, attrs)
+        stack.append(span)
+        return _SpanContext(self, span)
+
+    def _finish(self, span):
+        span.end = time.perf_counter()
+        stack = self._stack()
+        # A generator's span may close after spans opened around its consumer
+        if span in stack:
+            stack.remove(span)
+        with self._lock:
+            self.spans.append(span)
+
+    def annotate(self, **attrs):
+        # Adds attributes to this thread's innermost open span
+        if not self.enabled:
+            return
+        stack = self._stack()
+        if stack:
+            stack[-1].attrs.update(attrs)
+
+    def record_ollama(self, data):
+        # Copies Ollama's load/prefill/eval timings from a response onto the current span
+        if not self.enabled or not isinstance(data, dict):
+            return
+        attrs = {}
+        for field, name in OLLAMA_DURATIONS.items():
+            if data.get(field) is not None:
+                attrs[name] = round(data[field] / 1e6, 1)
+        for field in OLLAMA_COUNTS:
+            if data.get(field) is not None:
+                attrs[field] = data[field]
+        self.annotate(**attrs)
+
+    def take(self):
+        # Finished spans since the last call, in start order
+        with self._lock:
+            spans, self.spans = self.spans, []
+        return sorted(spans, key=lambda s: s.start)
+
+class _SpanContext:
+    def __init__(self, tracer, span):
+        self.tracer = tracer
+        self.span = span
+
+    def __enter__(self):
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.span.attrs["error"] = f"{exc_type.__name__}: {exc}"
+        self.tracer._finish(self.span)
+        return False
+
+class _NullContext:
+    def __enter__(self):
+        return _NullSpan()
+
+    def __exit__(self, *exc):
+        return False
+
+NULL_TRACER = Tracer(enabled=False)
+
+def traced(name):
+    # Method decorator: a span around each call, using the instance's tracer attribute.
+    # Generator methods are traced until they are exhausted.
+    def decorate(func):
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def wrapper(self, *args, **kwargs):
+                tracer = getattr(self, "tracer", NULL_TRACER)
+                if not tracer.enabled:
+                    return (yield from func(self, *args, **kwargs))
+                with tracer.span(name):
+                    return (yield from func(self, *args, **kwargs))
+        else:
+            @functools.wraps(func)
+            def wrapper(self, *args, **kwargs):
+                tracer = getattr(self, "tracer", NULL_TRACER)
+                if not tracer.enabled:
+                    return func(self, *args, **kwargs)
+                with tracer.span(name):
+                    return func(self, *args, **kwargs)
+        return wrapper
+    return decorate
+
+def _short(value, limit=48):
+    text = str(value).replace("\n", " ")
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+def waterfall(spans, width=32):
+    # Text waterfall of one request: offset, duration and a bar per span, nested spans
+    # indented under their parent, spans from pool threads marked with their thread
+    if not spans:
+        return "--- Profile: no spans recorded ---"
+    start = min(s.start for s in spans)
+    end = max(s.start + s.duration for s in spans)
+    total = max(end - start, 1e-9)
+    main_thread = threading.main_thread().name
+
+    # Children follow their parent; spans whose parent isn't in the list are roots
+    ids = {span.id for span in spans}
+    children = {}
+    for span in sorted(spans, key=lambda s: s.start):
+        parent = span.parent.id if span.parent is not None and span.parent.id in ids else None
+        children.setdefault(parent, []).append(span)
+    ordered = []
+    pending = list(reversed(children.get(None, [])))
+    while pending:
+        span = pending.pop()
+        ordered.append(span)
+        pending.extend(reversed(children.get(span.id, [])))
+
+    lines = [f"--- Profile ({total * 1000:.1f} ms) ---"]
+    for span in ordered:
+        offset = span.start - start
+        left = int(offset / total * width)
+        length = max(1, int(round(span.duration / total * width)))
+        bar = " " * left + "#" * min(length, width - left)
+        attrs = " ".join(f"{key}={_short(span.attrs[key])}" for key in WATERFALL_ATTRS if key in span.attrs)
+        thread = "" if span.thread == main_thread else f" [{span.thread}]"
+        lines.append(
+            f"{offset * 1000:8.1f} {span.duration * 1000:8.1f} ms |{bar:<{width}}| "
+            f"{'  ' * span.depth}{span.name}{thread} {attrs}".rstrip()
+        )
+    return "\n".join(lines)
+
+class TraceWriter:
+    # Exports spans to path: Chrome trace format (chrome://tracing, Perfetto) when the
+    # file ends in .json, otherwise one JSON object per span per line. JSONL is appended
+    # across runs; a .json trace covers one process and is started over by the next.
+    # Chrome traces use the JSON array format, whose closing bracket is optional, so
+    # events are appended as they come instead of rewriting the whole document.
+    def __init__(self, path, tracer):
+        self.path = os.path.expanduser(path)
+        self.tracer = tracer
+        self.chrome = self.path.endswith(".json")
+        self._started = False
+        self._threads = set()
+
+    def _wall(self, t):
+        return self.tracer.epoch + (t - self.tracer.origin)
+
+    def _chrome_events(self, spans):
+        pid = os.getpid()
+        for span in spans:
+            if span.tid not in self._threads:
+                self._threads.add(span.tid)
+                yield {"name": "thread_name", "ph": "M", "pid": pid, "tid": span.tid, "args": {"name": span.thread}}
+            yield {
+                "name": span.name, "ph": "X", "pid": pid, "tid": span.tid,
+                "ts": round(self._wall(span.start) * 1e6), "dur": round(span.duration * 1e6),
+                "args": span.attrs,
+            }
+
+    def write(self, spans):
+        if self.chrome:
+            with open(self.path, "a" if self._started else "w") as f:
+                for event in self._chrome_events(spans):
+                    f.write(("," if self._started else "[") + "\n" + json.dumps(event, default=str))
+                    self._started = True
+            return
+        with open(self.path, "a") as f:
+            for span in spans:
+                record = {
+                    "id": span.id, "parent": span.parent.id if span.parent else None,
+                    "name": span.name, "thread": span.thread, "ts": round(self._wall(span.start), 6),
+                    "duration_ms": round(span.duration * 1000, 3),
+                }
+                record.update(span.attrs)
+                f.write(json.dumps(record, default=str) + "\n")
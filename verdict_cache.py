@@ -0,0 +1,50 @@
+import time
+from sqlite_cache import SqliteCache
+
+class VerdictCache(SqliteCache):
+    # On-disk LRU cache of SCOUT verdicts keyed by (scout_model, normalized command), so a
+    # command the LLM already judged never costs another model call
+    table = "verdicts"
+
+    def __init__(self, path="~/.cache/terminal-companion/scout_verdicts.db", max_entries=5000):
+        self.max_entries = max_entries
+        super().__init__(path)
+
+    def _create_schema(self):
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS verdicts ("
+            "model TEXT NOT NULL, command TEXT NOT NULL, verdict TEXT NOT NULL, "
+            "last_used REAL NOT NULL, PRIMARY KEY (model, command))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS verdicts_last_used ON verdicts(last_used)")
+
+    def get(self, model, command):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT verdict FROM verdicts WHERE model = ? AND command = ?", (model, command)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute(
+                "UPDATE verdicts SET last_used = ? WHERE model = ? AND command = ?",
+                (time.time(), model, command)
+            )
+            self._conn.commit()
+        return row[0]
+
+    def put(self, model, command, verdict):
+        if not verdict:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO verdicts (model, command, verdict, last_used) VALUES (?, ?, ?, ?)",
+                (model, command, verdict, time.time())
+            )
+            # Evict least recently used entries
+            self._conn.execute(
+                "DELETE FROM verdicts WHERE rowid IN (SELECT rowid FROM verdicts ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            self._conn.commit()